@@ -0,0 +1,2 @@
+"""Benchmarks of the collectors with stubbed HTTP and exec layers, run with python -m benchmarks.run
+"""
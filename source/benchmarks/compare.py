@@ -0,0 +1,96 @@
+"""Compares two results files of benchmarks.run or benchmarks.startup and reports regressions
+
+Usage (in directory source):
+    python -m benchmarks.compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+
+# The compared values, key is the name in the report, value is the path within a result
+COMPARED_VALUES = {
+    'median': ('cycle_seconds', 'median'),
+    'p95': ('cycle_seconds', 'p95'),
+    'peak_memory': ('peak_memory_bytes',),
+    'exposition': ('exposition_bytes',),
+    'startup': ('startup_seconds', 'median'),
+    'rss': ('rss_bytes',),
+}
+
+
+def load_results(filename: str) -> dict:
+    """Loads a results file
+
+    Args:
+        filename (str): The file
+
+    Returns:
+        dict: Key is the tuple of benchmark and peers, value is the result
+    """
+    with open(filename, 'r', encoding='utf-8') as file:
+        results_object = json.load(file)
+    return {(each['benchmark'], each['peers']): each for each in results_object.get('results', [])}
+
+
+def _get_value(result: dict, path: tuple):
+    value = result
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Compares the results of the same benchmark and number of peers
+
+    Args:
+        baseline (dict): The baseline results
+        current (dict): The current results
+        threshold (float): Relative increase of a value reported as regression, e.g. 0.1 for 10%
+
+    Returns:
+        list: The rows of the report (benchmark, peers, value name, baseline, current, change, regression)
+    """
+    rows = []
+    for key in sorted(baseline.keys() & current.keys()):
+        for name, path in COMPARED_VALUES.items():
+            baseline_value = _get_value(baseline[key], path)
+            current_value = _get_value(current[key], path)
+            if not baseline_value or current_value is None:
+                continue
+            change = (current_value - baseline_value) / baseline_value
+            rows.append((key[0], key[1], name, baseline_value, current_value, change, change > threshold))
+    return rows
+
+
+def main() -> int:
+    """Main
+
+    Returns:
+        int: Return code, 1 if there are regressions
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline', help='Results file of the baseline version')
+    parser.add_argument('current', help='Results file of the current version')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative increase reported as regression (default: %(default)s)')
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    rows = compare(baseline, current, args.threshold)
+
+    print(f"{'benchmark':<28} {'peers':>6} {'value':<12} {'baseline':>14} {'current':>14} {'change':>8}")
+    for benchmark, peers, name, baseline_value, current_value, change, regression in rows:
+        print(f"{benchmark:<28} {peers:>6} {name:<12} {baseline_value:>14.6g} {current_value:>14.6g} "
+              f"{change:>+7.1%}{' REGRESSION' if regression else ''}")
+
+    for key in sorted(baseline.keys() ^ current.keys()):
+        print(f"{key[0]:<28} {key[1]:>6} only in {'baseline' if key in baseline else 'current'}")
+
+    regressions = sum(1 for row in rows if row[6])
+    print(f"{regressions} regressions above {args.threshold:.0%}")
+    return 1 if regressions > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Generates realistic peer configs and admin_peers payloads of any size
+"""
+import json
+import random
+
+# Share of the configured peers connected to the node
+CONNECTED_SHARE = 0.8
+# Number of connected peers not in the config relative to the configured peers
+UNKNOWN_SHARE = 0.1
+# Head block of the local node
+HEAD_BLOCK = 1234567
+
+# Results of the node methods
+METHOD_RESULTS = {
+    'eth_blockNumber': hex(HEAD_BLOCK),
+    'net_peerCount': '0x10',
+    'eth_syncing': False,
+    'txpool_status': {'pending': '0x3', 'queued': '0x0'},
+    'istanbul_getValidators': ['0x' + '1' * 40, '0x' + '2' * 40, '0x' + '3' * 40, '0x' + '4' * 40],
+    'qbft_getValidatorsByBlockNumber': ['0x' + '1' * 40, '0x' + '2' * 40, '0x' + '3' * 40, '0x' + '4' * 40],
+}
+
+
+def _hex(rand: random.Random, length: int) -> str:
+    return ''.join(rand.choice('0123456789abcdef') for _ in range(length))
+
+
+def _ip_address(rand: random.Random) -> str:
+    return f'10.{rand.randint(0, 255)}.{rand.randint(0, 255)}.{rand.randint(1, 254)}'
+
+
+def create_peers_config(count: int, seed: int = 1) -> list:
+    """Creates the peers of the config
+
+    Args:
+        count (int): Number of peers
+        seed (int, optional): Seed of the random generator, same seed creates the same peers. Defaults to 1.
+
+    Returns:
+        list: The peer objects as in config.json
+    """
+    rand = random.Random(seed)
+    peers = []
+    for index in range(count):
+        peers.append({
+            # Some companies run multiple nodes, so names are not unique
+            'company-name': f'company_{index // 2}',
+            'enode': _hex(rand, 128),
+            'enodeAddress': _ip_address(rand),
+            'enodeAddressPort': '30303',
+        })
+    return peers
+
+
+def create_config(peer_count: int, seed: int = 1, **sections) -> dict:
+    """Creates a config object
+
+    Args:
+        peer_count (int): Number of peers
+        seed (int, optional): Seed of the random generator. Defaults to 1.
+        sections: Additional config sections, e.g. rpc={'methods': []}
+
+    Returns:
+        dict: The config object as in config.json
+    """
+    config_object = {
+        'namespace': 'quorum',
+        'deployment': 'quorum-node-0',
+        'rpc_url': 'http://quorum-node-0-rpc.quorum:8545',
+        'peers': create_peers_config(peer_count, seed),
+    }
+    config_object.update(sections)
+    return config_object
+
+
+def _create_peer(rand: random.Random, enode: str, address: str) -> dict:
+    """Creates a peer of admin_peers as returned by GoQuorum
+
+    Args:
+        rand (random.Random): The random generator
+        enode (str): The enode
+        address (str): The IP address
+
+    Returns:
+        dict: The peer object
+    """
+    inbound = rand.random() < 0.5
+    protocols = {}
+    protocol_choice = rand.random()
+    if protocol_choice < 0.02:
+        # Handshake not finished yet
+        protocols['istanbul'] = 'handshake'
+    elif protocol_choice < 0.1:
+        protocols['eth'] = {'version': 65, 'difficulty': HEAD_BLOCK - rand.randint(0, 5), 'head': '0x' + _hex(rand, 64)}
+    else:
+        protocols['istanbul'] = {'version': 100, 'difficulty': HEAD_BLOCK - rand.randint(0, 5),
+                                 'head': '0x' + _hex(rand, 64)}
+    return {
+        'enode': f'enode://{enode}@{address}:30303?discport=0',
+        'id': _hex(rand, 64),
+        'name': 'Geth/v1.10.3-stable-9d0b2f9e(quorum-v22.7.1)/linux-amd64/go1.17.5',
+        'caps': ['eth/64', 'eth/65', 'istanbul/100'],
+        'network': {
+            'localAddress': f'10.0.0.1:{30303 if inbound else rand.randint(32768, 60999)}',
+            'remoteAddress': f'{address}:{rand.randint(32768, 60999) if inbound else 30303}',
+            'inbound': inbound,
+            'trusted': False,
+            'static': not inbound,
+        },
+        'protocols': protocols,
+    }
+
+
+def create_admin_peers(peers_config: list, seed: int = 1) -> list:
+    """Creates the result of admin_peers for the configured peers.
+        Most configured peers are connected, some peers not in the config are connected as well.
+
+    Args:
+        peers_config (list): The peer objects of the config
+        seed (int, optional): Seed of the random generator. Defaults to 1.
+
+    Returns:
+        list: The result of admin_peers
+    """
+    rand = random.Random(seed)
+    result = []
+    for each in peers_config:
+        if rand.random() < CONNECTED_SHARE:
+            result.append(_create_peer(rand, each['enode'], each['enodeAddress']))
+    for _ in range(int(len(peers_config) * UNKNOWN_SHARE)):
+        result.append(_create_peer(rand, _hex(rand, 128), _ip_address(rand)))
+    rand.shuffle(result)
+    return result
+
+
+def encode_method_results(peers_config: list, seed: int = 1) -> dict:
+    """Encodes the results of all methods queried by the exporter once, so the HTTP stub only has to frame them
+
+    Args:
+        peers_config (list): The peer objects of the config
+        seed (int, optional): Seed of the random generator. Defaults to 1.
+
+    Returns:
+        dict: Key is the method, value is the JSON encoded result
+    """
+    results = {method: json.dumps(result).encode('utf-8') for method, result in METHOD_RESULTS.items()}
+    results['admin_peers'] = json.dumps(create_admin_peers(peers_config, seed)).encode('utf-8')
+    return results
@@ -0,0 +1,334 @@
+"""Runs the benchmarks of the collectors with synthetic load and saves the results as JSON
+
+Usage (in directory source):
+    python -m benchmarks.run --peers 10,100,1000,10000 --output results.json
+"""
+import argparse
+import datetime
+import gc
+import gzip
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+import utils.kube_exec_metrics_collector
+from utils.admin_peers import read_peers
+from utils.config import Config
+from utils.helper import Helper
+from utils.json_stream import JsonStreamReader
+from utils.kube_exec_metrics_collector import KubeExecMetricsCollector
+from utils.node_status import METHOD_PARAMS
+from utils.rpc_metrics_collector import RpcMetricsCollector
+
+from .payloads import create_config, create_admin_peers, encode_method_results
+from .stubs import LatencyDistribution, StubExec, StubPodWatcher, StubRpcAdapter
+
+# Version of the format of the results file
+RESULTS_VERSION = 1
+
+
+class Scenario:  # pylint: disable=R0903
+    """The load of a benchmark run
+    """
+
+    def __init__(self, peers: int, rpc_latency: LatencyDistribution, exec_latency: LatencyDistribution,
+                 workers: int, seed: int):
+        self.peers = peers
+        self.rpc_latency = rpc_latency
+        self.exec_latency = exec_latency
+        self.workers = workers
+        self.seed = seed
+        self.config_object = create_config(peers, seed)
+
+    def create_config(self, **sections) -> Config:
+        """Creates a config with the peers of the scenario
+
+        Returns:
+            Config: The config
+        """
+        config = Config()
+        if not config.load(dict(self.config_object, **sections)):
+            raise ValueError("Invalid config")
+        return config
+
+
+def _bench_config_load(scenario: Scenario) -> Tuple[Callable, object]:
+    config_object = scenario.config_object
+    return lambda: Config().load(config_object), None
+
+
+def _bench_helper_get_enode_from_url(scenario: Scenario) -> Tuple[Callable, object]:
+    helper = Helper()
+    enode_urls = [each['enode'] for each in create_admin_peers(scenario.config_object['peers'], scenario.seed)]
+
+    def cycle():
+        for each in enode_urls:
+            helper.get_enode_from_url(each)
+    return cycle, None
+
+
+def _bench_helper_deep_get(scenario: Scenario) -> Tuple[Callable, object]:
+    helper = Helper()
+    admin_peers = create_admin_peers(scenario.config_object['peers'], scenario.seed)
+
+    def cycle():
+        for each in admin_peers:
+            helper.deep_get(each, 'protocols.istanbul.difficulty')
+            helper.deep_get(each, 'network.inbound')
+    return cycle, None
+
+
+def _bench_rpc_create_current_metrics(scenario: Scenario) -> Tuple[Callable, object]:
+    config = scenario.create_config()
+    collector = RpcMetricsCollector(config, config.nodes[0])
+    method_results = encode_method_results(scenario.config_object['peers'], scenario.seed)
+    peers_data = read_peers(JsonStreamReader([method_results['admin_peers']]))
+    node_results = {'eth_blockNumber': json.loads(method_results['eth_blockNumber'])}
+    instance_name = config.nodes[0].instance_name
+    # The metrics are published by process() only, see rpc_process for the exposition
+    # pylint: disable=W0212
+    return lambda: collector._create_current_metrics(instance_name, peers_data, node_results), None
+
+
+def _create_rpc_collector(scenario: Scenario, methods: list) -> RpcMetricsCollector:
+    config = scenario.create_config(rpc={'methods': methods, 'retries': 0})
+    collector = RpcMetricsCollector(config, config.nodes[0])
+    adapter = StubRpcAdapter(encode_method_results(scenario.config_object['peers'], scenario.seed),
+                             scenario.rpc_latency)
+    collector._rpc_client._session.mount('http://', adapter)  # pylint: disable=W0212
+    return collector
+
+
+def _bench_rpc_process(scenario: Scenario) -> Tuple[Callable, object]:
+    collector = _create_rpc_collector(scenario, [])
+    return collector.process, collector
+
+
+def _bench_rpc_process_batch(scenario: Scenario) -> Tuple[Callable, object]:
+    collector = _create_rpc_collector(scenario, [each for each in METHOD_PARAMS if each != 'qbft_getValidatorsByBlockNumber'])
+    return collector.process, collector
+
+
+def _create_kube_exec_collector(scenario: Scenario, probe_mode: str, session: bool = False,
+                                **sections) -> KubeExecMetricsCollector:
+    config = scenario.create_config(kube_exec={'probe_mode': probe_mode, 'workers': scenario.workers, 'session': session},
+                                    **sections)
+    collector = KubeExecMetricsCollector(config, config.nodes[0])
+    collector._pod_watcher = StubPodWatcher('quorum-node-0-5d8f7c9b4-x2x7q')  # pylint: disable=W0212
+    return collector
+
+
+def _bench_kube_exec_single(scenario: Scenario) -> Tuple[Callable, object]:
+    collector = _create_kube_exec_collector(scenario, 'single')
+    return collector.process, collector
+
+
+def _bench_kube_exec_batch(scenario: Scenario) -> Tuple[Callable, object]:
+    collector = _create_kube_exec_collector(scenario, 'batch')
+    return collector.process, collector
+
+
+def _bench_kube_exec_batch_latency(scenario: Scenario) -> Tuple[Callable, object]:
+    collector = _create_kube_exec_collector(scenario, 'batch', connect_latency={'enabled': True, 'samples': 3})
+    return collector.process, collector
+
+
+def _bench_kube_exec_single_session(scenario: Scenario) -> Tuple[Callable, object]:
+    collector = _create_kube_exec_collector(scenario, 'single', session=True)
+    return collector.process, collector
+
+
+def _bench_kube_exec_batch_session(scenario: Scenario) -> Tuple[Callable, object]:
+    collector = _create_kube_exec_collector(scenario, 'batch', session=True)
+    return collector.process, collector
+
+
+# The benchmarks by name. Each creates the function running one cycle and the collector providing the exposition
+BENCHMARKS = {
+    'config_load': _bench_config_load,
+    'helper_get_enode_from_url': _bench_helper_get_enode_from_url,
+    'helper_deep_get': _bench_helper_deep_get,
+    'rpc_create_current_metrics': _bench_rpc_create_current_metrics,
+    'rpc_process': _bench_rpc_process,
+    'rpc_process_batch': _bench_rpc_process_batch,
+    'kube_exec_single': _bench_kube_exec_single,
+    'kube_exec_batch': _bench_kube_exec_batch,
+    'kube_exec_batch_latency': _bench_kube_exec_batch_latency,
+    'kube_exec_single_session': _bench_kube_exec_single_session,
+    'kube_exec_batch_session': _bench_kube_exec_batch_session,
+}
+
+
+def _percentile(values: list, percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))]
+
+
+def _measure_exposition(collector) -> dict:
+    """Renders the metrics of the collector in the text format
+
+    Args:
+        collector (_type_): The collector or None
+
+    Returns:
+        dict: The size of the exposition and the time to render it
+    """
+    if collector is None:
+        return {'exposition_bytes': None, 'exposition_gzip_bytes': None, 'exposition_seconds': None}
+    registry = CollectorRegistry(auto_describe=False)
+    registry.register(collector)
+    start = time.perf_counter()
+    body = generate_latest(registry)
+    duration = time.perf_counter() - start
+    return {
+        'exposition_bytes': len(body),
+        'exposition_gzip_bytes': len(gzip.compress(body, compresslevel=6)),
+        'exposition_seconds': duration,
+    }
+
+
+def run_benchmark(name: str, scenario: Scenario, iterations: int) -> dict:
+    """Runs a benchmark. The cycle time is measured without tracing,
+        peak memory and allocations are measured by tracing an additional cycle.
+
+    Args:
+        name (str): The name of the benchmark
+        scenario (Scenario): The load
+        iterations (int): Number of measured cycles
+
+    Returns:
+        dict: The result
+    """
+    cycle, collector = BENCHMARKS[name](scenario)
+    # Warm up, e.g. caches and pools
+    cycle()
+
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        cycle()
+        durations.append(time.perf_counter() - start)
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    cycle()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated_blocks = sys.getallocatedblocks() - blocks_before
+
+    result = {
+        'benchmark': name,
+        'peers': scenario.peers,
+        'rpc_latency': str(scenario.rpc_latency),
+        'exec_latency': str(scenario.exec_latency),
+        'workers': scenario.workers,
+        'iterations': iterations,
+        'cycle_seconds': {
+            'min': min(durations),
+            'median': statistics.median(durations),
+            'p95': _percentile(durations, 95),
+            'max': max(durations),
+        },
+        'peak_memory_bytes': peak_memory,
+        'allocated_blocks': allocated_blocks,
+    }
+    result.update(_measure_exposition(collector))
+    return result
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              check=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_results(filename: str, results: list):
+    """Saves the results with the environment of the run as JSON, the format read by benchmarks.compare
+
+    Args:
+        filename (str): The file
+        results (list): The results, each with the keys benchmark and peers
+    """
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump({
+            'version': RESULTS_VERSION,
+            'meta': {
+                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'git_revision': _git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+            },
+            'results': results,
+        }, file, indent=2)
+    print(f"Results saved to {filename}")
+
+
+def _format_bytes(value) -> str:
+    return '-' if value is None else f'{value / 1024:.1f}K'
+
+
+def main() -> int:
+    """Main
+
+    Returns:
+        int: Return code
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--peers', default='10,100,1000,10000',
+                        help='Comma separated numbers of peers, one scenario each (default: %(default)s)')
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS),
+                        help='Comma separated benchmarks to run (default: all)')
+    parser.add_argument('--iterations', type=int, default=5, help='Measured cycles per scenario (default: %(default)s)')
+    parser.add_argument('--rpc-latency', default='fixed:0.005',
+                        help='Latency of the RPC endpoint: none, fixed:S, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA (default: %(default)s)')
+    parser.add_argument('--exec-latency', default='lognormal:0.002:0.5',
+                        help='Latency of an exec, same format as --rpc-latency (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=8, help='kube_exec.workers in probe mode single (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the generated payloads and latencies (default: %(default)s)')
+    parser.add_argument('--output', help='Save the results as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.ERROR)
+
+    names = [each for each in args.benchmarks.split(',') if each]
+    unknown = [each for each in names if each not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks {', '.join(unknown)}, available: {', '.join(BENCHMARKS)}")
+    try:
+        rpc_latency = LatencyDistribution(args.rpc_latency, args.seed)
+        exec_latency = LatencyDistribution(args.exec_latency, args.seed)
+    except ValueError as ex:
+        parser.error(str(ex))
+
+    # Replace the exec layer of the kube exec collector
+    utils.kube_exec_metrics_collector.stream = StubExec(exec_latency)
+
+    results = []
+    print(f"{'benchmark':<28} {'peers':>6} {'median':>10} {'p95':>10} {'peak mem':>10} {'blocks':>8} {'exposition':>11}")
+    for peers in [int(each) for each in args.peers.split(',') if each]:
+        scenario = Scenario(peers, rpc_latency, exec_latency, args.workers, args.seed)
+        for name in names:
+            result = run_benchmark(name, scenario, args.iterations)
+            results.append(result)
+            print(f"{name:<28} {peers:>6} {result['cycle_seconds']['median'] * 1000:>8.2f}ms "
+                  f"{result['cycle_seconds']['p95'] * 1000:>8.2f}ms {_format_bytes(result['peak_memory_bytes']):>10} "
+                  f"{result['allocated_blocks']:>8} {_format_bytes(result['exposition_bytes']):>11}", flush=True)
+
+    if args.output:
+        save_results(args.output, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
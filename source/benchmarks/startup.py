@@ -0,0 +1,196 @@
+"""Measures the startup time and memory of the exporter with different collectors enabled and saves the results as JSON.
+The startup time is the time from starting the process until the first scrape is served, the memory is the
+resident set size (Linux only) after the collectors have been initialized. The RPC endpoint and the K8S API
+are not available, so neither network latency nor the processing of peers is measured.
+
+Usage (in directory source):
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.compare baseline_startup.json startup.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .payloads import create_config
+from .run import save_results
+
+EXPORTER_PORT = 8000
+
+# The config sections of each benchmark
+SCENARIOS = {
+    'startup_rpc': {'kube_exec': {'enabled': False}},
+    'startup_kube_exec': {},
+    'startup_tcp_probe': {'tcp_probe': {'enabled': True}},
+}
+
+
+def _wait_for_first_scrape(process: subprocess.Popen, timeout: float) -> float:
+    """Scrapes the exporter until the first scrape is served
+
+    Args:
+        process (subprocess.Popen): The exporter process
+        timeout (float): Max. seconds to wait
+
+    Returns:
+        float: Point in time (perf_counter) of the first served scrape or None if not served in time
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and process.poll() is None:
+        connection = http.client.HTTPConnection('127.0.0.1', EXPORTER_PORT, timeout=1.0)
+        try:
+            connection.request('GET', '/metrics')
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                return time.perf_counter()
+        except OSError:
+            time.sleep(0.005)
+        finally:
+            connection.close()
+    return None
+
+
+def _read_rss(pid: int) -> tuple:
+    """Reads the current and the peak resident set size of a process
+
+    Args:
+        pid (int): The process id
+
+    Returns:
+        tuple: The current and the peak resident set size in bytes, None if not available
+    """
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status', 'r', encoding='utf-8') as file:
+            for line in file:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    values[key] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def measure_startup(config_filename: str, settle: float, timeout: float) -> tuple:
+    """Starts the exporter once and measures the startup
+
+    Args:
+        config_filename (str): The config file of the exporter
+        settle (float): Seconds to wait after the first scrape before the memory is measured
+        timeout (float): Max. seconds to wait for the first scrape
+
+    Returns:
+        tuple: Seconds until the first scrape was served, current and peak resident set size in bytes
+    """
+    env = dict(os.environ, CONFIG_FILE=config_filename)
+    start = time.perf_counter()
+    with subprocess.Popen([sys.executable, 'main.py'], env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) as process:
+        try:
+            first_scrape = _wait_for_first_scrape(process, timeout)
+            if first_scrape is None:
+                raise RuntimeError(f"The exporter did not serve a scrape within {timeout}s")
+            time.sleep(settle)
+            rss, peak_rss = _read_rss(process.pid)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    return first_scrape - start, rss, peak_rss
+
+
+def run_scenario(name: str, peers: int, iterations: int, settle: float, timeout: float) -> dict:
+    """Measures the startup of the exporter with the collectors of a scenario
+
+    Args:
+        name (str): The name of the scenario
+        peers (int): Number of configured peers
+        iterations (int): Number of starts of the exporter
+        settle (float): Seconds to wait after the first scrape before the memory is measured
+        timeout (float): Max. seconds to wait for the first scrape
+
+    Returns:
+        dict: The result
+    """
+    # Nothing listens on the RPC port, the requests fail immediately
+    config_object = create_config(peers, rpc_url='http://127.0.0.1:1', **SCENARIOS[name])
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_filename = os.path.join(temp_dir, 'config.json')
+        with open(config_filename, 'w', encoding='utf-8') as file:
+            json.dump(config_object, file)
+        measurements = [measure_startup(config_filename, settle, timeout) for _ in range(iterations)]
+
+    durations = [each[0] for each in measurements]
+    rss_values = [each[1] for each in measurements if each[1] is not None]
+    peak_rss_values = [each[2] for each in measurements if each[2] is not None]
+    return {
+        'benchmark': name,
+        'peers': peers,
+        'iterations': iterations,
+        'startup_seconds': {
+            'min': min(durations),
+            'median': statistics.median(durations),
+            'max': max(durations),
+        },
+        'rss_bytes': max(rss_values) if rss_values else None,
+        'peak_rss_bytes': max(peak_rss_values) if peak_rss_values else None,
+    }
+
+
+def _format_bytes(value) -> str:
+    return '-' if value is None else f'{value / 1024 / 1024:.1f}M'
+
+
+def main() -> int:
+    """Main
+
+    Returns:
+        int: Return code, 1 if the exporter did not start in a benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--peers', type=int, default=100, help='Number of configured peers (default: %(default)s)')
+    parser.add_argument('--benchmarks', default=','.join(SCENARIOS),
+                        help='Comma separated benchmarks to run (default: all)')
+    parser.add_argument('--iterations', type=int, default=3, help='Starts of the exporter per benchmark (default: %(default)s)')
+    parser.add_argument('--settle', type=float, default=2.0,
+                        help='Seconds after the first scrape until the memory is measured (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help='Max. seconds to wait for the first scrape (default: %(default)s)')
+    parser.add_argument('--output', help='Save the results as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.ERROR)
+
+    names = [each for each in args.benchmarks.split(',') if each]
+    unknown = [each for each in names if each not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown benchmarks {', '.join(unknown)}, available: {', '.join(SCENARIOS)}")
+
+    results = []
+    failed = False
+    print(f"{'benchmark':<20} {'peers':>6} {'median':>10} {'max':>10} {'rss':>8} {'peak rss':>9}")
+    for name in names:
+        try:
+            result = run_scenario(name, args.peers, args.iterations, args.settle, args.timeout)
+        except RuntimeError as ex:
+            logging.error("%s failed - %s", name, ex)
+            failed = True
+            continue
+        results.append(result)
+        print(f"{name:<20} {args.peers:>6} {result['startup_seconds']['median'] * 1000:>8.1f}ms "
+              f"{result['startup_seconds']['max'] * 1000:>8.1f}ms {_format_bytes(result['rss_bytes']):>8} "
+              f"{_format_bytes(result['peak_rss_bytes']):>9}", flush=True)
+
+    if args.output:
+        save_results(args.output, results)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""Stubs of the HTTP and exec layers with configurable latency, so the collectors run without Quorum and K8S
+"""
+import collections
+import io
+import json
+import math
+import random
+import shlex
+import threading
+import time
+import zlib
+
+import requests
+from requests.adapters import BaseAdapter
+
+# Share of the peers reachable by the stubbed probes
+REACHABLE_SHARE = 0.9
+# Connect latency in nanoseconds reported by the stubbed probes if the connect latency is measured
+STUB_CONNECT_LATENCY_NS = 2000000
+
+
+class LatencyDistribution:
+    """The latency of a stubbed call, parsed from a spec:
+        "none", "fixed:SECONDS", "uniform:MIN:MAX" or "lognormal:MEDIAN:SIGMA"
+    """
+
+    def __init__(self, spec: str, seed: int = 1):
+        self._spec = spec
+        self._random = random.Random(seed)
+        # Stubbed calls may run on multiple threads
+        self._lock = threading.Lock()
+        fields = spec.split(':')
+        self._kind = fields[0]
+        try:
+            self._params = [float(each) for each in fields[1:]]
+        except ValueError as ex:
+            raise ValueError(f"Invalid latency '{spec}'") from ex
+        expected_params = {'none': 0, 'fixed': 1, 'uniform': 2, 'lognormal': 2}.get(self._kind)
+        if expected_params is None or expected_params != len(self._params):
+            raise ValueError(f"Invalid latency '{spec}', use none, fixed:SECONDS, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA")
+
+    def __str__(self) -> str:
+        return self._spec
+
+    def sample(self) -> float:
+        """Get a random latency
+
+        Returns:
+            float: The latency in seconds
+        """
+        if self._kind == 'none':
+            return 0.0
+        if self._kind == 'fixed':
+            return self._params[0]
+        with self._lock:
+            if self._kind == 'uniform':
+                return self._random.uniform(self._params[0], self._params[1])
+            return self._random.lognormvariate(math.log(self._params[0]), self._params[1])
+
+    def sleep(self):
+        """Sleeps for a random latency
+        """
+        latency = self.sample()
+        if latency > 0:
+            time.sleep(latency)
+
+
+def is_reachable(address: str, port: str) -> bool:
+    """Get the stubbed connectivity to a peer, stable for the same address
+
+    Args:
+        address (str): The address of the peer
+        port (str): The port of the peer
+
+    Returns:
+        bool: True if reachable
+    """
+    return zlib.crc32(f'{address}:{port}'.encode('utf-8')) % 1000 < REACHABLE_SHARE * 1000
+
+
+class StubRpcAdapter(BaseAdapter):
+    """Transport adapter of a requests session answering JSON-RPC requests and batches
+        with pre-encoded results after a random latency
+    """
+
+    def __init__(self, method_results: dict, latency: LatencyDistribution):
+        super().__init__()
+        self._method_results = method_results
+        self._latency = latency
+
+    def _frame(self, request_object: dict) -> bytes:
+        """Creates the response of a single request
+
+        Args:
+            request_object (dict): The request
+
+        Returns:
+            bytes: The response
+        """
+        request_id = json.dumps(request_object.get('id')).encode('utf-8')
+        result = self._method_results.get(request_object.get('method'))
+        if result is None:
+            return b'{"jsonrpc":"2.0","id":' + request_id + b',"error":{"code":-32601,"message":"method not found"}}'
+        return b'{"jsonrpc":"2.0","id":' + request_id + b',"result":' + result + b'}'
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):  # pylint: disable=W0613,R0917
+        self._latency.sleep()
+        request_object = json.loads(request.body)
+        if isinstance(request_object, list):
+            content = b'[' + b','.join(self._frame(each) for each in request_object) + b']'
+        else:
+            content = self._frame(request_object)
+
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response.raw = io.BytesIO(content)
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def create_probe_output(command: list) -> str:
+    """Creates the output of a probe command of the kube exec collector
+
+    Args:
+        command (list): The command, e.g. ['/bin/sh', '-c', 'nc -z -w 1 1.2.3.4 30303;echo -n $?']
+
+    Returns:
+        str: The output
+    """
+    script = command[-1]
+    if script.startswith('nc '):
+        # Probe mode single: nc -z -w 1 ADDRESS PORT;echo -n $?
+        fields = shlex.split(script.split(';')[0])
+        return '0' if is_reachable(fields[-2], fields[-1]) else '1'
+
+    # Probe mode batch: one line "probe INDEX ADDRESS PORT &" per peer.
+    # With connect latency, "probe INDEX ADDRESS PORT SAMPLES" followed by "&" in probe mode batch.
+    lines = []
+    for line in script.splitlines():
+        fields = [each for each in shlex.split(line) if each != '&']
+        if len(fields) in (4, 5) and fields[0] == 'probe':
+            lines.append(_create_probe_output_line(fields))
+    return '\n'.join(lines)
+
+
+def _create_probe_output_line(fields: list) -> str:
+    """Creates the output of a call of the probe shell function
+
+    Args:
+        fields (list): The fields of the call, e.g. ['probe', '0', '1.2.3.4', '30303']
+
+    Returns:
+        str: The output line "INDEX EXIT_CODE [NANOSECONDS...]"
+    """
+    reachable = is_reachable(fields[2], fields[3])
+    latencies = ''
+    if len(fields) == 5 and reachable:
+        latencies = f' {STUB_CONNECT_LATENCY_NS}' * int(fields[4])
+    return f'{fields[1]} {0 if reachable else 1}{latencies}'
+
+
+def create_shell_output(script: str) -> str:
+    """Creates the output of a script written to the shell of an exec session of the kube exec collector:
+        the probe calls and the echo of the end marker
+
+    Args:
+        script (str): The script
+
+    Returns:
+        str: The output, each line terminated by a line feed
+    """
+    lines = []
+    for line in script.splitlines():
+        fields = [each for each in shlex.split(line) if each != '&']
+        if len(fields) in (4, 5) and fields[0] == 'probe':
+            lines.append(_create_probe_output_line(fields) + '\n')
+        elif len(fields) > 0 and fields[0] == 'echo':
+            lines.append(' '.join(fields[1:]) + '\n')
+    return ''.join(lines)
+
+
+class StubExecStream:
+    """Replaces the exec stream of a shell session (see kubernetes.stream.ws_client.WSClient),
+        answers the scripts written to stdin without latency
+    """
+
+    def __init__(self):
+        self._lines = collections.deque()
+        self._open = True
+
+    def is_open(self) -> bool:
+        """True until closed
+
+        Returns:
+            bool: True if open
+        """
+        return self._open
+
+    def write_stdin(self, data: str):
+        """Runs a script
+
+        Args:
+            data (str): The script
+        """
+        self._lines.extend(create_shell_output(data).splitlines())
+
+    def readline_stdout(self, timeout: float = None) -> str:  # pylint: disable=W0613
+        """Reads a line of the output
+
+        Args:
+            timeout (float, optional): Ignored, the output is available at once
+
+        Returns:
+            str: The line or None if there is no more output
+        """
+        return self._lines.popleft() if self._lines else None
+
+    def read_all(self) -> str:
+        """Drops the remaining output
+
+        Returns:
+            str: The remaining output
+        """
+        output = '\n'.join(self._lines)
+        self._lines.clear()
+        return output
+
+    def close(self):
+        """Closes the stream
+        """
+        self._open = False
+
+
+class StubExec:  # pylint: disable=R0903
+    """Replaces kubernetes.stream.stream, answers the probe commands of the kube exec collector after a random latency.
+        A shell session costs the latency once when opened.
+    """
+
+    def __init__(self, latency: LatencyDistribution):
+        self._latency = latency
+
+    def __call__(self, api_method, name: str, namespace: str, command: list, **kwargs):  # pylint: disable=W0613
+        self._latency.sleep()
+        if kwargs.get('_preload_content') is False:
+            return StubExecStream()
+        return create_probe_output(command)
+
+
+class StubPodWatcher:  # pylint: disable=R0903
+    """Replaces the PodWatcher with a fixed pod name
+    """
+
+    def __init__(self, pod_name: str):
+        self.pod_name = pod_name
+        self.last_sync_time = time.time()
@@ -1,19 +1,73 @@
 """Main program
 """
 import logging
+import os
 import signal
 import sys
 import threading
 
-from prometheus_client import start_http_server
-from prometheus_client.core import REGISTRY
+from prometheus_client.core import REGISTRY, CollectorRegistry
 
 import utils.config
-from utils.kube_exec_metrics_collector import KubeExecMetricsCollector
-from utils.rpc_metrics_collector import RpcMetricsCollector
+from utils.config_watcher import ConfigWatcher
+from utils.exposition_cache import ExpositionCache
+from utils.exposition_server import start_exposition_server
+from utils.multi_node_collector import MultiNodeCollector
+from utils.on_demand_refresher import OnDemandRefresher
+from utils.scheduler import Scheduler
+from utils.snapshot import SnapshotStore
 
 
-def main() -> int:
+def _import_collector_class(collector_name: str) -> type:
+    """Imports the class of a collector when enabled only, so the dependencies of disabled collectors
+        (e.g. the kubernetes client of kube_exec) are neither loaded nor required
+
+    Args:
+        collector_name (str): Name of the collector, 'rpc', 'kube_exec' or 'tcp_probe'
+
+    Returns:
+        type: The class of the collector
+    """
+    # pylint: disable=C0415
+    if collector_name == 'rpc':
+        from utils.rpc_metrics_collector import RpcMetricsCollector
+        return RpcMetricsCollector
+    if collector_name == 'tcp_probe':
+        from utils.tcp_probe_metrics_collector import TcpProbeMetricsCollector
+        return TcpProbeMetricsCollector
+    from utils.kube_exec_metrics_collector import KubeExecMetricsCollector
+    return KubeExecMetricsCollector
+
+
+def _create_collectors(config: utils.config.Config, node: utils.config.NodeConfig) -> list:
+    """Creates the enabled collectors of a Quorum node. The TCP egress connectivity is either probed
+        by the exporter itself running as sidecar in the Quorum pod, by "kubectl exec" in the Quorum pod or not at all.
+
+    Args:
+        config (utils.config.Config): The config
+        node (utils.config.NodeConfig): The Quorum node
+
+    Returns:
+        list: Tuples of collector name, collector and schedule
+    """
+    collectors = []
+    rpc_metrics_collector = None
+    if config.rpc.enabled:
+        rpc_metrics_collector = _import_collector_class('rpc')(config, node)
+        collectors.append(('rpc', rpc_metrics_collector, config.rpc.schedule))
+
+    egress_collector_name = config.egress_collector
+    if egress_collector_name is not None:
+        egress_metrics_collector = _import_collector_class(egress_collector_name)(
+            config, node,
+            outbound_connected_enodes=None if rpc_metrics_collector is None else
+            lambda collector=rpc_metrics_collector: collector.outbound_connected_enodes)
+        egress_schedule = config.tcp_probe.schedule if egress_collector_name == 'tcp_probe' else config.kube_exec.schedule
+        collectors.append((egress_collector_name, egress_metrics_collector, egress_schedule))
+    return collectors
+
+
+def main() -> int:  # pylint: disable=R0914
     """Main
 
     Returns:
@@ -23,32 +77,65 @@ def main() -> int:
         format='%(levelname)s: %(message)s', level=logging.INFO)
 
     # Load Config
-    sleep_time = 10.0
-    config = utils.config.load()
+    config_filename = os.environ.get('CONFIG_FILE', 'config.json')
+    config = utils.config.load(config_filename)
     if config is None:
         return 1
+    config_watcher = ConfigWatcher(config_filename, config)
+
+    # Graceful and fast shutdown
+    quit_event = threading.Event()
 
-    # Init MetricsProviders and register CustomCollectors
-    rpc_metrics_collector = RpcMetricsCollector(config)
-    REGISTRY.register(rpc_metrics_collector)
+    # Init MetricsProviders for each node and register a single CustomCollector for all nodes.
+    # Each MetricsProvider is processed on its own schedule.
+    # The metrics are rendered once each time a MetricsProvider has new metrics, not on every scrape.
+    # The exporter metrics of the default registry are rendered on every scrape, so they are always current.
+    multi_node_collector = MultiNodeCollector()
+    collector_registry = CollectorRegistry()
+    exposition_cache = ExpositionCache(collector_registry, live_registry=REGISTRY)
+    scheduler = Scheduler(quit_event)
+    # In on demand mode the collectors are processed on scrape instead of on their schedule
+    on_demand_refresher = None
+    if config.on_demand.enabled:
+        on_demand_refresher = OnDemandRefresher(config.on_demand.max_age, config.on_demand.soft_deadline)
+    # Persists the last good state, restored on startup
+    snapshot_store = SnapshotStore(config.snapshot.file, config.snapshot.max_age) if config.snapshot.enabled else None
+    collector_registry.register(multi_node_collector)
 
-    kube_exec_metrics_collector = KubeExecMetricsCollector(config)
-    REGISTRY.register(kube_exec_metrics_collector)
+    # Start up the server to expose the metrics before the collectors are initialized.
+    # Until then the scrapes are served with the exporter metrics only.
+    start_exposition_server(8000, exposition_cache, on_demand_refresher=on_demand_refresher)
 
-    # Start up the server to expose the metrics.
-    start_http_server(8000)
+    for each_node in config.nodes:
+        collectors = _create_collectors(config, each_node)
+        for collector_name, collector, schedule in collectors:
+            collector.add_listener(exposition_cache.refresh)
+            config_watcher.add_listener(collector.update_peers)
+            if snapshot_store is not None:
+                snapshot_store.add_collector(collector_name, each_node.instance_name, collector)
+            if on_demand_refresher is not None:
+                on_demand_refresher.add_job(collector_name, each_node.instance_name, collector.process)
+            else:
+                scheduler.add_job(collector_name, each_node.instance_name, collector.process, schedule)
+        multi_node_collector.add_node(each_node.instance_name, [collector for _, collector, _ in collectors])
+
+    # Reload changed peers without restart
+    scheduler.add_job('config', '', config_watcher.check, config.config_reload)
+
+    # Serve the metrics of the previous run (marked as stale) until the collectors have fresh data
+    if snapshot_store is not None:
+        snapshot_store.restore()
+        scheduler.add_job('snapshot', '', snapshot_store.save, config.snapshot.schedule)
+    exposition_cache.refresh()
 
-    # Graceful and fast shutdown
-    quit_event = threading.Event()
     # https://stackoverflow.com/questions/862412/is-it-possible-to-have-multiple-statements-in-a-python-lambda-expression
     signal.signal(signal.SIGTERM,
                   lambda *_args: (logging.info("SIGTERM received") and False) or quit_event.set())
-    while not quit_event.is_set():
-        logging.info("Preparing metrics")
-        rpc_metrics_collector.process()
-        kube_exec_metrics_collector.process()
-        logging.info("Done. Sleeping for %s seconds", sleep_time)
-        quit_event.wait(timeout=sleep_time)
+    scheduler.start()
+    quit_event.wait()
+    scheduler.join(timeout=5.0)
+    if snapshot_store is not None:
+        snapshot_store.save()
 
     logging.info("Leaving - quit_event.is_set()=%s", quit_event.is_set())
     return 0
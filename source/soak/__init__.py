@@ -0,0 +1,2 @@
+"""Soak test of the exporter against a fake Quorum node and a fake K8S API, run with python -m soak.run
+"""
@@ -0,0 +1,446 @@
+"""Fake Kubernetes API serving the deployment, pods list/watch and the exec websocket used by the kube exec collector
+"""
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import re
+import struct
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.stubs import LatencyDistribution, create_probe_output, create_shell_output
+
+# Magic value of the websocket handshake, see RFC 6455
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+# Websocket opcodes
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+# Channels of the K8S exec protocol
+STDIN_CHANNEL = 0
+STDOUT_CHANNEL = 1
+ERROR_CHANNEL = 3
+
+DEPLOYMENT_PATH = re.compile(r'^/apis/apps/v1/namespaces/([^/]+)/deployments/([^/]+)$')
+PODS_PATH = re.compile(r'^/api/v1/namespaces/([^/]+)/pods$')
+EXEC_PATH = re.compile(r'^/api/v1/namespaces/([^/]+)/pods/([^/]+)/exec$')
+
+
+def _websocket_frame(opcode: int, payload: bytes) -> bytes:
+    """Creates an unmasked websocket frame as sent by a server
+
+    Args:
+        opcode (int): The opcode
+        payload (bytes): The payload
+
+    Returns:
+        bytes: The frame
+    """
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 65536:
+        header += bytes([126]) + struct.pack('!H', len(payload))
+    else:
+        header += bytes([127]) + struct.pack('!Q', len(payload))
+    return header + payload
+
+
+def _read_websocket_frame(rfile) -> tuple:
+    """Reads a (masked) websocket frame as sent by a client. Fragmented messages are not supported.
+
+    Args:
+        rfile (_type_): The stream
+
+    Returns:
+        tuple: The opcode and the payload, None if the connection was closed
+    """
+    header = rfile.read(2)
+    if len(header) < 2:
+        return None
+    opcode = header[0] & 0x0f
+    length = header[1] & 0x7f
+    if length == 126:
+        length = struct.unpack('!H', rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', rfile.read(8))[0]
+    mask = rfile.read(4) if header[1] & 0x80 else bytes(4)
+    payload = rfile.read(length)
+    if len(payload) < length:
+        return None
+    return opcode, bytes(each ^ mask[index % 4] for index, each in enumerate(payload))
+
+
+def _pod_not_found_status(pod_name: str) -> dict:
+    """Creates the exit status of an exec in a pod which does not exist (anymore)
+
+    Args:
+        pod_name (str): The pod name
+
+    Returns:
+        dict: The status
+    """
+    return {'metadata': {}, 'status': 'Failure', 'reason': 'NotFound', 'message': f'pod {pod_name} not found'}
+
+
+class FakeKubeApiRequestHandler(BaseHTTPRequestHandler):
+    """Serves the K8S API endpoints used by the exporter
+    """
+
+    def _send_json(self, status: int, body_object):
+        body = json.dumps(body_object).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Handles a GET request
+        """
+        fake_kube_api = self.server.fake_kube_api
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+
+        match = DEPLOYMENT_PATH.match(url.path)
+        if match:
+            self._send_json(200, fake_kube_api.get_deployment(match.group(1), match.group(2)))
+            return
+
+        match = PODS_PATH.match(url.path)
+        if match and query.get('watch', ['false'])[0].lower() in ('true', '1'):
+            self._watch_pods(fake_kube_api, int(query.get('timeoutSeconds', ['300'])[0]))
+            return
+        if match:
+            self._send_json(200, fake_kube_api.list_pods())
+            return
+
+        match = EXEC_PATH.match(url.path)
+        if match and self.headers.get('Upgrade', '').lower() == 'websocket':
+            if query.get('stdin', ['false'])[0].lower() in ('true', '1'):
+                self._exec_session(fake_kube_api, match.group(2))
+            else:
+                self._exec(fake_kube_api, match.group(2), query.get('command', []))
+            return
+
+        self._send_json(404, {'kind': 'Status', 'apiVersion': 'v1', 'status': 'Failure',
+                              'reason': 'NotFound', 'code': 404})
+
+    def _watch_pods(self, fake_kube_api, timeout_seconds: int):
+        """Streams the pod events until the timeout, sends a bookmark if idle.
+            Each event is a chunk, otherwise the client reads until the connection closes.
+
+        Args:
+            fake_kube_api (FakeKubeApi): The fake API
+            timeout_seconds (int): The timeout of the watch
+        """
+        self.protocol_version = 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        deadline = time.monotonic() + timeout_seconds
+        events = fake_kube_api.subscribe()
+        try:
+            while time.monotonic() < deadline:
+                event = events.get(timeout=min(fake_kube_api.bookmark_interval, max(0.0, deadline - time.monotonic())))
+                if event is None:
+                    event = {'type': 'BOOKMARK', 'object': {
+                        'kind': 'Pod', 'apiVersion': 'v1', 'metadata': {'resourceVersion': fake_kube_api.resource_version}}}
+                line = json.dumps(event).encode('utf-8') + b'\n'
+                self.wfile.write(f'{len(line):x}\r\n'.encode('ascii') + line + b'\r\n')
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+        except OSError:
+            pass
+        finally:
+            fake_kube_api.unsubscribe(events)
+
+    def _upgrade(self):
+        """Upgrades to a websocket of the K8S exec protocol
+        """
+        key = self.headers.get('Sec-WebSocket-Key', '')
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.send_header('Sec-WebSocket-Protocol', 'v4.channel.k8s.io')
+        self.end_headers()
+        self.close_connection = True
+
+    def _exit(self, status: dict):
+        """Sends the exit status of the command and closes the websocket
+
+        Args:
+            status (dict): The status
+        """
+        self.wfile.write(_websocket_frame(OPCODE_BINARY, bytes([ERROR_CHANNEL]) + json.dumps(status).encode('utf-8')))
+        self.wfile.write(_websocket_frame(OPCODE_CLOSE, struct.pack('!H', 1000)))
+        self.wfile.flush()
+
+    def _exec(self, fake_kube_api, pod_name: str, command: list):
+        """Upgrades to a websocket and answers the probe command on the K8S exec channels
+
+        Args:
+            fake_kube_api (FakeKubeApi): The fake API
+            pod_name (str): The pod name
+            command (list): The command
+        """
+        self._upgrade()
+        fake_kube_api.count_exec()
+        fake_kube_api.exec_latency.sleep()
+        if pod_name == fake_kube_api.pod_name:
+            output = create_probe_output(command)
+            status = {'metadata': {}, 'status': 'Success'}
+        else:
+            output = ''
+            status = _pod_not_found_status(pod_name)
+        try:
+            if output:
+                self.wfile.write(_websocket_frame(OPCODE_BINARY, bytes([STDOUT_CHANNEL]) + output.encode('utf-8')))
+            self._exit(status)
+        except OSError:
+            pass
+
+    def _exec_session(self, fake_kube_api, pod_name: str):
+        """Upgrades to a websocket and answers the scripts written to stdin like a shell
+            until the client closes the websocket or the pod is replaced
+
+        Args:
+            fake_kube_api (FakeKubeApi): The fake API
+            pod_name (str): The pod name
+        """
+        self._upgrade()
+        fake_kube_api.count_exec()
+        fake_kube_api.exec_latency.sleep()
+        # Incomplete last line of the received input
+        pending = ''
+        try:
+            while True:
+                frame = _read_websocket_frame(self.rfile)
+                if frame is None or frame[0] == OPCODE_CLOSE:
+                    return
+                if pod_name != fake_kube_api.pod_name:
+                    break
+                opcode, payload = frame
+                if opcode not in (OPCODE_TEXT, OPCODE_BINARY) or payload[:1] != bytes([STDIN_CHANNEL]):
+                    continue
+                pending += payload[1:].decode('utf-8')
+                complete, _, pending = pending.rpartition('\n')
+                output = create_shell_output(complete)
+                if output:
+                    self.wfile.write(_websocket_frame(OPCODE_BINARY, bytes([STDOUT_CHANNEL]) + output.encode('utf-8')))
+                    self.wfile.flush()
+            # The shell is gone with the pod
+            self._exit(_pod_not_found_status(pod_name))
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        """Do not log requests
+        """
+
+
+class _EventQueue:
+    """Pod events of a single watch
+    """
+
+    def __init__(self):
+        self._events = []
+        self._condition = threading.Condition()
+
+    def put(self, event: dict):
+        """Adds an event
+
+        Args:
+            event (dict): The event
+        """
+        with self._condition:
+            self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout: float) -> dict:
+        """Get the next event
+
+        Args:
+            timeout (float): Max. seconds to wait
+
+        Returns:
+            dict: The event or None on timeout
+        """
+        with self._condition:
+            if not self._events:
+                self._condition.wait(timeout=timeout)
+            return self._events.pop(0) if self._events else None
+
+
+class FakeKubeApi:  # pylint: disable=R0902
+    """Fake K8S API with a single deployment. The pod of the deployment is replaced periodically (rollout).
+    """
+
+    def __init__(self, namespace: str, deployment: str, exec_latency: LatencyDistribution,
+                 *, rollout_interval: float = None, bookmark_interval: float = 10.0):
+        self.exec_latency = exec_latency
+        self.bookmark_interval = bookmark_interval
+        self._namespace = namespace
+        self._deployment = deployment
+        self._rollout_interval = rollout_interval
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._resource_version = 1
+        self._generation = 0
+        self._pod = self._create_pod()
+        self._exec_calls = 0
+        self._server = None
+        self._stop_event = threading.Event()
+
+    @property
+    def pod_name(self) -> str:
+        """The name of the current pod
+
+        Returns:
+            str: The pod name
+        """
+        return self._pod['metadata']['name']
+
+    @property
+    def resource_version(self) -> str:
+        """The current resource version
+
+        Returns:
+            str: The resource version
+        """
+        return str(self._resource_version)
+
+    @property
+    def exec_calls(self) -> int:
+        """Number of execs served
+
+        Returns:
+            int: The number of execs
+        """
+        return self._exec_calls
+
+    def count_exec(self):
+        """Counts an exec
+        """
+        with self._lock:
+            self._exec_calls += 1
+
+    def _create_pod(self) -> dict:
+        self._generation += 1
+        self._resource_version += 1
+        return {
+            'apiVersion': 'v1',
+            'kind': 'Pod',
+            'metadata': {
+                'name': f'{self._deployment}-{self._generation:05d}',
+                'namespace': self._namespace,
+                'labels': {'app': self._deployment},
+                'creationTimestamp': datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'resourceVersion': str(self._resource_version),
+            },
+            'spec': {'containers': [{'name': 'quorum', 'image': 'quorum'}]},
+            'status': {'phase': 'Running', 'conditions': [{'type': 'Ready', 'status': 'True'}]},
+        }
+
+    def get_deployment(self, namespace: str, name: str) -> dict:
+        """Get the deployment
+
+        Args:
+            namespace (str): The namespace
+            name (str): The name
+
+        Returns:
+            dict: The deployment
+        """
+        return {
+            'apiVersion': 'apps/v1',
+            'kind': 'Deployment',
+            'metadata': {'name': name, 'namespace': namespace},
+            'spec': {
+                'selector': {'matchLabels': {'app': name}},
+                'template': {'metadata': {'labels': {'app': name}},
+                             'spec': {'containers': [{'name': 'quorum', 'image': 'quorum'}]}},
+            },
+        }
+
+    def list_pods(self) -> dict:
+        """Lists the pods of the deployment
+
+        Returns:
+            dict: The pod list
+        """
+        with self._lock:
+            return {'apiVersion': 'v1', 'kind': 'PodList',
+                    'metadata': {'resourceVersion': str(self._resource_version)}, 'items': [self._pod]}
+
+    def subscribe(self) -> _EventQueue:
+        """Subscribes to the pod events
+
+        Returns:
+            _EventQueue: The queue receiving the events
+        """
+        events = _EventQueue()
+        with self._lock:
+            self._subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events: _EventQueue):
+        """Unsubscribes from the pod events
+
+        Args:
+            events (_EventQueue): The queue returned by subscribe()
+        """
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+
+    def rollout(self):
+        """Replaces the pod by a new one
+        """
+        with self._lock:
+            old_pod = self._pod
+            self._pod = self._create_pod()
+            for each in self._subscribers:
+                each.put({'type': 'ADDED', 'object': self._pod})
+                each.put({'type': 'DELETED', 'object': old_pod})
+        logging.info("%s >> Rollout - old=%s, new=%s", type(self).__name__,
+                     old_pod['metadata']['name'], self._pod['metadata']['name'])
+
+    def _run_rollouts(self):
+        while not self._stop_event.wait(timeout=self._rollout_interval):
+            self.rollout()
+
+    def start(self, port: int = 0) -> int:
+        """Starts serving in a background thread
+
+        Args:
+            port (int, optional): The port, 0 for any free port. Defaults to 0.
+
+        Returns:
+            int: The port
+        """
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), FakeKubeApiRequestHandler)
+        self._server.daemon_threads = True
+        self._server.fake_kube_api = self
+        threading.Thread(target=self._server.serve_forever, name='fake-kube-api', daemon=True).start()
+        if self._rollout_interval:
+            threading.Thread(target=self._run_rollouts, name='fake-kube-rollout', daemon=True).start()
+        logging.info("%s >> Serving on port %s", type(self).__name__, self._server.server_port)
+        return self._server.server_port
+
+    def stop(self):
+        """Stops serving
+        """
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,172 @@
+"""Fake Quorum JSON-RPC endpoint serving admin_peers with peer churn and the node methods
+"""
+import json
+import logging
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.payloads import HEAD_BLOCK, METHOD_RESULTS, create_admin_peers
+from benchmarks.stubs import LatencyDistribution
+
+
+class FakeQuorumRequestHandler(BaseHTTPRequestHandler):
+    """Answers JSON-RPC requests and batches
+    """
+
+    def do_POST(self):  # pylint: disable=C0103
+        """Handles a JSON-RPC request
+        """
+        fake_quorum = self.server.fake_quorum
+        try:
+            request_object = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError:
+            self.send_error(400)
+            return
+
+        fake_quorum.latency.sleep()
+        if isinstance(request_object, list):
+            body = b'[' + b','.join(fake_quorum.respond(each) for each in request_object) + b']'
+        else:
+            body = fake_quorum.respond(request_object)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        """Do not log requests
+        """
+
+
+class FakeQuorum:  # pylint: disable=R0902
+    """Fake Quorum node. On each admin_peers call and each new block a share of the peers disconnects
+        or reconnects (churn).
+    """
+
+    def __init__(self, peers_config: list, churn: float, latency: LatencyDistribution, seed: int = 1):
+        self.latency = latency
+        self._churn = churn
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        admin_peers = create_admin_peers(peers_config, seed)
+        # The encoded admin_peers entry of each peer, connected or not
+        self._encoded_peers = [json.dumps(each).encode('utf-8') for each in admin_peers]
+        self._node_ids = [each['id'] for each in admin_peers]
+        self._connected = [True] * len(self._encoded_peers)
+        self._encoded_results = {method: json.dumps(result).encode('utf-8')
+                                 for method, result in METHOD_RESULTS.items()}
+        self._head_block = HEAD_BLOCK
+        self._admin_peers_calls = 0
+        self._churn_listeners = []
+        self._server = None
+
+    @property
+    def admin_peers_calls(self) -> int:
+        """Number of admin_peers calls served
+
+        Returns:
+            int: The number of calls
+        """
+        return self._admin_peers_calls
+
+    def add_churn_listener(self, listener):
+        """Adds a function called with the list of tuples of node id and connected of the peers changed by the churn
+
+        Args:
+            listener (_type_): The function
+        """
+        self._churn_listeners.append(listener)
+
+    def _apply_churn(self) -> list:
+        """Disconnects or reconnects a share of the peers. Must be called with the lock held.
+
+        Returns:
+            list: Tuples of node id and connected of the changed peers
+        """
+        changes = []
+        for _ in range(int(len(self._connected) * self._churn)):
+            index = self._random.randrange(len(self._connected))
+            self._connected[index] = not self._connected[index]
+            changes.append((self._node_ids[index], self._connected[index]))
+        return changes
+
+    def _notify_churn(self, changes: list):
+        if not changes:
+            return
+        for listener in self._churn_listeners:
+            listener(changes)
+
+    def advance_head(self) -> int:
+        """Adds a new block and applies the churn
+
+        Returns:
+            int: The new head block
+        """
+        with self._lock:
+            self._head_block += 1
+            head_block = self._head_block
+            # Notified with the lock held, so the events of concurrent changes are in order
+            self._notify_churn(self._apply_churn())
+        return head_block
+
+    def _encode_admin_peers(self) -> bytes:
+        """Applies the churn and encodes the connected peers
+
+        Returns:
+            bytes: The result of admin_peers
+        """
+        with self._lock:
+            self._admin_peers_calls += 1
+            self._notify_churn(self._apply_churn())
+            return b'[' + b','.join(encoded for encoded, connected in zip(self._encoded_peers, self._connected)
+                                    if connected) + b']'
+
+
+    def respond(self, request_object) -> bytes:
+        """Creates the response of a single request
+
+        Args:
+            request_object (_type_): The request
+
+        Returns:
+            bytes: The response
+        """
+        if not isinstance(request_object, dict):
+            return b'{"jsonrpc":"2.0","id":null,"error":{"code":-32600,"message":"invalid request"}}'
+        request_id = json.dumps(request_object.get('id')).encode('utf-8')
+        method = request_object.get('method')
+        if method == 'admin_peers':
+            result = self._encode_admin_peers()
+        elif method == 'eth_blockNumber':
+            result = json.dumps(hex(self._head_block)).encode('utf-8')
+        else:
+            result = self._encoded_results.get(method)
+        if result is None:
+            return b'{"jsonrpc":"2.0","id":' + request_id + b',"error":{"code":-32601,"message":"method not found"}}'
+        return b'{"jsonrpc":"2.0","id":' + request_id + b',"result":' + result + b'}'
+
+    def start(self, port: int = 0) -> int:
+        """Starts serving in a background thread
+
+        Args:
+            port (int, optional): The port, 0 for any free port. Defaults to 0.
+
+        Returns:
+            int: The port
+        """
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), FakeQuorumRequestHandler)
+        self._server.daemon_threads = True
+        self._server.fake_quorum = self
+        threading.Thread(target=self._server.serve_forever, name='fake-quorum', daemon=True).start()
+        logging.info("%s >> Serving on port %s", type(self).__name__, self._server.server_port)
+        return self._server.server_port
+
+    def stop(self):
+        """Stops serving
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,304 @@
+"""Fake subscription endpoint of a Quorum node serving eth_subscribe newHeads and admin_subscribe peerEvents
+over websocket and the IPC socket, as the node does on its WS and IPC endpoints
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+from .fake_kube_api import OPCODE_CLOSE, WEBSOCKET_GUID, _read_websocket_frame, _websocket_frame
+from .fake_quorum import FakeQuorum
+
+# Websocket opcodes
+OPCODE_TEXT = 0x1
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xa
+
+
+class _Subscriber:
+    """A connection with its subscriptions. Notifications are sent by the block thread,
+        responses by the thread of the connection.
+    """
+
+    def __init__(self, connection, wfile, websocket: bool):
+        self._connection = connection
+        self._wfile = wfile
+        self._websocket = websocket
+        self._lock = threading.Lock()
+        # Key is the kind of notification, value is the subscription id
+        self.subscriptions = {}
+
+    def send(self, message: bytes):
+        """Sends a response or notification
+
+        Args:
+            message (bytes): The JSON encoded message
+        """
+        with self._lock:
+            if self._websocket:
+                self._wfile.write(_websocket_frame(OPCODE_TEXT, message))
+            else:
+                self._wfile.write(message)
+            self._wfile.flush()
+
+    def send_frame(self, opcode: int, payload: bytes):
+        """Sends a websocket control frame
+
+        Args:
+            opcode (int): The opcode, e.g. pong
+            payload (bytes): The payload
+        """
+        with self._lock:
+            self._wfile.write(_websocket_frame(opcode, payload))
+            self._wfile.flush()
+
+    def close(self):
+        """Closes the connection, the handler of the connection ends
+        """
+        try:
+            self._connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _SubscriptionRequestHandler(socketserver.StreamRequestHandler):
+    """Serves a websocket (with handshake) or an IPC connection
+    """
+
+    def handle(self):
+        fake_server = self.server.fake_subscription_server
+        if self.server.websocket:
+            if not self._handshake():
+                return
+            subscriber = _Subscriber(self.request, self.wfile, True)
+            fake_server.add_subscriber(subscriber)
+            try:
+                self._handle_websocket(fake_server, subscriber)
+            finally:
+                fake_server.remove_subscriber(subscriber)
+        else:
+            subscriber = _Subscriber(self.request, self.wfile, False)
+            fake_server.add_subscriber(subscriber)
+            try:
+                self._handle_ipc(fake_server, subscriber)
+            finally:
+                fake_server.remove_subscriber(subscriber)
+
+    def _handshake(self) -> bool:
+        """Answers the HTTP upgrade request of a websocket
+
+        Returns:
+            bool: True if upgraded
+        """
+        headers = {}
+        request_line = self.rfile.readline()
+        while True:
+            line = self.rfile.readline().decode('latin-1').strip()
+            if not line:
+                break
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+        if not request_line.startswith(b'GET ') or headers.get('upgrade', '').lower() != 'websocket':
+            self.wfile.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+            return False
+        accept = base64.b64encode(hashlib.sha1(
+            (headers.get('sec-websocket-key', '') + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        self.wfile.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                          f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode('ascii'))
+        self.wfile.flush()
+        return True
+
+    def _handle_websocket(self, fake_server, subscriber: _Subscriber):
+        while True:
+            frame = _read_websocket_frame(self.rfile)
+            if frame is None or frame[0] == OPCODE_CLOSE:
+                return
+            opcode, payload = frame
+            if opcode == OPCODE_PING:
+                subscriber.send_frame(OPCODE_PONG, payload)
+            elif opcode == OPCODE_TEXT:
+                subscriber.send(fake_server.respond(subscriber, payload))
+
+    def _handle_ipc(self, fake_server, subscriber: _Subscriber):
+        decoder = json.JSONDecoder()
+        buffer = ''
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                return
+            buffer = (buffer + data.decode('utf-8')).lstrip()
+            while buffer:
+                try:
+                    request_object, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    break
+                buffer = buffer[end:].lstrip()
+                subscriber.send(fake_server.respond(subscriber, json.dumps(request_object).encode('utf-8')))
+
+
+class _WebSocketServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    websocket = True
+
+
+class _IpcServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    websocket = False
+
+
+class FakeSubscriptionServer:  # pylint: disable=R0902
+    """Fake subscription endpoint of a FakeQuorum. A new block is added every block interval,
+        the peers changed by the churn are notified as peer events.
+    """
+
+    def __init__(self, fake_quorum: FakeQuorum, block_interval: float, peer_events: bool = True):
+        self._fake_quorum = fake_quorum
+        self._block_interval = block_interval
+        self._peer_events = peer_events
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._next_subscription_id = 1
+        self._notifications = 0
+        self._stop_event = threading.Event()
+        self._servers = []
+        fake_quorum.add_churn_listener(self._notify_peer_events)
+
+    @property
+    def notifications(self) -> int:
+        """Number of notifications sent
+
+        Returns:
+            int: The number of notifications
+        """
+        return self._notifications
+
+    def add_subscriber(self, subscriber: _Subscriber):
+        """Adds a connection
+
+        Args:
+            subscriber (_Subscriber): The connection
+        """
+        with self._lock:
+            self._subscribers.append(subscriber)
+
+    def remove_subscriber(self, subscriber: _Subscriber):
+        """Removes a closed connection
+
+        Args:
+            subscriber (_Subscriber): The connection
+        """
+        with self._lock:
+            self._subscribers.remove(subscriber)
+
+    def respond(self, subscriber: _Subscriber, request: bytes) -> bytes:
+        """Creates the response of a request, subscribes or passes the request to the fake Quorum node
+
+        Args:
+            subscriber (_Subscriber): The connection
+            request (bytes): The JSON-RPC request
+
+        Returns:
+            bytes: The response
+        """
+        try:
+            request_object = json.loads(request)
+        except ValueError:
+            return b'{"jsonrpc":"2.0","id":null,"error":{"code":-32700,"message":"parse error"}}'
+        if not isinstance(request_object, dict):
+            return self._fake_quorum.respond(request_object)
+
+        kind = None
+        method, params = request_object.get('method'), request_object.get('params')
+        if method == 'eth_subscribe' and params == ['newHeads']:
+            kind = 'newHeads'
+        elif method == 'admin_subscribe' and params == ['peerEvents'] and self._peer_events:
+            kind = 'peerEvents'
+        elif method in ('eth_subscribe', 'admin_subscribe'):
+            return json.dumps({'jsonrpc': '2.0', 'id': request_object.get('id'),
+                               'error': {'code': -32601, 'message': f'no such subscription {params}'}}).encode('utf-8')
+        else:
+            return self._fake_quorum.respond(request_object)
+
+        with self._lock:
+            subscription_id = hex(self._next_subscription_id)
+            self._next_subscription_id += 1
+            subscriber.subscriptions[kind] = subscription_id
+        return json.dumps({'jsonrpc': '2.0', 'id': request_object.get('id'), 'result': subscription_id}).encode('utf-8')
+
+    def _notify(self, kind: str, method: str, results: list):
+        """Sends notifications to all connections subscribed to a kind
+
+        Args:
+            kind (str): The kind of notification
+            method (str): eth_subscription or admin_subscription
+            results (list): The result of each notification
+        """
+        with self._lock:
+            subscribers = [(each, each.subscriptions[kind]) for each in self._subscribers if kind in each.subscriptions]
+        for subscriber, subscription_id in subscribers:
+            try:
+                for result in results:
+                    subscriber.send(json.dumps({'jsonrpc': '2.0', 'method': method,
+                                                'params': {'subscription': subscription_id, 'result': result}})
+                                    .encode('utf-8'))
+                    self._notifications += 1
+            except (OSError, ValueError):
+                # Closed meanwhile, removed by its handler
+                pass
+
+    def _notify_peer_events(self, changes: list):
+        self._notify('peerEvents', 'admin_subscription',
+                     [{'type': 'add' if connected else 'drop', 'peer': node_id} for node_id, connected in changes])
+
+    def _run_blocks(self):
+        while not self._stop_event.wait(self._block_interval):
+            head_block = self._fake_quorum.advance_head()
+            self._notify('newHeads', 'eth_subscription', [{
+                'number': hex(head_block),
+                'hash': '0x' + hashlib.sha256(str(head_block).encode('ascii')).hexdigest(),
+                'parentHash': '0x' + hashlib.sha256(str(head_block - 1).encode('ascii')).hexdigest(),
+            }])
+
+    def start(self, port: int = 0, ipc_path: str = None) -> int:
+        """Starts serving and adding blocks in background threads
+
+        Args:
+            port (int, optional): The port of the websocket, 0 for any free port. Defaults to 0.
+            ipc_path (str, optional): The path of the IPC socket. Defaults to no IPC socket.
+
+        Returns:
+            int: The port of the websocket
+        """
+        websocket_server = _WebSocketServer(('127.0.0.1', port), _SubscriptionRequestHandler)
+        self._servers.append(websocket_server)
+        if ipc_path is not None:
+            # A socket left by a previous run, as the node does
+            if os.path.exists(ipc_path):
+                os.unlink(ipc_path)
+            self._servers.append(_IpcServer(ipc_path, _SubscriptionRequestHandler))
+        for each in self._servers:
+            each.fake_subscription_server = self
+            threading.Thread(target=each.serve_forever, name='fake-subscription', daemon=True).start()
+        threading.Thread(target=self._run_blocks, name='fake-blocks', daemon=True).start()
+        logging.info("%s >> Serving on port %s, IPC socket %s",
+                     type(self).__name__, websocket_server.server_address[1], ipc_path)
+        return websocket_server.server_address[1]
+
+    def stop(self):
+        """Stops serving and adding blocks, closes the open connections
+        """
+        self._stop_event.set()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for each in subscribers:
+            each.close()
+        for each in self._servers:
+            each.shutdown()
+            each.server_close()
+            if isinstance(each, _IpcServer) and os.path.exists(each.server_address):
+                os.unlink(each.server_address)
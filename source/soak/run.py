@@ -0,0 +1,463 @@
+"""Runs the exporter against a fake Quorum RPC endpoint and a fake K8S API while concurrent scrapers
+request the metrics, reports scrape latency, refresh staleness and memory of the exporter over time
+
+Usage (in directory source):
+    python -m soak.run --peers 1000 --duration 600 --scrapers 20 --output soak.json
+    python -m soak.run --peers 1000 --duration 600 --subscription ipc --block-interval 1
+"""
+import argparse
+import datetime
+import gzip
+import http.client
+import json
+import logging
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.payloads import create_config
+from benchmarks.stubs import LatencyDistribution
+
+from .fake_kube_api import FakeKubeApi
+from .fake_quorum import FakeQuorum
+from .fake_subscription_server import FakeSubscriptionServer
+
+# The port of the exporter
+EXPORTER_PORT = 8000
+NAMESPACE = 'quorum'
+DEPLOYMENT = 'quorum-node-0'
+
+LAST_SUCCESS_PATTERN = re.compile(
+    r'^quorum_exporter_last_success_timestamp_seconds\{collector="([^"]*)",instance_name="([^"]*)"\} (\S+)$',
+    re.MULTILINE)
+
+
+def _percentile(values: list, percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))]
+
+
+class ScrapeStatistics:
+    """Scrape latencies and errors of all scrapers, collected per report interval
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = []
+        self._errors = 0
+        self._last_body = None
+
+    def add(self, latency: float, body: bytes):
+        """Adds a successful scrape
+
+        Args:
+            latency (float): The latency in seconds
+            body (bytes): The decompressed body
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            self._last_body = body
+
+    def add_error(self):
+        """Adds a failed scrape
+        """
+        with self._lock:
+            self._errors += 1
+
+    def take(self) -> tuple:
+        """Get and reset the statistics of the current interval
+
+        Returns:
+            tuple: The latencies, the number of errors and the last body
+        """
+        with self._lock:
+            result = (self._latencies, self._errors, self._last_body)
+            self._latencies = []
+            self._errors = 0
+            return result
+
+
+def _scrape(use_gzip: bool, statistics: ScrapeStatistics):
+    """Scrapes the metrics once
+
+    Args:
+        use_gzip (bool): Request the gzip encoding
+        statistics (ScrapeStatistics): Receives the result
+    """
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', EXPORTER_PORT, timeout=10.0)
+    try:
+        connection.request('GET', '/metrics', headers={'Accept-Encoding': 'gzip'} if use_gzip else {})
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            statistics.add_error()
+            return
+        latency = time.perf_counter() - start
+        if response.getheader('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        statistics.add(latency, body)
+    except (OSError, http.client.HTTPException):
+        statistics.add_error()
+    finally:
+        connection.close()
+
+
+def _run_scraper(interval: float, use_gzip: bool, statistics: ScrapeStatistics, stop_event: threading.Event):
+    """Scrapes the metrics until stopped
+
+    Args:
+        interval (float): Seconds between the scrapes, 0 for back to back
+        use_gzip (bool): Request the gzip encoding
+        statistics (ScrapeStatistics): Receives the results
+        stop_event (threading.Event): Stops scraping
+    """
+    while not stop_event.is_set():
+        start = time.monotonic()
+        _scrape(use_gzip, statistics)
+        stop_event.wait(timeout=max(0.0, interval - (time.monotonic() - start)))
+
+
+def get_staleness(body: bytes, now: float) -> dict:
+    """Get the seconds since the last successful refresh of each collector from the exposition
+
+    Args:
+        body (bytes): The exposition in the text format
+        now (float): The current time in seconds since epoch
+
+    Returns:
+        dict: Key is the collector, value is the max. staleness of all nodes in seconds
+    """
+    staleness = {}
+    if body is None:
+        return staleness
+    for collector, _, value in LAST_SUCCESS_PATTERN.findall(body.decode('utf-8', errors='replace')):
+        staleness[collector] = max(staleness.get(collector, 0.0), now - float(value))
+    return staleness
+
+
+def get_rss_bytes(pid: int) -> int:
+    """Get the resident set size of a process
+
+    Args:
+        pid (int): The process id
+
+    Returns:
+        int: The RSS in bytes or None if unknown, e.g. not on Linux
+    """
+    try:
+        with open(f'/proc/{pid}/status', 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1.0):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def _write_files(directory: str, args, rpc_port: int, kube_api_port: int, subscription_url: str = None) -> dict:
+    """Writes the config of the exporter and the kubeconfig of the fake K8S API
+
+    Args:
+        directory (str): The directory
+        args (_type_): The arguments
+        rpc_port (int): The port of the fake Quorum RPC endpoint
+        kube_api_port (int): The port of the fake K8S API
+        subscription_url (str, optional): The subscription URL of the fake Quorum node. Defaults to polling only.
+
+    Returns:
+        dict: The environment variables of the exporter
+    """
+    config_object = create_config(args.peers, args.seed,
+                                  rpc={'interval': args.interval},
+                                  kube_exec={'interval': args.interval, 'probe_mode': args.probe_mode,
+                                             'workers': args.workers, 'session': args.session})
+    config_object.update(namespace=NAMESPACE, deployment=DEPLOYMENT, rpc_url=f'http://127.0.0.1:{rpc_port}')
+    if args.on_demand_max_age is not None:
+        config_object['on_demand'] = {'enabled': True, 'max_age': args.on_demand_max_age}
+    if args.connect_latency_samples > 0:
+        config_object['connect_latency'] = {'enabled': True, 'samples': args.connect_latency_samples}
+    if subscription_url is not None:
+        config_object['subscription_url'] = subscription_url
+    config_filename = os.path.join(directory, 'config.json')
+    with open(config_filename, 'w', encoding='utf-8') as file:
+        json.dump(config_object, file)
+
+    # JSON is valid YAML
+    kubeconfig_filename = os.path.join(directory, 'kubeconfig')
+    with open(kubeconfig_filename, 'w', encoding='utf-8') as file:
+        json.dump({
+            'apiVersion': 'v1',
+            'kind': 'Config',
+            'clusters': [{'name': 'soak', 'cluster': {'server': f'http://127.0.0.1:{kube_api_port}'}}],
+            'users': [{'name': 'soak', 'user': {'token': 'soak'}}],
+            'contexts': [{'name': 'soak', 'context': {'cluster': 'soak', 'user': 'soak', 'namespace': NAMESPACE}}],
+            'current-context': 'soak',
+        }, file)
+
+    return dict(os.environ, CONFIG_FILE=config_filename, KUBECONFIG=kubeconfig_filename, PYTHONUNBUFFERED='1')
+
+
+def _create_sample(elapsed: float, statistics: ScrapeStatistics, interval: float, pid: int) -> dict:
+    """Creates a sample of the current report interval
+
+    Args:
+        elapsed (float): Seconds since the start
+        statistics (ScrapeStatistics): The scrape statistics, reset by this call
+        interval (float): Seconds of the report interval
+        pid (int): The process id of the exporter
+
+    Returns:
+        dict: The sample
+    """
+    latencies, errors, body = statistics.take()
+    return {
+        'elapsed_seconds': round(elapsed, 1),
+        'scrapes': len(latencies),
+        'scrapes_per_second': len(latencies) / interval,
+        'errors': errors,
+        'latency_seconds': {
+            'p50': _percentile(latencies, 50),
+            'p95': _percentile(latencies, 95),
+            'p99': _percentile(latencies, 99),
+            'max': max(latencies),
+        } if latencies else None,
+        'staleness_seconds': get_staleness(body, time.time()),
+        'rss_bytes': get_rss_bytes(pid),
+    }
+
+
+def _print_sample(sample: dict):
+    latency = sample['latency_seconds']
+    latencies = ' '.join(f"{latency[each] * 1000:>8.1f}ms" for each in ('p50', 'p95', 'p99')) if latency \
+        else f"{'-':>10} {'-':>10} {'-':>10}"
+    staleness = ','.join(f'{key}={value:.1f}s' for key, value in sorted(sample['staleness_seconds'].items())) or '-'
+    rss = '-' if sample['rss_bytes'] is None else f"{sample['rss_bytes'] / 1024 / 1024:.1f}M"
+    print(f"{sample['elapsed_seconds']:>8.1f} {sample['scrapes_per_second']:>9.1f} {latencies} "
+          f"{sample['errors']:>7} {rss:>8}  {staleness}", flush=True)
+
+
+def _create_summary(samples: list) -> dict:
+    """Summarizes the samples of a run
+
+    Args:
+        samples (list): The samples
+
+    Returns:
+        dict: The summary
+    """
+    staleness = {}
+    for sample in samples:
+        for collector, value in sample['staleness_seconds'].items():
+            staleness[collector] = max(staleness.get(collector, 0.0), value)
+    rss = [each['rss_bytes'] for each in samples if each['rss_bytes'] is not None]
+    return {
+        'scrapes': sum(each['scrapes'] for each in samples),
+        'errors': sum(each['errors'] for each in samples),
+        'max_p99_latency_seconds': max((each['latency_seconds']['p99'] for each in samples if each['latency_seconds']),
+                                       default=None),
+        'max_staleness_seconds': staleness,
+        'rss_bytes': {'first': rss[0], 'last': rss[-1], 'max': max(rss)} if rss else None,
+    }
+
+
+def _save_results(filename: str, arguments: dict, summary: dict, samples: list):
+    """Saves the results of a run as JSON
+
+    Args:
+        filename (str): The file
+        arguments (dict): The arguments of the run
+        summary (dict): The summary
+        samples (list): The samples
+    """
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump({
+            'meta': {
+                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'arguments': arguments,
+            },
+            'summary': summary,
+            'samples': samples,
+        }, file, indent=2)
+    logging.info("Results saved to %s", filename)
+
+
+def run(args, env: dict) -> list:
+    """Runs the exporter and the scrapers, reports a sample each report interval
+
+    Args:
+        args (_type_): The arguments
+        env (dict): The environment variables of the exporter
+
+    Returns:
+        list: The samples or None if the exporter did not start
+    """
+    source_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, 'main.py'], cwd=source_dir, env=env)  # pylint: disable=R1732
+    samples = []
+    stop_event = threading.Event()
+    scrapers = []
+    try:
+        if not _wait_for_port(EXPORTER_PORT, process, timeout=30.0):
+            logging.error("Exporter did not start listening on port %s", EXPORTER_PORT)
+            return None
+
+        statistics = ScrapeStatistics()
+        for index in range(args.scrapers):
+            scraper = threading.Thread(target=_run_scraper, name=f'scraper-{index}', daemon=True,
+                                       args=(args.scrape_interval, args.gzip, statistics, stop_event))
+            scraper.start()
+            scrapers.append(scraper)
+
+        print(f"{'elapsed':>8} {'scrapes/s':>9} {'p50':>10} {'p95':>10} {'p99':>10} {'errors':>7} {'rss':>8}  staleness")
+        start = time.monotonic()
+        next_report = start + args.report_interval
+        while next_report <= start + args.duration and process.poll() is None:
+            time.sleep(max(0.0, next_report - time.monotonic()))
+            sample = _create_sample(time.monotonic() - start, statistics, args.report_interval, process.pid)
+            samples.append(sample)
+            _print_sample(sample)
+            next_report += args.report_interval
+        if process.poll() is not None:
+            logging.error("Exporter exited early - returncode=%s", process.returncode)
+    finally:
+        stop_event.set()
+        for each in scrapers:
+            each.join(timeout=15.0)
+        if process.poll() is None:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=15.0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+    return samples
+
+
+def _start_fake_subscription_server(args, fake_quorum: FakeQuorum, directory: str) -> tuple:
+    """Starts the fake subscription endpoint of the fake Quorum node
+
+    Args:
+        args (_type_): The arguments
+        fake_quorum (FakeQuorum): The fake Quorum node
+        directory (str): The directory of the IPC socket
+
+    Returns:
+        tuple: The fake subscription endpoint and the subscription URL of the exporter
+    """
+    # The admin API, thus the peer events, is usually enabled on the IPC socket only
+    fake_subscription_server = FakeSubscriptionServer(fake_quorum, args.block_interval,
+                                                      peer_events=args.subscription == 'ipc')
+    ipc_path = os.path.join(directory, 'geth.ipc')
+    port = fake_subscription_server.start(ipc_path=ipc_path)
+    return fake_subscription_server, ipc_path if args.subscription == 'ipc' else f'ws://127.0.0.1:{port}'
+
+
+def _create_argument_parser() -> argparse.ArgumentParser:
+    """Creates the parser of the command line arguments
+
+    Returns:
+        argparse.ArgumentParser: The parser
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--peers', type=int, default=1000, help='Number of configured peers (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=300.0, help='Seconds to run (default: %(default)s)')
+    parser.add_argument('--scrapers', type=int, default=10, help='Number of concurrent scrapers (default: %(default)s)')
+    parser.add_argument('--scrape-interval', type=float, default=0.0,
+                        help='Seconds between the scrapes of each scraper, 0 for back to back (default: %(default)s)')
+    parser.add_argument('--gzip', action='store_true', help='Request gzip compressed metrics')
+    parser.add_argument('--churn', type=float, default=0.01,
+                        help='Share of the peers disconnecting or reconnecting on each admin_peers call (default: %(default)s)')
+    parser.add_argument('--rpc-latency', default='lognormal:0.02:0.5',
+                        help='Latency of the RPC endpoint: none, fixed:S, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA (default: %(default)s)')
+    parser.add_argument('--exec-latency', default='lognormal:0.05:0.5',
+                        help='Latency of an exec, same format as --rpc-latency (default: %(default)s)')
+    parser.add_argument('--rollout-interval', type=float,
+                        help='Seconds between the replacements of the Quorum pod (default: never)')
+    parser.add_argument('--probe-mode', choices=('single', 'batch'), default='batch',
+                        help='kube_exec.probe_mode (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=8, help='kube_exec.workers in probe mode single (default: %(default)s)')
+    parser.add_argument('--session', action='store_true',
+                        help='kube_exec.session, probe in long living shell sessions instead of an exec per probe')
+    parser.add_argument('--connect-latency-samples', type=int, default=0,
+                        help='connect_latency.samples, 0 does not measure the connect latency (default: %(default)s)')
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help='rpc.interval and kube_exec.interval of the exporter (default: %(default)s)')
+    parser.add_argument('--subscription', choices=('ws', 'ipc'),
+                        help='Subscribe to the head and peer events of the fake Quorum node (default: polling only)')
+    parser.add_argument('--block-interval', type=float, default=1.0,
+                        help='Seconds between the new heads of the fake Quorum node, each applies the churn (default: %(default)s)')
+    parser.add_argument('--on-demand-max-age', type=float,
+                        help='Run the exporter in on demand mode with this on_demand.max_age (default: on schedule)')
+    parser.add_argument('--report-interval', type=float, default=10.0, help='Seconds per reported sample (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the generated payloads and latencies (default: %(default)s)')
+    parser.add_argument('--output', help='Save the samples and the summary as JSON to this file')
+    return parser
+
+
+def main() -> int:
+    """Main
+
+    Returns:
+        int: Return code
+    """
+    parser = _create_argument_parser()
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
+
+    config_object = create_config(args.peers, args.seed)
+    try:
+        fake_quorum = FakeQuorum(config_object['peers'], args.churn,
+                                 LatencyDistribution(args.rpc_latency, args.seed), args.seed)
+        fake_kube_api = FakeKubeApi(NAMESPACE, DEPLOYMENT, LatencyDistribution(args.exec_latency, args.seed),
+                                    rollout_interval=args.rollout_interval)
+    except ValueError as ex:
+        parser.error(str(ex))
+    rpc_port = fake_quorum.start()
+    kube_api_port = fake_kube_api.start()
+    fake_subscription_server = None
+    try:
+        with tempfile.TemporaryDirectory(prefix='soak-') as directory:
+            subscription_url = None
+            if args.subscription is not None:
+                fake_subscription_server, subscription_url = _start_fake_subscription_server(
+                    args, fake_quorum, directory)
+            samples = run(args, _write_files(directory, args, rpc_port, kube_api_port, subscription_url))
+            if fake_subscription_server is not None:
+                fake_subscription_server.stop()
+    finally:
+        fake_quorum.stop()
+        fake_kube_api.stop()
+    if not samples:
+        return 1
+
+    summary = _create_summary(samples)
+    summary.update(admin_peers_calls=fake_quorum.admin_peers_calls, exec_calls=fake_kube_api.exec_calls)
+    if fake_subscription_server is not None:
+        summary.update(notifications=fake_subscription_server.notifications)
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        _save_results(args.output, vars(args), summary, samples)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
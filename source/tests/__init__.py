@@ -0,0 +1,2 @@
+"""Tests of the exporter, run from source/ with python -m unittest discover -s tests -t .
+"""
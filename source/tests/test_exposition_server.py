@@ -0,0 +1,124 @@
+"""Tests of the conditional scrapes of the exposition server
+"""
+import unittest
+import urllib.error
+import urllib.request
+
+from prometheus_client import parser
+from prometheus_client.core import REGISTRY, CollectorRegistry, GaugeMetricFamily
+from prometheus_client.openmetrics import parser as openmetrics_parser
+
+from utils.exporter_metrics import ERRORS
+from utils.exposition_cache import ExpositionCache
+from utils.exposition_server import start_exposition_server
+
+
+class _StaticCollector:  # pylint: disable=R0903
+    """Collects a gauge with a value changed by the test only
+    """
+
+    def __init__(self):
+        self.value = 1.0
+
+    def collect(self):
+        """Collects the gauge
+
+        Returns:
+            Iterable[Metric]: The gauge
+        """
+        gauge = GaugeMetricFamily('test_value', 'Value set by the test')
+        gauge.add_metric([], self.value)
+        yield gauge
+
+
+def _get_sample_value(body: bytes, accept: str, name: str, labels: dict) -> float:
+    """Parses the value of a sample from the scraped metrics
+
+    Args:
+        body (bytes): The scraped metrics
+        accept (str): The Accept header of the scrape
+        name (str): The sample name
+        labels (dict): The sample labels
+
+    Returns:
+        float: The value or None if missing
+    """
+    text_parser = openmetrics_parser if accept else parser
+    for metric_family in text_parser.text_string_to_metric_families(body.decode('utf-8')):
+        for sample in metric_family.samples:
+            if sample.name == name and sample.labels == labels:
+                return sample.value
+    return None
+
+
+class ExpositionServerTest(unittest.TestCase):
+    """Scrapes a server with the collectors cached and the default registry rendered on every scrape
+    """
+
+    def setUp(self):
+        self.collector = _StaticCollector()
+        registry = CollectorRegistry()
+        registry.register(self.collector)
+        self.exposition_cache = ExpositionCache(registry, live_registry=REGISTRY)
+        self.server = start_exposition_server(0, self.exposition_cache, addr='127.0.0.1')
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/metrics'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _scrape(self, etag: str = None, accept: str = None):
+        """Scrapes the server
+
+        Args:
+            etag (str, optional): The If-None-Match header. Defaults to None.
+            accept (str, optional): The Accept header. Defaults to None.
+
+        Returns:
+            Tuple[int, str, bytes]: The status, the ETag and the body
+        """
+        request = urllib.request.Request(self.url)
+        if etag is not None:
+            request.add_header('If-None-Match', etag)
+        if accept is not None:
+            request.add_header('Accept', accept)
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status, response.headers['ETag'], response.read()
+        except urllib.error.HTTPError as ex:
+            return ex.code, ex.headers['ETag'], b''
+
+    def test_not_modified_without_refresh(self):
+        """A scrape with the ETag of the previous one gets 304 unless the collectors have been refreshed,
+            changes of the metrics of the default registry do not count
+        """
+        errors = ERRORS.labels('test', 'test', 'test')
+        for accept in (None, 'application/openmetrics-text'):
+            status, etag, body = self._scrape(accept=accept)
+            self.assertEqual(status, 200)
+            self.assertIn(f'test_value {self.collector.value}'.encode('ascii'), body)
+            self.assertIn(b'process_cpu_seconds_total', body)
+
+            errors.inc()
+            status, not_modified_etag, _ = self._scrape(etag, accept=accept)
+            self.assertEqual(status, 304)
+            self.assertEqual(not_modified_etag, etag)
+
+            # Rendered on every scrape nevertheless
+            status, unconditional_etag, body = self._scrape(accept=accept)
+            self.assertEqual(status, 200)
+            self.assertEqual(unconditional_etag, etag)
+            labels = {'collector': 'test', 'type': 'test', 'instance_name': 'test'}
+            self.assertEqual(_get_sample_value(body, accept, 'quorum_exporter_errors_total', labels),
+                             REGISTRY.get_sample_value('quorum_exporter_errors_total', labels))
+
+            self.collector.value += 1
+            self.exposition_cache.refresh()
+            status, refreshed_etag, body = self._scrape(etag, accept=accept)
+            self.assertEqual(status, 200)
+            self.assertNotEqual(refreshed_etag, etag)
+            self.assertIn(f'test_value {self.collector.value}'.encode('ascii'), body)
+
+
+if __name__ == '__main__':
+    unittest.main()
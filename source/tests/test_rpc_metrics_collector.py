@@ -0,0 +1,65 @@
+"""Tests of the peer metrics of the RPC collector
+"""
+import json
+import unittest
+
+from benchmarks.stubs import LatencyDistribution, StubRpcAdapter
+from utils.config import Config
+from utils.rpc_metrics_collector import RpcMetricsCollector
+
+HEAD_BLOCK = 1000
+ENODE = 'a' * 128
+
+
+class RpcMetricsCollectorTest(unittest.TestCase):
+    """Polls a stubbed JSON-RPC endpoint serving a node at HEAD_BLOCK
+    """
+
+    def setUp(self):
+        config = Config()
+        self.assertTrue(config.load({
+            'namespace': 'quorum',
+            'deployment': 'quorum-node-0',
+            'rpc_url': 'http://quorum-node-0-rpc.quorum:8545',
+            'rpc': {'methods': ['eth_blockNumber'], 'retries': 0},
+            'peers': [{'company-name': 'company', 'enode': ENODE,
+                       'enodeAddress': '10.0.0.1', 'enodeAddressPort': '30303'}],
+        }))
+        self.collector = RpcMetricsCollector(config, config.nodes[0])
+        # The encoded results by method, replaced by each poll
+        self.method_results = {}
+        adapter = StubRpcAdapter(self.method_results, LatencyDistribution('none'))
+        self.collector._rpc_client._session.mount('http://', adapter)  # pylint: disable=W0212
+
+    def _poll_lag(self, total_difficulty: int) -> dict:
+        """Polls a node at HEAD_BLOCK with the peer reporting the total difficulty
+
+        Args:
+            total_difficulty (int): The total difficulty of the peer
+
+        Returns:
+            dict: The lag by protocol
+        """
+        self.method_results['eth_blockNumber'] = json.dumps(hex(HEAD_BLOCK)).encode('utf-8')
+        self.method_results['admin_peers'] = json.dumps([{
+            'enode': f'enode://{ENODE}@10.0.0.1:30303?discport=0',
+            'id': 'b' * 64,
+            'network': {'inbound': False},
+            'protocols': {'eth': {'version': 65, 'difficulty': total_difficulty},
+                          'istanbul': {'version': 100, 'difficulty': total_difficulty}},
+        }]).encode('utf-8')
+        self.collector.process()
+        return {sample.labels['protocol']: sample.value
+                for metric in self.collector.collect() if metric.name == 'quorum_peers_head_block_lag'
+                for sample in metric.samples}
+
+    def test_head_block_lag(self):
+        """Under IBFT/QBFT a peer at the same head reports the total difficulty head + 1, i.e. lag 0
+        """
+        self.assertEqual(self._poll_lag(HEAD_BLOCK + 1), {'eth': 0, 'istanbul': 0})
+        self.assertEqual(self._poll_lag(HEAD_BLOCK - 4), {'eth': 5, 'istanbul': 5})
+        self.assertEqual(self._poll_lag(HEAD_BLOCK + 3), {'eth': -2, 'istanbul': -2})
+
+
+if __name__ == '__main__':
+    unittest.main()
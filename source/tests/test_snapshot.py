@@ -0,0 +1,71 @@
+"""Tests of restoring the snapshot file
+"""
+import gzip
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from utils.snapshot import SNAPSHOT_VERSION, SnapshotStore
+
+
+class _Collector:  # pylint: disable=R0903
+    """Keeps the restored snapshot
+    """
+
+    def __init__(self):
+        self.snapshot = None
+
+    def restore_snapshot(self, snapshot: dict):
+        """Keeps the snapshot
+
+        Args:
+            snapshot (dict): The snapshot
+        """
+        self.snapshot = snapshot
+
+
+class SnapshotStoreTest(unittest.TestCase):
+    """Restores snapshot files written by the test
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.addCleanup(directory.cleanup)
+        self.collector = _Collector()
+        self.filename = os.path.join(directory.name, 'snapshot.json.gz')
+        self.store = SnapshotStore(self.filename, max_age=600)
+        self.store.add_collector('rpc', 'node-0', self.collector)
+
+    def _restore(self, timestamp) -> int:
+        """Writes a snapshot with the timestamp and restores it
+
+        Args:
+            timestamp (_type_): The timestamp of the snapshot
+
+        Returns:
+            int: Number of restored collectors
+        """
+        snapshot_object = {'version': SNAPSHOT_VERSION, 'timestamp': timestamp,
+                           'collectors': {'rpc/node-0': {'peers': []}}}
+        with open(self.filename, 'wb') as file:
+            file.write(gzip.compress(json.dumps(snapshot_object).encode('utf-8')))
+        return self.store.restore()
+
+    def test_invalid_timestamp_ignored(self):
+        """A snapshot without a numeric timestamp is ignored instead of failing the startup
+        """
+        for timestamp in (None, 'yesterday', True, [1]):
+            self.assertEqual(self._restore(timestamp), 0)
+        self.assertIsNone(self.collector.snapshot)
+
+    def test_restore(self):
+        """A recent snapshot is restored
+        """
+        self.assertEqual(self._restore(time.time()), 1)
+        self.assertEqual(self.collector.snapshot, {'peers': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
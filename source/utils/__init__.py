@@ -0,0 +1,2 @@
+"""Collectors, configuration and exposition of the Quorum peers exporter
+"""
@@ -0,0 +1,98 @@
+"""Extraction of the peer fields used for metrics from the result of admin_peers
+"""
+from .json_stream import JsonStreamReader
+
+
+class PeerInfo:  # pylint: disable=R0903
+    """The fields of a connected peer used for metrics
+    """
+
+    __slots__ = ('enode_url', 'inbound', 'eth_difficulty', 'istanbul_difficulty', 'node_id')
+
+    def __init__(self, enode_url: str = None, inbound: bool = None,
+                 eth_difficulty=None, istanbul_difficulty=None, node_id: str = None):
+        self.enode_url = enode_url
+        self.inbound = inbound
+        self.eth_difficulty = eth_difficulty
+        self.istanbul_difficulty = istanbul_difficulty
+        # The node id (hash of the public key) identifying the peer in the peer events
+        self.node_id = node_id
+
+
+def read_peers(reader: JsonStreamReader) -> list:
+    """Reads the result of admin_peers and extracts the fields of each peer while the response arrives.
+        All other fields of a peer, e.g. caps, are skipped.
+
+    Args:
+        reader (JsonStreamReader): The reader positioned at the result
+
+    Returns:
+        list: List of PeerInfo
+    """
+    if reader.peek() != '[':
+        # e.g. null
+        reader.skip_value()
+        return []
+
+    peers = []
+    for _ in reader.iter_array():
+        if reader.peek() != '{':
+            reader.skip_value()
+            continue
+        peer = PeerInfo()
+        for key in reader.iter_object():
+            if key == 'enode':
+                peer.enode_url = reader.read_value()
+            elif key == 'id':
+                peer.node_id = reader.read_value()
+            elif key == 'network':
+                _read_network(reader, peer)
+            elif key == 'protocols':
+                _read_protocols(reader, peer)
+            else:
+                reader.skip_value()
+        peers.append(peer)
+    return peers
+
+
+def _read_network(reader: JsonStreamReader, peer: PeerInfo):
+    """Reads network.inbound
+
+    Args:
+        reader (JsonStreamReader): The reader positioned at the network object
+        peer (PeerInfo): The peer to set the fields
+    """
+    if reader.peek() != '{':
+        reader.skip_value()
+        return
+    for key in reader.iter_object():
+        if key == 'inbound':
+            peer.inbound = reader.read_value()
+        else:
+            reader.skip_value()
+
+
+def _read_protocols(reader: JsonStreamReader, peer: PeerInfo):
+    """Reads protocols.eth.difficulty and protocols.istanbul.difficulty
+
+    Args:
+        reader (JsonStreamReader): The reader positioned at the protocols object
+        peer (PeerInfo): The peer to set the fields
+    """
+    if reader.peek() != '{':
+        reader.skip_value()
+        return
+    for protocol in reader.iter_object():
+        # The protocol is a string, e.g. "handshake", until the handshake is done
+        if protocol not in ('eth', 'istanbul') or reader.peek() != '{':
+            reader.skip_value()
+            continue
+        for key in reader.iter_object():
+            if key == 'difficulty':
+                difficulty = reader.read_value()
+                if protocol == 'eth':
+                    peer.eth_difficulty = difficulty
+                else:
+                    peer.istanbul_difficulty = difficulty
+            else:
+                reader.skip_value()
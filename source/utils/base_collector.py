@@ -0,0 +1,62 @@
+"""Base class of the Prometheus metrics collectors
+"""
+from typing import Callable, Iterable
+
+from prometheus_client.core import Metric
+from prometheus_client.registry import Collector
+
+
+class BaseCollector(Collector):
+    """Provides the current metrics and notifies listeners when the current metrics have been replaced.
+    """
+
+    def __init__(self):
+        # The current metrics to be reported on a Prometheus scrape.
+        # We cannot use "default" Gauge as the values remain even if the peer does not exist anymore
+        # Therefore we set fresh metrics every time we collect peers information.
+        self._current_metrics = []
+        self._listeners = []
+
+    def collect(self) -> Iterable[Metric]:
+        """Get the current metrics. Implementation of the Collector
+
+        Returns:
+            Iterable[Metric]: The current metrics
+        """
+        return self._current_metrics
+
+    def add_listener(self, listener: Callable[[], None]):
+        """Adds a listener called after the current metrics have been replaced
+
+        Args:
+            listener (Callable[[], None]): The listener
+        """
+        self._listeners.append(listener)
+
+    def get_snapshot(self) -> dict:
+        """Get the last good state to persist, restored by restore_snapshot() after a restart.
+            Collectors without state to persist return None.
+
+        Returns:
+            dict: The state, must be serializable as JSON, or None if there is no good state yet
+        """
+        return None
+
+    def restore_snapshot(self, snapshot: dict):  # pylint: disable=W0613
+        """Restores the state of get_snapshot() of a previous run. The restored metrics are marked as stale
+            until they are replaced by the first successful processing.
+
+        Args:
+            snapshot (dict): The state
+        """
+
+    def _set_current_metrics(self, metrics: list):
+        """Set current metrics to be reported by CustomCollector in a single atomic operation
+            and notify the listeners.
+
+        Args:
+            metrics (list): The new current metrics
+        """
+        self._current_metrics = metrics
+        for each_listener in self._listeners:
+            each_listener()
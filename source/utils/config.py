@@ -1,19 +1,35 @@
 """This module contains the Config and loading procedures for the config
 
 """
+# pylint: disable=C0302
 import logging
 import json
+import os
+import re
+from collections import Counter
 
+from .helper import Helper
 
-class Config:
+
+class Config:  # pylint: disable=R0902
     """Encapsulates the application configuration.
     """
 
     def __init__(self):
-        self._rpc_url = None
-        self._namespace = None
-        self._deployment = None
+        self._nodes = []
         self._peers = {}
+        # Key is the enode of a node, value is the tuple of the configured peers and the peers except the node
+        self._node_peers = {}
+        self._config_reload = ScheduleConfig()
+        self._rpc = RpcConfig()
+        self._kube_exec = KubeExecConfig()
+        self._tcp_probe = TcpProbeConfig()
+        self._snapshot = SnapshotConfig()
+        self._on_demand = OnDemandConfig()
+        self._sharding = ShardingConfig()
+        self._dns = DnsConfig()
+        self._connect_latency = ConnectLatencyConfig()
+        self._subscription = SubscriptionConfig()
 
     def load(self, config_object) -> bool:
         """Load the config from an object
@@ -24,38 +40,82 @@ class Config:
         Returns:
             bool: True if successful else False
         """
-        self._rpc_url = None
-        self._namespace = None
-        self._deployment = None
+        self._nodes = []
         self._peers = {}
+        # Key is the enode of a node, value is the tuple of the configured peers and the peers except the node
+        self._node_peers = {}
+        self._config_reload = ScheduleConfig()
+        self._rpc = RpcConfig()
+        self._kube_exec = KubeExecConfig()
+        self._tcp_probe = TcpProbeConfig()
+        self._snapshot = SnapshotConfig()
+        self._on_demand = OnDemandConfig()
+        self._sharding = ShardingConfig()
+        self._dns = DnsConfig()
+        self._connect_latency = ConnectLatencyConfig()
+        self._subscription = SubscriptionConfig()
 
         if config_object is None:
             logging.error("'config_object' not set.")
             return False
 
-        self._rpc_url = config_object.get('rpc_url')
-        if not self._rpc_url:
-            logging.error(
-                "'rpc_url' is not set in config. E.g. 'rpc_url': 'http://quorum-node-0.quorum:8545'")
+        # Loaded first as the K8S deployment of a node is only required by the kube_exec collector
+        if not self._tcp_probe.load(config_object.get('tcp_probe', {})) \
+                or not self._kube_exec.load(config_object.get('kube_exec', {})):
             return False
 
-        self._namespace = config_object.get('namespace')
-        if not self._namespace:
-            logging.error(
-                "'namespace' is not set in config. E.g. 'namespace': 'quorum'")
+        # Either a list of Quorum nodes to monitor or a single node defined at top level
+        nodes = config_object.get('nodes')
+        if nodes is None:
+            nodes = [config_object]
+        if not nodes:
+            logging.error("'nodes' must contain at least one node.")
             return False
 
-        self._deployment = config_object.get('deployment')
-        if not self._deployment:
-            logging.error(
-                "'deployment' is not set in config. E.g. 'deployment': 'quorum'")
+        for each in nodes:
+            node = NodeConfig()
+            if not node.load(each, deployment_required=self.egress_collector == 'kube_exec'):
+                return False
+            if any(existing.instance_name == node.instance_name for existing in self._nodes):
+                logging.error("'instance_name' must be unique but '%s' is used multiple times.",
+                              node.instance_name)
+                return False
+            self._nodes.append(node)
+
+        if not self._load_peers(config_object.get('peers')):
+            return False
+
+        if not self._config_reload.load(config_object.get('config_reload', {}), 'config_reload'):
+            return False
+
+        # The optional sections, loading stops at the first invalid section
+        sections = ((self._rpc, 'rpc'), (self._snapshot, 'snapshot'), (self._on_demand, 'on_demand'),
+                    (self._sharding, 'sharding'), (self._dns, 'dns'), (self._connect_latency, 'connect_latency'),
+                    (self._subscription, 'subscription'))
+        if not all(section.load(config_object.get(name, {})) for section, name in sections):
             return False
 
-        peers = config_object.get('peers')
+        if not self._rpc.enabled and self.egress_collector is None:
+            logging.error("At least one of 'rpc.enabled', 'kube_exec.enabled' and 'tcp_probe.enabled' must be true.")
+            return False
+        return True
+
+    def _load_peers(self, peers) -> bool:
+        """Load the peers
+
+        Args:
+            peers (_type_): the list of peer objects
+
+        Returns:
+            bool: True if successful else False
+        """
         if not peers:
             logging.error("'peers' is not set in config.")
             return False
 
+        # Number of peers by company name, built in a single pass
+        count_by_company_name = Counter(each.get('company-name') for each in peers)
+
         for each in peers:
             enode = each.get('enode')
             company_name = each.get('company-name')
@@ -68,26 +128,23 @@ class Config:
                 return False
 
             # Check if company_name is unique. If not, use company_name plus first 5 chars of enode
-            count_same_company_name = len(list(filter(
-                lambda peer: peer['company-name'] == company_name, peers)))  # pylint: disable=W0640
             name = None
-            if count_same_company_name > 1:
+            if count_by_company_name[company_name] > 1:
                 name = company_name + " (" + enode[0:5] + ")"
             else:
                 name = company_name
 
             self._peers[enode] = PeerConfig(name, enode, address, port)
-
         return True
 
     @property
-    def rpc_url(self) -> str:
-        """The RPC URL
+    def nodes(self) -> list:
+        """The Quorum nodes to monitor
 
         Returns:
-            str: The RPC URL
+            list: List of NodeConfig
         """
-        return self._rpc_url
+        return self._nodes
 
     @property
     def peers(self) -> dict:
@@ -98,6 +155,213 @@ class Config:
         """
         return self._peers
 
+    def get_peers(self, node: 'NodeConfig') -> dict:
+        """Get the peers expected to be connected to a node, i.e. all peers except the node itself
+
+        Args:
+            node (NodeConfig): The node
+
+        Returns:
+            dict: Key is the enode, value is of type PeerConfig
+        """
+        peers = self._peers
+        if node.enode is None or node.enode not in peers:
+            return peers
+        # Computed once per dictionary of configured peers, so the result can be cached by identity, e.g. by the shard
+        configured_peers, node_peers = self._node_peers.get(node.enode, (None, None))
+        if configured_peers is not peers:
+            node_peers = {enode: peer for enode, peer in peers.items() if enode != node.enode}
+            self._node_peers[node.enode] = (peers, node_peers)
+        return node_peers
+
+    def replace_peers(self, peers: dict):
+        """Replaces the peers in a single atomic operation, e.g. on config reload
+
+        Args:
+            peers (dict): dictionary of peers. Key is the enode, value is of type PeerConfig
+        """
+        self._peers = peers
+
+    @property
+    def config_reload(self) -> 'ScheduleConfig':
+        """The schedule of checking the config file for changes
+
+        Returns:
+            ScheduleConfig: The schedule
+        """
+        return self._config_reload
+
+    @property
+    def rpc(self) -> 'RpcConfig':
+        """The settings of the RPC client
+
+        Returns:
+            RpcConfig: Settings of the RPC client
+        """
+        return self._rpc
+
+    @property
+    def kube_exec(self) -> 'KubeExecConfig':
+        """The settings of the kube exec connectivity probes
+
+        Returns:
+            KubeExecConfig: Settings of the kube exec connectivity probes
+        """
+        return self._kube_exec
+
+    @property
+    def tcp_probe(self) -> 'TcpProbeConfig':
+        """Settings of the TCP probes executed by the exporter itself (sidecar mode)
+
+        Returns:
+            TcpProbeConfig: The settings
+        """
+        return self._tcp_probe
+
+    @property
+    def snapshot(self) -> 'SnapshotConfig':
+        """Settings of the snapshot of the last good state restored on startup
+
+        Returns:
+            SnapshotConfig: The settings
+        """
+        return self._snapshot
+
+    @property
+    def on_demand(self) -> 'OnDemandConfig':
+        """Settings of refreshing the metrics on scrape instead of on a schedule
+
+        Returns:
+            OnDemandConfig: The settings
+        """
+        return self._on_demand
+
+    @property
+    def egress_collector(self) -> str:
+        """The collector checking the TCP egress connectivity to the peers. The exporter itself probes the peers
+            if "tcp_probe" is enabled, otherwise "kubectl exec" in the Quorum pod does unless "kube_exec" is disabled.
+
+        Returns:
+            str: 'tcp_probe', 'kube_exec' or None if the TCP egress connectivity is not checked
+        """
+        if self._tcp_probe.enabled:
+            return 'tcp_probe'
+        if self._kube_exec.enabled:
+            return 'kube_exec'
+        return None
+
+    @property
+    def dns(self) -> 'DnsConfig':
+        """Settings of resolving the host names of the peers
+
+        Returns:
+            DnsConfig: The settings
+        """
+        return self._dns
+
+    @property
+    def connect_latency(self) -> 'ConnectLatencyConfig':
+        """Settings of measuring the TCP connect latency of the egress connectivity checks
+
+        Returns:
+            ConnectLatencyConfig: The settings
+        """
+        return self._connect_latency
+
+    @property
+    def sharding(self) -> 'ShardingConfig':
+        """Settings of distributing the TCP egress connectivity checks across exporter replicas
+
+        Returns:
+            ShardingConfig: The settings
+        """
+        return self._sharding
+
+    @property
+    def subscription(self) -> 'SubscriptionConfig':
+        """Settings of the subscriptions to the head and peer events of the nodes with 'subscription_url'
+
+        Returns:
+            SubscriptionConfig: The settings
+        """
+        return self._subscription
+
+
+class NodeConfig:
+    """A Quorum node to monitor
+    """
+
+    def __init__(self):
+        self._instance_name = None
+        self._rpc_url = None
+        self._namespace = None
+        self._deployment = None
+        self._subscription_url = None
+        self._enode = None
+
+    def load(self, config_object, deployment_required: bool = True) -> bool:
+        """Load the node from an object
+
+        Args:
+            config_object (_type_): the object containing the node
+            deployment_required (bool): False if the K8S deployment is not used, e.g. in sidecar mode
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._rpc_url = config_object.get('rpc_url')
+        if not self._rpc_url:
+            logging.error(
+                "'rpc_url' is not set in config. E.g. 'rpc_url': 'http://quorum-node-0.quorum:8545'")
+            return False
+
+        self._namespace = config_object.get('namespace')
+        if not self._namespace and deployment_required:
+            logging.error(
+                "'namespace' is not set in config. E.g. 'namespace': 'quorum'")
+            return False
+
+        self._deployment = config_object.get('deployment')
+        if not self._deployment and deployment_required:
+            logging.error(
+                "'deployment' is not set in config. E.g. 'deployment': 'quorum'")
+            return False
+
+        self._subscription_url = config_object.get('subscription_url')
+        if self._subscription_url is not None and (not isinstance(self._subscription_url, str) or
+                                                   not self._subscription_url.startswith(('ws://', 'wss://', '/'))):
+            logging.error(
+                "'subscription_url' must be a ws:// or wss:// URL or the absolute path of the IPC socket but is '%s'. "
+                "E.g. 'subscription_url': 'ws://quorum-node-0.quorum:8546'", self._subscription_url)
+            return False
+
+        self._enode = config_object.get('enode')
+        if self._enode is not None and (not isinstance(self._enode, str) or not self._enode):
+            logging.error("'enode' must be the enode of the node as in 'peers' but is '%s'", self._enode)
+            return False
+
+        # Use DNS name of the RPC endpoint as "pretty" instance name if not set explicitly
+        self._instance_name = config_object.get('instance_name') or Helper().get_host_name(url=self._rpc_url)
+        return True
+
+    @property
+    def instance_name(self) -> str:
+        """The pretty instance name used as metric label
+
+        Returns:
+            str: The instance name
+        """
+        return self._instance_name
+
+    @property
+    def rpc_url(self) -> str:
+        """The RPC URL
+
+        Returns:
+            str: The RPC URL
+        """
+        return self._rpc_url
+
     @property
     def deployment(self) -> str:
         """The Name of the K8S deployment of the Quorum node
@@ -116,65 +380,1062 @@ class Config:
         """
         return self._namespace
 
+    @property
+    def subscription_url(self) -> str:
+        """The websocket URL or the path of the IPC socket to subscribe to the head and peer events
 
-class PeerConfig:
-    """Peer Data
+        Returns:
+            str: The URL or path, None if the node is polled only
+        """
+        return self._subscription_url
+
+    @property
+    def enode(self) -> str:
+        """The enode of the node itself, the node is not reported as its own peer
+
+        Returns:
+            str: The enode, None if not set
+        """
+        return self._enode
+
+
+class RpcConfig:
+    """Settings of the client of the Quorum RPC endpoint
     """
 
-    def __init__(self, name: str, enode: str, address: str, port: str):
-        self._name = name
-        self._enode = enode
-        self._address = address
-        self._port = port
+    # Methods queried besides admin_peers in the same batch, provided as node metrics
+    SUPPORTED_METHODS = ('eth_blockNumber', 'net_peerCount', 'eth_syncing', 'txpool_status',
+                         'istanbul_getValidators', 'qbft_getValidatorsByBlockNumber')
+    # The validator methods depend on the consensus of the network, therefore not queried by default
+    DEFAULT_METHODS = ('eth_blockNumber', 'net_peerCount', 'eth_syncing', 'txpool_status')
+
+    def __init__(self):
+        self._timeout = 2.0
+        self._connect_timeout = 1.0
+        self._retries = 1
+        self._enabled = True
+        self._methods = list(RpcConfig.DEFAULT_METHODS)
+        self._schedule = ScheduleConfig()
+
+    def load(self, config_object) -> bool:
+        """Load the settings from an object
+
+        Args:
+            config_object (_type_): the object containing the settings
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._enabled = config_object.get('enabled', True)
+        if not isinstance(self._enabled, bool):
+            logging.error("'rpc.enabled' must be true or false but is '%s'", self._enabled)
+            return False
+
+        self._timeout = config_object.get('timeout', 2.0)
+        if not _is_positive_number(self._timeout):
+            logging.error("'rpc.timeout' must be a positive number of seconds but is '%s'", self._timeout)
+            return False
+
+        self._connect_timeout = config_object.get('connect_timeout', 1.0)
+        if not _is_positive_number(self._connect_timeout):
+            logging.error("'rpc.connect_timeout' must be a positive number of seconds but is '%s'",
+                          self._connect_timeout)
+            return False
+
+        self._retries = config_object.get('retries', 1)
+        if not isinstance(self._retries, int) or isinstance(self._retries, bool) or self._retries < 0:
+            logging.error("'rpc.retries' must be an integer >= 0 but is '%s'", self._retries)
+            return False
+
+        self._methods = config_object.get('methods', list(RpcConfig.DEFAULT_METHODS))
+        if not isinstance(self._methods, list) \
+                or any(each not in RpcConfig.SUPPORTED_METHODS for each in self._methods):
+            logging.error("'rpc.methods' must be a list of %s but is '%s'",
+                          ', '.join(RpcConfig.SUPPORTED_METHODS), self._methods)
+            return False
+
+        return self._schedule.load(config_object, 'rpc')
 
     @property
-    def name(self) -> str:
-        """Name of the peer
+    def enabled(self) -> bool:
+        """If True, the peers and node metrics are queried from the RPC endpoint
 
         Returns:
-            str: Name of the peer
+            bool: True if the RPC metrics are enabled
         """
-        return self._name
+        return self._enabled
 
     @property
-    def enode(self) -> str:
-        """Enode of the peer
+    def timeout(self) -> float:
+        """The read timeout of a RPC request in seconds
 
         Returns:
-            str: Enode of the peer
+            float: The read timeout in seconds
         """
-        return self._enode
+        return self._timeout
 
     @property
-    def address(self) -> str:
-        """IP Address of the peer
+    def connect_timeout(self) -> float:
+        """The connect timeout of a RPC request in seconds
 
         Returns:
-            str: IP Address of the peer
+            float: The connect timeout in seconds
         """
-        return self._address
+        return self._connect_timeout
 
     @property
-    def port(self) -> str:
-        """Port number of the peer
+    def retries(self) -> int:
+        """The number of retries of a failed RPC request
 
         Returns:
-            str: Port number of the peer
+            int: The number of retries
         """
-        return self._port
+        return self._retries
 
+    @property
+    def methods(self) -> list:
+        """The methods queried besides admin_peers in a single batch request
 
-def load(filename: str = 'config.json') -> Config:
-    """Load the application configuration
+        Returns:
+            list: The methods
+        """
+        return self._methods
 
-    Args:
-        filename (str, optional): The configuration file name. Defaults to 'config.json'.
+    @property
+    def schedule(self) -> 'ScheduleConfig':
+        """The schedule of the RPC metrics collector
 
-    Returns:
-        Config: The application configuration or None on error during load.
+        Returns:
+            ScheduleConfig: The schedule
+        """
+        return self._schedule
+
+
+class KubeExecConfig:  # pylint: disable=R0902
+    """Settings of the connectivity probes executed in the Quorum pod
     """
-    with open(file=filename, mode='r', encoding='utf-8') as file:
-        config_object = json.load(file)
+
+    # One "kubectl exec" per peer
+    PROBE_MODE_SINGLE = 'single'
+    # One "kubectl exec" per cycle running a script that probes all peers in parallel
+    PROBE_MODE_BATCH = 'batch'
+
+    def __init__(self):
+        self._enabled = True
+        self._probe_mode = KubeExecConfig.PROBE_MODE_SINGLE
+        self._workers = 1
+        self._session = False
+        self._deadline = None
+        self._adaptive = False
+        self._backoff_base = 30.0
+        self._backoff_max = 600.0
+        self._schedule = ScheduleConfig()
+
+    def load(self, config_object) -> bool:
+        """Load the settings from an object
+
+        Args:
+            config_object (_type_): the object containing the settings
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._enabled = config_object.get('enabled', True)
+        if not isinstance(self._enabled, bool):
+            logging.error("'kube_exec.enabled' must be true or false but is '%s'", self._enabled)
+            return False
+
+        self._probe_mode = config_object.get('probe_mode', KubeExecConfig.PROBE_MODE_SINGLE)
+        if self._probe_mode not in (KubeExecConfig.PROBE_MODE_SINGLE, KubeExecConfig.PROBE_MODE_BATCH):
+            logging.error(
+                "'kube_exec.probe_mode' must be either 'single' or 'batch' but is '%s'", self._probe_mode)
+            return False
+
+        self._workers = config_object.get('workers', 1)
+        if not _is_positive_number(self._workers) or not isinstance(self._workers, int):
+            logging.error("'kube_exec.workers' must be a positive integer but is '%s'", self._workers)
+            return False
+
+        self._session = config_object.get('session', False)
+        if not isinstance(self._session, bool):
+            logging.error("'kube_exec.session' must be true or false but is '%s'", self._session)
+            return False
+
+        self._deadline = config_object.get('deadline')
+        if self._deadline is not None and not _is_positive_number(self._deadline):
+            logging.error("'kube_exec.deadline' must be a positive number of seconds but is '%s'",
+                          self._deadline)
+            return False
+
+        self._adaptive = config_object.get('adaptive', False)
+        if not isinstance(self._adaptive, bool):
+            logging.error("'kube_exec.adaptive' must be true or false but is '%s'", self._adaptive)
+            return False
+
+        self._backoff_base = config_object.get('backoff_base', 30.0)
+        if not _is_positive_number(self._backoff_base):
+            logging.error("'kube_exec.backoff_base' must be a positive number of seconds but is '%s'",
+                          self._backoff_base)
+            return False
+
+        self._backoff_max = config_object.get('backoff_max', 600.0)
+        if not _is_positive_number(self._backoff_max):
+            logging.error("'kube_exec.backoff_max' must be a positive number of seconds but is '%s'",
+                          self._backoff_max)
+            return False
+
+        return self._schedule.load(config_object, 'kube_exec')
+
+    @property
+    def enabled(self) -> bool:
+        """If True, the peers are probed by "kubectl exec" in the Quorum pod unless "tcp_probe" is enabled.
+            Disable it if the exporter has no permission to exec into the Quorum pod.
+
+        Returns:
+            bool: True if the kube_exec collector is enabled
+        """
+        return self._enabled
+
+    @property
+    def probe_mode(self) -> str:
+        """The probe mode, either 'single' (one exec per peer) or 'batch' (one exec for all peers)
+
+        Returns:
+            str: The probe mode
+        """
+        return self._probe_mode
+
+    @property
+    def workers(self) -> int:
+        """The max number of execs running concurrently in probe mode 'single'
+
+        Returns:
+            int: The max number of concurrent execs
+        """
+        return self._workers
+
+    @property
+    def session(self) -> bool:
+        """If True, the probes run in long living shells in the Quorum pod, one per worker,
+            instead of one exec per probe
+
+        Returns:
+            bool: True if the probes run in shell sessions
+        """
+        return self._session
+
+    @property
+    def deadline(self) -> float:
+        """The max number of seconds for checking all peers.
+            Peers not checked within the deadline are reported as unknown.
+
+        Returns:
+            float: The deadline in seconds or None if there is no deadline
+        """
+        return self._deadline
+
+    @property
+    def adaptive(self) -> bool:
+        """If True, peers connected outbound are not probed and failing peers are probed with exponential backoff
+
+        Returns:
+            bool: True if adaptive probing is enabled
+        """
+        return self._adaptive
+
+    @property
+    def backoff_base(self) -> float:
+        """The delay in seconds before probing a peer again after its first failure, doubled on each failure
+
+        Returns:
+            float: The delay in seconds
+        """
+        return self._backoff_base
+
+    @property
+    def backoff_max(self) -> float:
+        """The max. delay in seconds before probing a failing peer again
+
+        Returns:
+            float: The max. delay in seconds
+        """
+        return self._backoff_max
+
+    @property
+    def schedule(self) -> 'ScheduleConfig':
+        """The schedule of the kube exec metrics collector
+
+        Returns:
+            ScheduleConfig: The schedule
+        """
+        return self._schedule
+
+
+class TcpProbeConfig:
+    """Settings of the connectivity probes executed by the exporter itself.
+        Requires the exporter to run as sidecar in the network namespace of the Quorum pod.
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._timeout = 1.0
+        self._concurrency = 256
+        self._schedule = ScheduleConfig()
+
+    def load(self, config_object) -> bool:
+        """Load the settings from an object
+
+        Args:
+            config_object (_type_): the object containing the settings
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._enabled = config_object.get('enabled', False)
+        if not isinstance(self._enabled, bool):
+            logging.error("'tcp_probe.enabled' must be true or false but is '%s'", self._enabled)
+            return False
+
+        self._timeout = config_object.get('timeout', 1.0)
+        if not _is_positive_number(self._timeout):
+            logging.error("'tcp_probe.timeout' must be a positive number of seconds but is '%s'", self._timeout)
+            return False
+
+        self._concurrency = config_object.get('concurrency', 256)
+        if not _is_positive_number(self._concurrency) or not isinstance(self._concurrency, int):
+            logging.error("'tcp_probe.concurrency' must be a positive integer but is '%s'", self._concurrency)
+            return False
+
+        return self._schedule.load(config_object, 'tcp_probe')
+
+    @property
+    def enabled(self) -> bool:
+        """If True, the peers are probed by the exporter itself instead of "kubectl exec" in the Quorum pod
+
+        Returns:
+            bool: True if sidecar mode is enabled
+        """
+        return self._enabled
+
+    @property
+    def timeout(self) -> float:
+        """The connect timeout of a probe in seconds
+
+        Returns:
+            float: The connect timeout in seconds
+        """
+        return self._timeout
+
+    @property
+    def concurrency(self) -> int:
+        """The max number of probes running concurrently
+
+        Returns:
+            int: The max number of concurrent probes
+        """
+        return self._concurrency
+
+    @property
+    def schedule(self) -> 'ScheduleConfig':
+        """The schedule of the TCP probe metrics collector
+
+        Returns:
+            ScheduleConfig: The schedule
+        """
+        return self._schedule
+
+
+class SnapshotConfig:
+    """Settings of the snapshot of the last good state of the collectors.
+        The snapshot is restored on startup, so the metrics are served (marked as stale) from the first scrape.
+    """
+
+    def __init__(self):
+        self._file = None
+        self._max_age = 3600.0
+        self._schedule = ScheduleConfig()
+
+    def load(self, config_object) -> bool:
+        """Load the settings from an object
+
+        Args:
+            config_object (_type_): the object containing the settings
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._file = config_object.get('file')
+        if self._file is not None and (not isinstance(self._file, str) or not self._file):
+            logging.error("'snapshot.file' must be the path of a file but is '%s'", self._file)
+            return False
+
+        self._max_age = config_object.get('max_age', 3600.0)
+        if not _is_positive_number(self._max_age):
+            logging.error("'snapshot.max_age' must be a positive number of seconds but is '%s'", self._max_age)
+            return False
+
+        return self._schedule.load(config_object, 'snapshot')
+
+    @property
+    def enabled(self) -> bool:
+        """If True, the snapshot is saved periodically and restored on startup
+
+        Returns:
+            bool: True if a file is set
+        """
+        return self._file is not None
+
+    @property
+    def file(self) -> str:
+        """The file of the snapshot, should be located on a volume surviving restarts
+
+        Returns:
+            str: The path of the file or None if disabled
+        """
+        return self._file
+
+    @property
+    def max_age(self) -> float:
+        """Snapshots older than max_age seconds are not restored
+
+        Returns:
+            float: The max. age in seconds
+        """
+        return self._max_age
+
+    @property
+    def schedule(self) -> 'ScheduleConfig':
+        """The schedule of saving the snapshot
+
+        Returns:
+            ScheduleConfig: The schedule
+        """
+        return self._schedule
+
+
+class OnDemandConfig:
+    """Settings of the on demand mode. The collectors refresh their metrics when scraped
+        and the data is older than max_age, instead of running on their schedule.
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._max_age = 30.0
+        self._soft_deadline = 5.0
+
+    def load(self, config_object) -> bool:
+        """Load the settings from an object
+
+        Args:
+            config_object (_type_): the object containing the settings
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._enabled = config_object.get('enabled', False)
+        if not isinstance(self._enabled, bool):
+            logging.error("'on_demand.enabled' must be true or false but is '%s'", self._enabled)
+            return False
+
+        self._max_age = config_object.get('max_age', 30.0)
+        if not _is_positive_number(self._max_age):
+            logging.error("'on_demand.max_age' must be a positive number of seconds but is '%s'", self._max_age)
+            return False
+
+        self._soft_deadline = config_object.get('soft_deadline', 5.0)
+        if not _is_positive_number(self._soft_deadline):
+            logging.error("'on_demand.soft_deadline' must be a positive number of seconds but is '%s'", self._soft_deadline)
+            return False
+
+        return True
+
+    @property
+    def enabled(self) -> bool:
+        """If True, the metrics are refreshed on scrape instead of on the schedule of the collectors
+
+        Returns:
+            bool: True if on demand mode is enabled
+        """
+        return self._enabled
+
+    @property
+    def max_age(self) -> float:
+        """Max. age of the data of a collector in seconds before a scrape triggers a refresh
+
+        Returns:
+            float: The max. age in seconds
+        """
+        return self._max_age
+
+    @property
+    def soft_deadline(self) -> float:
+        """Max. seconds a scrape waits for a refresh before the cached data is served.
+            The refresh continues in the background.
+
+        Returns:
+            float: The soft deadline in seconds
+        """
+        return self._soft_deadline
+
+
+class DnsConfig:
+    """Settings of resolving the host names of the peers by the exporter. The TCP egress connectivity checks
+        target the resolved IP addresses, so the probes do not depend on the resolver of the Quorum pod.
+        Disabled by default, as host names resolvable in the Quorum pod only would be reported as unknown.
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._ttl = 300.0
+        self._negative_ttl = 30.0
+        self._timeout = 2.0
+        self._workers = 8
+
+    def load(self, config_object) -> bool:
+        """Load the settings from an object
+
+        Args:
+            config_object (_type_): the object containing the settings
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._enabled = config_object.get('enabled', False)
+        if not isinstance(self._enabled, bool):
+            logging.error("'dns.enabled' must be true or false but is '%s'", self._enabled)
+            return False
+
+        self._ttl = config_object.get('ttl', 300.0)
+        if not _is_positive_number(self._ttl):
+            logging.error("'dns.ttl' must be a positive number of seconds but is '%s'", self._ttl)
+            return False
+
+        self._negative_ttl = config_object.get('negative_ttl', 30.0)
+        if not _is_positive_number(self._negative_ttl):
+            logging.error("'dns.negative_ttl' must be a positive number of seconds but is '%s'", self._negative_ttl)
+            return False
+
+        self._timeout = config_object.get('timeout', 2.0)
+        if not _is_positive_number(self._timeout):
+            logging.error("'dns.timeout' must be a positive number of seconds but is '%s'", self._timeout)
+            return False
+
+        self._workers = config_object.get('workers', 8)
+        if not _is_positive_number(self._workers) or not isinstance(self._workers, int):
+            logging.error("'dns.workers' must be a positive integer but is '%s'", self._workers)
+            return False
+
+        return True
+
+    @property
+    def enabled(self) -> bool:
+        """If True, the host names of the peers are resolved by the exporter, otherwise by the probes
+
+        Returns:
+            bool: True if the exporter resolves the host names
+        """
+        return self._enabled
+
+    @property
+    def ttl(self) -> float:
+        """Seconds a resolved IP address is cached. Afterwards it is refreshed in the background.
+
+        Returns:
+            float: The time to live in seconds
+        """
+        return self._ttl
+
+    @property
+    def negative_ttl(self) -> float:
+        """Seconds a failed resolution is cached before the host name is resolved again
+
+        Returns:
+            float: The time to live of a failure in seconds
+        """
+        return self._negative_ttl
+
+    @property
+    def timeout(self) -> float:
+        """Max. seconds a probe cycle waits for the resolution of host names not cached yet
+
+        Returns:
+            float: The timeout in seconds
+        """
+        return self._timeout
+
+    @property
+    def workers(self) -> int:
+        """Number of host names resolved concurrently
+
+        Returns:
+            int: The number of resolver threads
+        """
+        return self._workers
+
+
+class ConnectLatencyConfig:
+    """Settings of measuring the TCP connect latency to the peers by the TCP egress connectivity checks
+    """
+
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+    def __init__(self):
+        self._enabled = False
+        self._samples = 1
+        self._buckets = list(ConnectLatencyConfig.DEFAULT_BUCKETS)
+
+    def load(self, config_object) -> bool:
+        """Load the settings from an object
+
+        Args:
+            config_object (_type_): the object containing the settings
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._enabled = config_object.get('enabled', False)
+        if not isinstance(self._enabled, bool):
+            logging.error("'connect_latency.enabled' must be true or false but is '%s'", self._enabled)
+            return False
+
+        self._samples = config_object.get('samples', 1)
+        if not isinstance(self._samples, int) or isinstance(self._samples, bool) or not 1 <= self._samples <= 10:
+            logging.error("'connect_latency.samples' must be an integer from 1 to 10 but is '%s'", self._samples)
+            return False
+
+        self._buckets = config_object.get('buckets', list(ConnectLatencyConfig.DEFAULT_BUCKETS))
+        if not isinstance(self._buckets, list) or len(self._buckets) == 0 \
+                or not all(_is_positive_number(each) for each in self._buckets) \
+                or self._buckets != sorted(set(self._buckets)):
+            logging.error("'connect_latency.buckets' must be a list of increasing positive numbers of seconds but is '%s'",
+                          self._buckets)
+            return False
+
+        return True
+
+    @property
+    def enabled(self) -> bool:
+        """If True, the TCP connect latency to each peer is measured
+
+        Returns:
+            bool: True if the latency is measured
+        """
+        return self._enabled
+
+    @property
+    def samples(self) -> int:
+        """Number of connects to each peer per probe, the median latency is reported
+
+        Returns:
+            int: The number of samples
+        """
+        return self._samples
+
+    @property
+    def buckets(self) -> list:
+        """The upper bounds of the buckets of the latency histogram in seconds
+
+        Returns:
+            list: The upper bounds
+        """
+        return self._buckets
+
+
+class ShardingConfig:
+    """Settings of distributing the TCP egress connectivity checks across multiple exporter replicas, e.g. of a StatefulSet.
+        Each replica checks its share of the peers, the RPC metrics are provided by all replicas.
+    """
+
+    def __init__(self):
+        self._replicas = 1
+        self._ordinal = 0
+        self._virtual_nodes = 64
+
+    def load(self, config_object) -> bool:
+        """Load the settings from an object. The ordinal defaults to the ordinal of the StatefulSet pod,
+            taken from the host name, e.g. 1 for quorum-node-metrics-exporter-1
+
+        Args:
+            config_object (_type_): the object containing the settings
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._replicas = config_object.get('replicas', 1)
+        if not _is_positive_number(self._replicas) or not isinstance(self._replicas, int):
+            logging.error("'sharding.replicas' must be a positive integer but is '%s'", self._replicas)
+            return False
+
+        self._virtual_nodes = config_object.get('virtual_nodes', 64)
+        if not _is_positive_number(self._virtual_nodes) or not isinstance(self._virtual_nodes, int):
+            logging.error("'sharding.virtual_nodes' must be a positive integer but is '%s'", self._virtual_nodes)
+            return False
+
+        # Without sharding the ordinal is not used, e.g. the pod name of a Deployment ends with a random suffix
+        self._ordinal = 0
+        if self._replicas == 1:
+            return True
+
+        self._ordinal = config_object.get('ordinal')
+        if self._ordinal is None:
+            match = re.search(r'-(\d+)$', os.environ.get('HOSTNAME', ''))
+            self._ordinal = int(match.group(1)) if match else None
+        if self._ordinal is None:
+            logging.error("'sharding.ordinal' is not set and cannot be taken from the host name '%s'",
+                          os.environ.get('HOSTNAME', ''))
+            return False
+        if not isinstance(self._ordinal, int) or isinstance(self._ordinal, bool) \
+                or not 0 <= self._ordinal < self._replicas:
+            logging.error("'sharding.ordinal' must be an integer from 0 to %s but is '%s'",
+                          self._replicas - 1, self._ordinal)
+            return False
+
+        return True
+
+    @property
+    def enabled(self) -> bool:
+        """If True, the peers are distributed across multiple replicas
+
+        Returns:
+            bool: True if there is more than one replica
+        """
+        return self._replicas > 1
+
+    @property
+    def replicas(self) -> int:
+        """The number of exporter replicas
+
+        Returns:
+            int: The number of replicas
+        """
+        return self._replicas
+
+    @property
+    def ordinal(self) -> int:
+        """The ordinal of this replica, 0 <= ordinal < replicas
+
+        Returns:
+            int: The ordinal
+        """
+        return self._ordinal
+
+    @property
+    def virtual_nodes(self) -> int:
+        """Number of points of each replica on the hash ring. More points distribute the peers more evenly.
+
+        Returns:
+            int: The number of points
+        """
+        return self._virtual_nodes
+
+
+class SubscriptionConfig:
+    """Settings of the subscriptions to the new heads and the peer events of the nodes with 'subscription_url'.
+        While subscribed, the peers are updated by the events and admin_peers is polled less often.
+    """
+
+    def __init__(self):
+        self._poll_interval = 60.0
+        self._refresh_on_new_head = False
+        self._min_refresh_interval = 2.0
+        self._idle_timeout = 60.0
+        self._reconnect_delay_max = 30.0
+
+    def load(self, config_object) -> bool:
+        """Load the settings from an object
+
+        Args:
+            config_object (_type_): the object containing the settings
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._poll_interval = config_object.get('poll_interval', 60.0)
+        if not _is_positive_number(self._poll_interval):
+            logging.error("'subscription.poll_interval' must be a positive number of seconds but is '%s'", self._poll_interval)
+            return False
+
+        self._refresh_on_new_head = config_object.get('refresh_on_new_head', False)
+        if not isinstance(self._refresh_on_new_head, bool):
+            logging.error("'subscription.refresh_on_new_head' must be true or false but is '%s'", self._refresh_on_new_head)
+            return False
+
+        self._min_refresh_interval = config_object.get('min_refresh_interval', 2.0)
+        if not _is_positive_number(self._min_refresh_interval):
+            logging.error("'subscription.min_refresh_interval' must be a positive number of seconds but is '%s'",
+                          self._min_refresh_interval)
+            return False
+
+        self._idle_timeout = config_object.get('idle_timeout', 60.0)
+        if not _is_positive_number(self._idle_timeout):
+            logging.error("'subscription.idle_timeout' must be a positive number of seconds but is '%s'", self._idle_timeout)
+            return False
+
+        self._reconnect_delay_max = config_object.get('reconnect_delay_max', 30.0)
+        if not _is_positive_number(self._reconnect_delay_max):
+            logging.error("'subscription.reconnect_delay_max' must be a positive number of seconds but is '%s'",
+                          self._reconnect_delay_max)
+            return False
+
+        return True
+
+    @property
+    def poll_interval(self) -> float:
+        """Seconds between two polls of admin_peers while subscribed. Replaces the interval of the RPC schedule.
+
+        Returns:
+            float: The interval in seconds
+        """
+        return self._poll_interval
+
+    @property
+    def refresh_on_new_head(self) -> bool:
+        """If True, admin_peers is polled on each new head, so the head blocks of the peers follow the chain
+
+        Returns:
+            bool: True if polled on new heads
+        """
+        return self._refresh_on_new_head
+
+    @property
+    def min_refresh_interval(self) -> float:
+        """Min. seconds between two polls of admin_peers triggered by events
+
+        Returns:
+            float: The interval in seconds
+        """
+        return self._min_refresh_interval
+
+    @property
+    def idle_timeout(self) -> float:
+        """Seconds without any message after which the connection is considered lost and reconnected
+
+        Returns:
+            float: The timeout in seconds
+        """
+        return self._idle_timeout
+
+    @property
+    def reconnect_delay_max(self) -> float:
+        """Max. seconds between two connection attempts, the delay starts at 1 second and doubles on each failure
+
+        Returns:
+            float: The max. delay in seconds
+        """
+        return self._reconnect_delay_max
+
+
+class ScheduleConfig:
+    """Schedule of a metrics collector
+    """
+
+    # Skip the runs missed while a run took longer than the interval
+    OVERRUN_SKIP = 'skip'
+    # Start the next run immediately after a run took longer than the interval
+    OVERRUN_QUEUE = 'queue'
+
+    def __init__(self):
+        self._interval = 10.0
+        self._jitter = 0.0
+        self._overrun = ScheduleConfig.OVERRUN_SKIP
+
+    def load(self, config_object, section: str) -> bool:
+        """Load the schedule from an object
+
+        Args:
+            config_object (_type_): the object containing the schedule
+            section (str): name of the config section, used for error messages
+
+        Returns:
+            bool: True if successful else False
+        """
+        self._interval = config_object.get('interval', 10.0)
+        if not _is_positive_number(self._interval):
+            logging.error("'%s.interval' must be a positive number of seconds but is '%s'",
+                          section, self._interval)
+            return False
+
+        self._jitter = config_object.get('jitter', 0.0)
+        if self._jitter != 0 and not _is_positive_number(self._jitter):
+            logging.error("'%s.jitter' must be a number of seconds >= 0 but is '%s'", section, self._jitter)
+            return False
+
+        self._overrun = config_object.get('overrun', ScheduleConfig.OVERRUN_SKIP)
+        if self._overrun not in (ScheduleConfig.OVERRUN_SKIP, ScheduleConfig.OVERRUN_QUEUE):
+            logging.error("'%s.overrun' must be either 'skip' or 'queue' but is '%s'", section, self._overrun)
+            return False
+
+        return True
+
+    @property
+    def interval(self) -> float:
+        """The interval between two runs in seconds
+
+        Returns:
+            float: The interval in seconds
+        """
+        return self._interval
+
+    @property
+    def jitter(self) -> float:
+        """Max. random delay in seconds added to each run, spreads the load of multiple collectors
+
+        Returns:
+            float: The max. delay in seconds
+        """
+        return self._jitter
+
+    @property
+    def overrun(self) -> str:
+        """What to do if a run took longer than the interval: 'skip' or 'queue'
+
+        Returns:
+            str: The overrun policy
+        """
+        return self._overrun
+
+
+class PeerConfig:
+    """Peer Data
+    """
+
+    def __init__(self, name: str, enode: str, address: str, port: str):
+        self._name = name
+        self._enode = enode
+        self._address = address
+        self._port = port
+
+    @property
+    def name(self) -> str:
+        """Name of the peer
+
+        Returns:
+            str: Name of the peer
+        """
+        return self._name
+
+    @property
+    def enode(self) -> str:
+        """Enode of the peer
+
+        Returns:
+            str: Enode of the peer
+        """
+        return self._enode
+
+    @property
+    def address(self) -> str:
+        """IP Address of the peer
+
+        Returns:
+            str: IP Address of the peer
+        """
+        return self._address
+
+    @property
+    def port(self) -> str:
+        """Port number of the peer
+
+        Returns:
+            str: Port number of the peer
+        """
+        return self._port
+
+
+class PeersDiff:
+    """The differences between two dictionaries of peers
+    """
+
+    def __init__(self, old_peers: dict, new_peers: dict):
+        self._added = [peer for enode, peer in new_peers.items() if enode not in old_peers]
+        self._removed = [peer for enode, peer in old_peers.items() if enode not in new_peers]
+        # Peers with changed address or port. A changed name does not affect the connectivity.
+        self._changed = [peer for enode, peer in new_peers.items()
+                         if enode in old_peers
+                         and (old_peers[enode].address, old_peers[enode].port) != (peer.address, peer.port)]
+        self._renamed = [peer for enode, peer in new_peers.items()
+                         if enode in old_peers and old_peers[enode].name != peer.name]
+
+    @property
+    def added(self) -> list:
+        """Peers added
+
+        Returns:
+            list: List of PeerConfig
+        """
+        return self._added
+
+    @property
+    def removed(self) -> list:
+        """Peers removed
+
+        Returns:
+            list: List of PeerConfig
+        """
+        return self._removed
+
+    @property
+    def changed(self) -> list:
+        """Peers with changed address or port
+
+        Returns:
+            list: List of PeerConfig
+        """
+        return self._changed
+
+    @property
+    def renamed(self) -> list:
+        """Peers with changed name, e.g. because another peer of the same company has been added
+
+        Returns:
+            list: List of PeerConfig
+        """
+        return self._renamed
+
+    def is_empty(self) -> bool:
+        """Checks if there are no differences
+
+        Returns:
+            bool: True if there are no differences
+        """
+        return not (self._added or self._removed or self._changed or self._renamed)
+
+
+def _is_positive_number(value) -> bool:
+    """Checks if a config value is a positive number
+
+    Args:
+        value (_type_): The config value
+
+    Returns:
+        bool: True if value is a positive int or float else False
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def load_object(filename: str = 'config.json'):
+    """Load the raw configuration object from a JSON file
+
+    Args:
+        filename (str, optional): The configuration file name. Defaults to 'config.json'.
+
+    Returns:
+        _type_: The configuration object
+    """
+    with open(file=filename, mode='r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def load(filename: str = 'config.json') -> Config:
+    """Load the application configuration
+
+    Args:
+        filename (str, optional): The configuration file name. Defaults to 'config.json'.
+
+    Returns:
+        Config: The application configuration or None on error during load.
+    """
+    config_object = load_object(filename)
 
     config = Config()
     if config.load(config_object) is True:
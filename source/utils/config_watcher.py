@@ -0,0 +1,93 @@
+"""Watches the config file and reloads the peers on changes
+"""
+import logging
+import os
+from typing import Callable
+
+from .config import Config, PeersDiff, load_object
+
+
+class ConfigWatcher:
+    """Checks the config file for changes and applies changed peers to the running config.
+        A K8S ConfigMap mounted as directory is updated by replacing a symlink,
+        therefore the state of the file is determined by following symlinks.
+    """
+
+    def __init__(self, filename: str, config: Config):
+        self._filename = filename
+        self._config = config
+        self._listeners = []
+        self._file_state = self._get_file_state()
+        # The raw config object of the running config, used to detect changes of settings other than peers
+        self._config_object = load_object(filename)
+
+    def add_listener(self, listener: Callable[[PeersDiff], None]):
+        """Adds a listener called after the peers have been changed
+
+        Args:
+            listener (Callable[[PeersDiff], None]): The listener
+        """
+        self._listeners.append(listener)
+
+    def _get_file_state(self) -> tuple:
+        """Get the state of the config file
+
+        Returns:
+            tuple: Inode, size and modification time or None if file cannot be accessed
+        """
+        try:
+            stat = os.stat(self._filename)
+            return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except OSError as ex:
+            logging.warning("%s >> Cannot access config file %s - %s", type(self).__name__, self._filename, ex)
+            return None
+
+    def check(self):
+        """Reloads the config if the file has been changed. Invalid configs are ignored.
+        """
+        file_state = self._get_file_state()
+        if file_state is None or file_state == self._file_state:
+            return
+        self._file_state = file_state
+
+        try:
+            config_object = load_object(self._filename)
+        except (OSError, ValueError) as ex:
+            logging.error("%s >> Cannot read config file %s, keeping current config - %s",
+                          type(self).__name__, self._filename, ex)
+            return
+
+        new_config = Config()
+        if not new_config.load(config_object):
+            logging.error("%s >> Invalid config file %s, keeping current config",
+                          type(self).__name__, self._filename)
+            return
+
+        if _without_peers(config_object) != _without_peers(self._config_object):
+            logging.warning("%s >> Settings other than 'peers' have been changed, a restart is required to apply them",
+                            type(self).__name__)
+        self._config_object = config_object
+
+        diff = PeersDiff(self._config.peers, new_config.peers)
+        if diff.is_empty():
+            logging.info("%s >> Config file changed, peers unchanged", type(self).__name__)
+            return
+
+        logging.info("%s >> Config reloaded - added=%s, removed=%s, changed=%s, renamed=%s",
+                     type(self).__name__, len(diff.added), len(diff.removed),
+                     len(diff.changed), len(diff.renamed))
+        self._config.replace_peers(new_config.peers)
+        for each_listener in self._listeners:
+            each_listener(diff)
+
+
+def _without_peers(config_object) -> dict:
+    """Get the config object without peers
+
+    Args:
+        config_object (_type_): The config object
+
+    Returns:
+        dict: The config object without peers
+    """
+    return {key: value for key, value in config_object.items() if key != 'peers'}
@@ -0,0 +1,105 @@
+"""TCP connect latency of the egress connectivity probes of the peers
+"""
+import bisect
+import itertools
+import statistics
+from typing import Iterable, List
+
+from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+
+from .config import PeerConfig
+
+
+class PeerLatency:  # pylint: disable=R0903
+    """The connect latency of the last probe and the histogram of all probes of a peer
+    """
+
+    __slots__ = ('last', 'bucket_counts', 'sum')
+
+    def __init__(self, bucket_count: int):
+        self.last = None
+        # Non cumulative count of the samples of each bucket, the last bucket is +Inf
+        self.bucket_counts = [0] * (bucket_count + 1)
+        self.sum = 0.0
+
+    def get_buckets(self, bucket_names: List[str]) -> list:
+        """Get the cumulative counts of the buckets as required by HistogramMetricFamily
+
+        Args:
+            bucket_names (List[str]): The upper bound of each bucket as string, the last is +Inf
+
+        Returns:
+            list: Tuples of upper bound and cumulative count
+        """
+        return list(zip(bucket_names, itertools.accumulate(self.bucket_counts)))
+
+
+class ConnectLatencies:
+    """Keeps the TCP connect latency of each peer across probe cycles. Must be guarded by the lock of the collector.
+    """
+
+    def __init__(self, buckets: List[float]):
+        self._buckets = sorted(buckets)
+        # Key is the enode, value is PeerLatency
+        self._peers = {}
+
+    def observe(self, enode: str, samples: List[float]):
+        """Adds the connect latencies of the successful samples of a probe
+
+        Args:
+            enode (str): The enode of the peer
+            samples (List[float]): The latencies in seconds, empty if no connection could be established
+        """
+        if len(samples) == 0:
+            return
+        peer_latency = self._peers.get(enode)
+        if peer_latency is None:
+            peer_latency = PeerLatency(len(self._buckets))
+            self._peers[enode] = peer_latency
+        peer_latency.last = statistics.median(samples)
+        for each_sample in samples:
+            # The upper bounds are inclusive
+            peer_latency.bucket_counts[bisect.bisect_left(self._buckets, each_sample)] += 1
+            peer_latency.sum += each_sample
+
+    def retain(self, enodes: Iterable[str]):
+        """Removes the latencies of peers not probed anymore, e.g. removed from the config
+
+        Args:
+            enodes (Iterable[str]): The enodes of the probed peers
+        """
+        for each_enode in [enode for enode in self._peers if enode not in enodes]:
+            del self._peers[each_enode]
+
+    def create_metrics(self, instance_name: str, peers: Iterable[PeerConfig],
+                       shard_labels: List[str], shard_values: List[str]) -> list:
+        """Creates the latency metrics of the peers with at least one successful probe
+
+        Args:
+            instance_name (str): A pretty instance name
+            peers (Iterable[PeerConfig]): The probed peers
+            shard_labels (List[str]): ['shard'] if sharded else empty
+            shard_values (List[str]): The value of the shard label if sharded else empty
+
+        Returns:
+            list: The metrics
+        """
+        labels = ['instance_name', 'enode', 'enode_short', 'name'] + shard_labels
+        metric_latency = GaugeMetricFamily(
+            'quorum_tcp_egress_connect_latency_seconds',
+            'Median TCP connect latency to a peer of the samples of the last probe in seconds by enode',
+            labels=labels)
+        metric_histogram = HistogramMetricFamily(
+            'quorum_tcp_egress_connect_duration_seconds',
+            'Histogram of the TCP connect latency to a peer in seconds by enode',
+            labels=labels)
+        bucket_names = [str(bound) for bound in self._buckets] + ['+Inf']
+
+        for each_peer in peers:
+            peer_latency = self._peers.get(each_peer.enode)
+            if peer_latency is None:
+                continue
+            values = [instance_name, each_peer.enode, each_peer.enode[0:20], each_peer.name] + shard_values
+            metric_latency.add_metric(values, peer_latency.last)
+            metric_histogram.add_metric(values, peer_latency.get_buckets(bucket_names), peer_latency.sum)
+        return [metric_latency, metric_histogram]
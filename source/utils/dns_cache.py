@@ -0,0 +1,126 @@
+"""Cache of the resolved IP addresses of the host names of the peers
+"""
+import concurrent.futures
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from typing import Iterable
+
+from .exporter_metrics import DNS_FAILURES, DNS_RESOLVE_DURATION
+
+
+def _is_ip_address(host: str) -> bool:
+    """Checks if a host is an IP address literal which does not need to be resolved
+
+    Args:
+        host (str): The host name or IP address
+
+    Returns:
+        bool: True if an IP address
+    """
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class DnsCache:
+    """Resolves host names with a time to live. Expired addresses are served while they are refreshed
+        in the background, failures are cached for the negative time to live, so neither a slow nor a failing
+        resolver delays a probe cycle. After a failed refresh the last resolved address is kept.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float, timeout: float, workers: int = 8):
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._timeout = timeout
+        # Key is the host name, value is the tuple of IP address (None if never resolved) and monotonic expiry
+        self._entries = {}
+        # Key is the host name, value is the Future of the running resolution
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dns')
+
+    def resolve_all(self, hosts: Iterable[str]) -> dict:
+        """Get the IP addresses of host names. Host names not cached yet are resolved concurrently
+            and awaited up to the timeout, expired addresses are refreshed in the background.
+
+        Args:
+            hosts (Iterable[str]): The host names or IP addresses
+
+        Returns:
+            dict: Key is the host, value is the IP address or None if not resolvable
+        """
+        now = time.monotonic()
+        addresses = {}
+        # Host names without cached result, key is the host name, value is the Future of the resolution
+        waiting = {}
+        with self._lock:
+            for host in hosts:
+                if _is_ip_address(host):
+                    addresses[host] = host
+                    continue
+                entry = self._entries.get(host)
+                if entry is not None:
+                    addresses[host] = entry[0]
+                if entry is None or entry[1] <= now:
+                    future = self._pending.get(host)
+                    if future is None:
+                        future = self._executor.submit(self._resolve, host)
+                        self._pending[host] = future
+                    if entry is None:
+                        waiting[host] = future
+
+        if len(waiting) > 0:
+            done, _ = concurrent.futures.wait(waiting.values(), timeout=self._timeout)
+            for host, future in waiting.items():
+                if future in done:
+                    addresses[host] = future.result()
+                else:
+                    # The resolution continues in the background and is cached when done
+                    DNS_FAILURES.labels('timeout').inc()
+                    logging.warning("%s >> Resolving %s timed out after %ss", type(self).__name__, host, self._timeout)
+                    addresses[host] = None
+        return addresses
+
+    def _resolve(self, host: str) -> str:
+        """Resolves a host name and caches the result
+
+        Args:
+            host (str): The host name
+
+        Returns:
+            str: The IP address or None if not resolvable
+        """
+        start = time.perf_counter()
+        address = None
+        try:
+            address = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)[0][4][0]
+        except (OSError, UnicodeError) as ex:
+            DNS_FAILURES.labels('error').inc()
+            logging.warning("%s >> Cannot resolve %s - %s", type(self).__name__, host, ex)
+        DNS_RESOLVE_DURATION.labels('failed' if address is None else 'resolved').observe(time.perf_counter() - start)
+
+        with self._lock:
+            if address is not None:
+                self._entries[host] = (address, time.monotonic() + self._ttl)
+            else:
+                previous = self._entries.get(host)
+                self._entries[host] = (previous[0] if previous is not None else None,
+                                       time.monotonic() + self._negative_ttl)
+            del self._pending[host]
+        return address
+
+    def retain(self, hosts: Iterable[str]):
+        """Removes the cached addresses of host names not used anymore, e.g. after a config reload
+
+        Args:
+            hosts (Iterable[str]): The host names in use
+        """
+        hosts = set(hosts)
+        with self._lock:
+            for host in [each for each in self._entries if each not in hosts]:
+                del self._entries[host]
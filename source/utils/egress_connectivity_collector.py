@@ -0,0 +1,273 @@
+"""Base class of the Prometheus metrics collectors checking the TCP egress connectivity to the peers
+"""
+import logging
+import threading
+import time
+from typing import Callable, List, Tuple
+
+from prometheus_client.core import GaugeMetricFamily
+
+from .base_collector import BaseCollector
+from .config import Config, NodeConfig, PeerConfig, PeersDiff
+from .connect_latency import ConnectLatencies
+from .dns_cache import DnsCache
+from .exporter_metrics import LAST_SUCCESS
+from .probe_planner import ProbePlanner
+from .sharding import PeerShard
+
+# Metric values of quorum_tcp_egress_connectivity
+CONNECTIVITY_UNKNOWN = -1
+CONNECTIVITY_FAILED = 0
+CONNECTIVITY_OK = 1
+
+
+class EgressConnectivityCollector(BaseCollector):  # pylint: disable=R0902
+    """Probes the TCP egress connectivity of the Quorum node to the peers and provides metrics.
+        Subclasses implement how the peers are probed.
+    """
+
+    def __init__(self, config: Config, node: NodeConfig, collector: str,
+                 probe_planner: ProbePlanner = None,
+                 outbound_connected_enodes: Callable[[], frozenset] = None):
+        super().__init__()
+        self._config = config
+        self._node = node
+        # Name of the collector used as label of the exporter metrics, e.g. 'kube_exec'
+        self._collector = collector
+        # Provides the enodes the node has an outbound connection to, e.g. by the RPC metrics collector
+        self._outbound_connected_enodes = outbound_connected_enodes or frozenset
+        # Skips probes of reachable peers and backs off on failing peers, None if disabled
+        self._probe_planner = probe_planner
+        # The latest probe result of each peer. Key is the enode, value is True, False or None (unknown)
+        self._probe_results = {}
+        # Guards the probe results as peers may be probed on config reload concurrently to processing
+        self._lock = threading.Lock()
+        # Point in time of the last probe results of all peers, None before the first processing
+        self._last_success_time = None
+        # True while the probe results are restored from the snapshot of a previous run
+        self._stale = False
+        # The share of the peers probed by this replica, None if all peers are probed
+        self._shard = None
+        if config.sharding.enabled:
+            self._shard = PeerShard(config.sharding.ordinal, config.sharding.replicas, config.sharding.virtual_nodes)
+        # Resolves the host names of the peers, None if resolved by the probes
+        self._dns_cache = None
+        if config.dns.enabled:
+            self._dns_cache = DnsCache(config.dns.ttl, config.dns.negative_ttl, config.dns.timeout, config.dns.workers)
+        # The TCP connect latency of each peer, None if not measured
+        self._connect_latencies = None
+        if config.connect_latency.enabled:
+            self._connect_latencies = ConnectLatencies(config.connect_latency.buckets)
+
+    def _check_connectivity(self, peers: List[PeerConfig]) -> Tuple[dict, dict]:
+        """Checks the connectivity to the peers. Implemented by subclasses.
+            If connect_latency is enabled, the TCP connect latency is measured connect_latency.samples times per peer.
+
+        Args:
+            peers (List[PeerConfig]): The peers to check
+
+        Returns:
+            Tuple[dict, dict]: The results and the latencies. Key is the enode, value of the results is True
+                if connection could be established else False, value of the latencies is the list of connect latencies
+                in seconds of the successful samples. Peers without result are missing.
+        """
+        raise NotImplementedError()
+
+    def _check_resolved_connectivity(self, peers: List[PeerConfig]) -> Tuple[dict, dict]:
+        """Resolves the host names of the peers and checks the connectivity to the resolved IP addresses.
+            Peers whose host name cannot be resolved are not probed, so they are reported as unknown and not
+            as no connectivity.
+
+        Args:
+            peers (List[PeerConfig]): The peers to check
+
+        Returns:
+            Tuple[dict, dict]: The results and the latencies, see _check_connectivity()
+        """
+        if self._dns_cache is None:
+            return self._check_connectivity(peers)
+        addresses = self._dns_cache.resolve_all({str(each_peer.address) for each_peer in peers})
+        resolved_peers = [PeerConfig(each_peer.name, each_peer.enode, addresses[str(each_peer.address)], each_peer.port)
+                          for each_peer in peers if addresses[str(each_peer.address)] is not None]
+        if len(resolved_peers) == 0:
+            return {}, {}
+        return self._check_connectivity(resolved_peers)
+
+    def _get_peers(self) -> dict:
+        """Get the configured peers probed by this replica
+
+        Returns:
+            dict: All configured peers or the share of this replica if sharded. Key is the enode, value is of type PeerConfig
+        """
+        peers = self._config.get_peers(self._node)
+        if self._shard is None:
+            return peers
+        return self._shard.select(peers)
+
+    def _update_probe_results(self, peers: List[PeerConfig], results: dict, latencies: dict):
+        """Stores the results of probed peers and removes results of peers not configured (or not owned) anymore.
+            Must be called with lock held.
+
+        Args:
+            peers (List[PeerConfig]): The probed peers
+            results (dict): The results of the probed peers
+            latencies (dict): The connect latencies of the probed peers
+        """
+        for each_peer in peers:
+            self._probe_results[each_peer.enode] = results.get(each_peer.enode)
+        owned_peers = self._get_peers()
+        for each_enode in [enode for enode in self._probe_results if enode not in owned_peers]:
+            del self._probe_results[each_enode]
+        if self._connect_latencies is not None:
+            for each_enode, samples in latencies.items():
+                self._connect_latencies.observe(each_enode, samples)
+            self._connect_latencies.retain(owned_peers)
+
+    def _create_metrics(self, instance_name: str) -> list:
+        """Creates the metrics from the probe results of all peers probed by this replica. Must be called with lock held.
+            If sharded, the metrics have the additional label shard.
+
+        Args:
+            instance_name (str): A pretty instance name
+
+        Returns:
+            list: The metrics
+        """
+        shard_labels, shard_values = ([], []) if self._shard is None else (['shard'], [self._shard.label])
+        peer_labels = ['instance_name', 'enode', 'enode_short', 'name'] + shard_labels
+        metric_probe_age = None
+        if self._probe_planner is not None:
+            metric_probe_age = GaugeMetricFamily(
+                'quorum_tcp_egress_last_probe_age_seconds',
+                'Seconds since the TCP egress connectivity to a peer has been checked by a probe',
+                labels=peer_labels)
+        now = time.time()
+
+        metrics = GaugeMetricFamily('quorum_tcp_egress_connectivity',
+                                    'Quorum TCP egress connectivity to other nodes by enode. (0) for no connectivity, (1) for connectivity can be established, (-1) for unknown/timeout',
+                                    labels=peer_labels)
+
+        for each_config_peer in self._get_peers().values():
+            connection_successful = self._probe_results.get(each_config_peer.enode)
+            if connection_successful is None:
+                value = CONNECTIVITY_UNKNOWN
+            else:
+                value = CONNECTIVITY_OK if connection_successful else CONNECTIVITY_FAILED
+            peer_values = [instance_name, each_config_peer.enode,
+                           each_config_peer.enode[0:20], each_config_peer.name] + shard_values
+            metrics.add_metric(peer_values, value)
+
+            if metric_probe_age is not None:
+                last_probe_time = self._probe_planner.last_probe_time(each_config_peer.enode)
+                if last_probe_time is not None:
+                    metric_probe_age.add_metric(peer_values, max(0.0, now - last_probe_time))
+
+        metric_stale = GaugeMetricFamily(
+            'quorum_tcp_egress_stale',
+            'Quorum TCP egress connectivity metrics are up to date (0) or restored from the snapshot (1)',
+            labels=['instance_name'] + shard_labels)
+        metric_stale.add_metric([instance_name] + shard_values, 1 if self._stale else 0)
+
+        result = [metrics]
+        if metric_probe_age is not None:
+            result.append(metric_probe_age)
+        result.append(metric_stale)
+        if self._connect_latencies is not None:
+            result.extend(self._connect_latencies.create_metrics(
+                instance_name, self._get_peers().values(), shard_labels, shard_values))
+        return result
+
+    def create_current_metrics(self, instance_name: str):
+        """Probes the peers and creates the current metrics
+
+        Args:
+            instance_name (str): A pretty instance name
+        """
+        peers = list(self._get_peers().values())
+        logging.info("%s >> Creating metrics for %s of %s peers - instance_name=%s",
+                     type(self).__name__, len(peers), len(self._config.peers), instance_name)
+
+        plan = None
+        if self._probe_planner is not None:
+            with self._lock:
+                plan = self._probe_planner.plan(peers, self._outbound_connected_enodes())
+            logging.info("%s >> Probe plan - probe=%s, reachable=%s, deferred=%s, instance_name=%s",
+                         type(self).__name__, len(plan.to_probe), len(plan.reachable),
+                         len(plan.deferred), instance_name)
+            peers = plan.to_probe
+
+        results, latencies = {}, {}
+        if len(peers) > 0:
+            results, latencies = self._check_resolved_connectivity(peers)
+
+        with self._lock:
+            if plan is not None:
+                for each_peer in peers:
+                    self._probe_planner.record(each_peer, results.get(each_peer.enode))
+                # An outbound connection proves connectivity, deferred peers keep their last result
+                for each_peer in plan.reachable:
+                    results[each_peer.enode] = True
+                peers = peers + plan.reachable
+            self._update_probe_results(peers, results, latencies)
+            self._stale = False
+            self._last_success_time = time.time()
+            # Set before the listeners render the metrics
+            LAST_SUCCESS.labels(self._collector, instance_name).set(self._last_success_time)
+            self._set_current_metrics(self._create_metrics(instance_name))
+
+    def get_snapshot(self) -> dict:
+        """Get the probe results of the last processing
+
+        Returns:
+            dict: The point in time and the probe result by enode or None if not processed yet
+        """
+        with self._lock:
+            if self._last_success_time is None:
+                return None
+            return {'timestamp': self._last_success_time, 'results': dict(self._probe_results)}
+
+    def restore_snapshot(self, snapshot: dict):
+        """Restores the probe results of the peers probed by this replica of a previous run,
+            marked as stale until the first processing
+
+        Args:
+            snapshot (dict): The state of get_snapshot()
+        """
+        instance_name = self._node.instance_name
+        timestamp = snapshot.get('timestamp')
+        results = snapshot.get('results', {})
+        with self._lock:
+            self._probe_results = {enode: results[enode] for enode in self._get_peers()
+                                   if isinstance(results.get(enode), bool)}
+            self._stale = True
+            if isinstance(timestamp, (int, float)):
+                self._last_success_time = timestamp
+                LAST_SUCCESS.labels(self._collector, instance_name).set(timestamp)
+            self._set_current_metrics(self._create_metrics(instance_name))
+
+    def update_peers(self, diff: PeersDiff):
+        """Applies the changed peers of a config reload. Only added peers and peers with changed address are probed,
+            the results of all other peers are kept.
+
+        Args:
+            diff (PeersDiff): The changed peers
+        """
+        peers = diff.added + diff.changed
+        if self._shard is not None:
+            peers = [each_peer for each_peer in peers if self._shard.owns(each_peer.enode)]
+        results, latencies = {}, {}
+        if len(peers) > 0:
+            logging.info("%s >> Checking %s added or changed peers - instance_name=%s",
+                         type(self).__name__, len(peers), self._node.instance_name)
+            results, latencies = self._check_resolved_connectivity(peers)
+        if self._dns_cache is not None:
+            self._dns_cache.retain(str(each_peer.address) for each_peer in self._get_peers().values())
+
+        with self._lock:
+            if self._probe_planner is not None:
+                for each_peer in diff.removed + diff.changed:
+                    self._probe_planner.remove(each_peer.enode)
+                for each_peer in peers:
+                    self._probe_planner.record(each_peer, results.get(each_peer.enode))
+            self._update_probe_results(peers, results, latencies)
+            self._set_current_metrics(self._create_metrics(self._node.instance_name))
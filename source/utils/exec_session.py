@@ -0,0 +1,195 @@
+"""Long living shell sessions in the Quorum pod, so a probe costs a round trip on an open exec stream
+instead of a new exec (websocket upgrade through the K8S API server and the kubelet and starting a shell)
+"""
+import concurrent.futures
+import logging
+import queue
+import secrets
+import threading
+import time
+from typing import Callable
+
+from kubernetes.client.exceptions import ApiException
+from websocket import WebSocketException
+
+from .exporter_metrics import ERRORS, PHASE_DURATION
+
+
+class ExecSessionError(Exception):
+    """The session could not be opened, was closed or a command did not finish in time
+    """
+
+
+class ExecSession:
+    """A shell reading commands from stdin of an exec stream. The output of each command is delimited
+        by a line with an end marker unique to the session and the command. The session is (re)opened
+        on first use, if the pod changed and after a failure.
+    """
+
+    def __init__(self, instance_name: str, open_stream: Callable[[str, float], object]):
+        self._instance_name = instance_name
+        # Opens the exec stream of the shell in a pod within a timeout, see kubernetes.stream.ws_client.WSClient
+        self._open_stream = open_stream
+        self._stream = None
+        # Future of an open which did not finish in time, a session has one pending open at most
+        self._pending_open = None
+        self._pod_name = None
+        # Random prefix of the end markers, so the output of a command cannot fake the end of another
+        self._marker_prefix = None
+        self._commands = 0
+
+    def _open(self, pod_name: str, timeout: float):
+        """Opens the exec stream of the shell in a pod. The kubernetes client does not apply a timeout
+            to the websocket upgrade, so the exec is opened in a thread and abandoned if not open in time.
+
+        Args:
+            pod_name (str): The pod name
+            timeout (float): Max. seconds until the exec stream is open
+
+        Raises:
+            ExecSessionError: The exec failed or did not open in time
+        """
+        self.close()
+        if self._pending_open is not None and not self._pending_open.done():
+            ERRORS.labels('kube_exec', 'session_failed', self._instance_name).inc()
+            raise ExecSessionError(f"Cannot open session, the previous open is still pending - pod_name={pod_name}")
+        self._pending_open = None
+        future = concurrent.futures.Future()
+        threading.Thread(target=self._run_open, args=(future, pod_name, timeout),
+                         name=f'exec-session-open-{self._instance_name}', daemon=True).start()
+        try:
+            with PHASE_DURATION.labels('kube_exec', 'session_open', self._instance_name).time():
+                self._stream = future.result(timeout)
+        except concurrent.futures.TimeoutError as ex:
+            ERRORS.labels('kube_exec', 'session_failed', self._instance_name).inc()
+            self._pending_open = future
+            # Closes the stream once open, called right away if opened meanwhile
+            future.add_done_callback(self._close_pending_open)
+            raise ExecSessionError(f"Cannot open session within {timeout}s - pod_name={pod_name}") from ex
+        except ApiException as ex:
+            # The kubernetes client raises any failure of the exec as ApiException
+            ERRORS.labels('kube_exec', 'session_failed', self._instance_name).inc()
+            raise ExecSessionError(f"Cannot open session - pod_name={pod_name} - {ex}") from ex
+        self._pod_name = pod_name
+        self._marker_prefix = f'__quorum_exporter_end_{secrets.token_hex(8)}_'
+        self._commands = 0
+        logging.debug("%s >> Session opened - instance_name=%s, pod_name=%s",
+                      type(self).__name__, self._instance_name, pod_name)
+
+    def _run_open(self, future: concurrent.futures.Future, pod_name: str, timeout: float):
+        """Opens the exec stream, run in a thread
+
+        Args:
+            future (concurrent.futures.Future): Completed with the open exec stream
+            pod_name (str): The pod name
+            timeout (float): Max. seconds until the exec stream is open
+        """
+        try:
+            future.set_result(self._open_stream(pod_name, timeout))
+        except Exception as ex:  # pylint: disable=W0703
+            # Raised in the waiting thread, the future must complete whatever the failure
+            future.set_exception(ex)
+
+    def _close_pending_open(self, future: concurrent.futures.Future):
+        """Closes the exec stream of an abandoned open
+
+        Args:
+            future (concurrent.futures.Future): The completed open
+        """
+        if future.exception() is not None:
+            return
+        try:
+            future.result().close()
+        except (WebSocketException, OSError):
+            logging.debug("%s >> Closing abandoned session failed - instance_name=%s",
+                          type(self).__name__, self._instance_name, exc_info=True)
+
+    def run(self, pod_name: str, script: str, timeout: float) -> str:
+        """Runs a shell script in the session. Not thread safe, a session runs a single script at a time.
+
+        Args:
+            pod_name (str): The pod to run in, the session is reopened if changed
+            script (str): The shell script, its output must not depend on stdin
+            timeout (float): Max. seconds until the output is complete
+
+        Raises:
+            ExecSessionError: The session failed, it is reopened on next run
+
+        Returns:
+            str: The output of the script on stdout
+        """
+        if self._stream is None or self._pod_name != pod_name or not self._stream.is_open():
+            self._open(pod_name, timeout)
+
+        self._commands += 1
+        marker = f'{self._marker_prefix}{self._commands}'
+        deadline = time.monotonic() + timeout
+        lines = []
+        try:
+            self._stream.write_stdin(f'{script}\necho "{marker}"\n')
+            while True:
+                remaining = deadline - time.monotonic()
+                line = self._stream.readline_stdout(timeout=remaining) if remaining > 0 else None
+                if line is None:
+                    raise ExecSessionError(
+                        f"Session closed or timed out after {timeout}s - pod_name={pod_name}")
+                if line == marker:
+                    break
+                lines.append(line)
+            # Drops stderr and the copy of all output kept by the stream, so a long living stream does not grow
+            self._stream.read_all()
+        except ExecSessionError:
+            self._fail()
+            raise
+        except (WebSocketException, OSError) as ex:
+            self._fail()
+            raise ExecSessionError(f"Session failed - pod_name={pod_name} - {ex}") from ex
+        return '\n'.join(lines)
+
+    def _fail(self):
+        """Closes a failed session, the output of a running command would be mixed into the next one
+        """
+        ERRORS.labels('kube_exec', 'session_failed', self._instance_name).inc()
+        self.close()
+
+    def close(self):
+        """Closes the exec stream, the shell in the pod exits
+        """
+        stream = self._stream
+        self._stream = None
+        if stream is not None:
+            try:
+                stream.close()
+            except (WebSocketException, OSError):
+                logging.debug("%s >> Closing session failed - instance_name=%s",
+                              type(self).__name__, self._instance_name, exc_info=True)
+
+
+class ExecSessionPool:  # pylint: disable=R0903
+    """A fixed number of sessions, so concurrent probes each use their own session
+    """
+
+    def __init__(self, size: int, create_session: Callable[[], ExecSession]):
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(create_session())
+
+    def run(self, pod_name: str, script: str, timeout: float) -> str:
+        """Runs a shell script in an idle session. Waits for an idle session if all are in use.
+
+        Args:
+            pod_name (str): The pod to run in
+            script (str): The shell script
+            timeout (float): Max. seconds until the output is complete
+
+        Raises:
+            ExecSessionError: The session failed
+
+        Returns:
+            str: The output of the script on stdout
+        """
+        session = self._idle.get()
+        try:
+            return session.run(pod_name, script, timeout)
+        finally:
+            self._idle.put(session)
@@ -0,0 +1,63 @@
+"""Metrics about the exporter itself
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+SCHEDULER_INTERVAL = Gauge(
+    'quorum_exporter_scheduler_interval_seconds',
+    'Achieved interval between the last two runs of a collector in seconds',
+    ['collector', 'instance_name'])
+
+SCHEDULER_DURATION = Gauge(
+    'quorum_exporter_scheduler_duration_seconds',
+    'Duration of the last run of a collector in seconds',
+    ['collector', 'instance_name'])
+
+SCHEDULER_OVERRUNS = Counter(
+    'quorum_exporter_scheduler_overruns',
+    'Number of runs of a collector that took longer than the interval',
+    ['collector', 'instance_name'])
+
+PHASE_DURATION = Histogram(
+    'quorum_exporter_phase_duration_seconds',
+    'Duration of a processing phase of a collector in seconds',
+    ['collector', 'phase', 'instance_name'])
+
+ERRORS = Counter(
+    'quorum_exporter_errors',
+    'Number of errors of a collector by type',
+    ['collector', 'type', 'instance_name'])
+
+LAST_SUCCESS = Gauge(
+    'quorum_exporter_last_success_timestamp_seconds',
+    'Point in time of the last successful refresh of the metrics of a collector in seconds since epoch',
+    ['collector', 'instance_name'])
+
+POD_CACHE_AGE = Gauge(
+    'quorum_exporter_pod_cache_age_seconds',
+    'Seconds since the cached pod name of the Quorum deployment has been confirmed by the K8S API',
+    ['instance_name'])
+
+DNS_RESOLVE_DURATION = Histogram(
+    'quorum_exporter_dns_resolve_duration_seconds',
+    'Duration of resolving the host name of a peer in seconds by result: resolved or failed',
+    ['result'])
+
+DNS_FAILURES = Counter(
+    'quorum_exporter_dns_failures',
+    'Number of failed resolutions of the host name of a peer by reason: error (not resolvable) or timeout',
+    ['reason'])
+
+ON_DEMAND_REFRESHES = Counter(
+    'quorum_exporter_on_demand_refreshes',
+    'Number of scrapes by what a collector did in on demand mode: refreshed, coalesced (joined a running refresh), cached (data not older than max_age) or deadline (served cached data as the refresh was too slow)',
+    ['collector', 'instance_name', 'result'])
+
+SUBSCRIPTION_CONNECTED = Gauge(
+    'quorum_exporter_subscription_connected',
+    'Subscription to the head and peer events of the Quorum node connected (1) or not (0)',
+    ['instance_name'])
+
+SUBSCRIPTION_EVENTS = Counter(
+    'quorum_exporter_subscription_events',
+    'Number of events received by the subscription of the Quorum node by event: new_head, peer_add or peer_drop',
+    ['instance_name', 'event'])
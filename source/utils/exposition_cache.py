@@ -0,0 +1,184 @@
+"""Pre-rendered and pre-compressed exposition of the collector metrics, completed by the exporter metrics on scrape
+"""
+import hashlib
+import threading
+import zlib
+
+from prometheus_client import exposition
+from prometheus_client.openmetrics import exposition as openmetrics_exposition
+from prometheus_client.registry import CollectorRegistry
+
+# Terminates an exposition in OpenMetrics format, rendered once after the last metric family
+OPENMETRICS_EOF = b'# EOF\n'
+
+
+def _create_etag(data: bytes) -> str:
+    """Creates an entity tag
+
+    Args:
+        data (bytes): The data
+
+    Returns:
+        str: The entity tag including quotes
+    """
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+class CachedExposition:
+    """The rendered metrics in one format. The compressor is kept after compressing the metrics,
+        so metrics appended on scrape continue the same gzip stream without compressing the cached metrics again.
+    """
+
+    def __init__(self, content_type: str, body: bytes):
+        self._content_type = content_type
+        self._body = body
+        # Level 6 as gzip.compress, 31 for the gzip header and trailer
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        self._gzip_prefix = self._compressor.compress(body) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self._gzip_body = self._gzip_prefix + self._compressor.copy().flush()
+        self._etag = _create_etag(body)
+
+    @property
+    def content_type(self) -> str:
+        """The content type of the format
+
+        Returns:
+            str: The content type
+        """
+        return self._content_type
+
+    @property
+    def body(self) -> bytes:
+        """The rendered metrics
+
+        Returns:
+            bytes: The rendered metrics
+        """
+        return self._body
+
+    @property
+    def gzip_body(self) -> bytes:
+        """The gzip compressed rendered metrics
+
+        Returns:
+            bytes: The compressed rendered metrics
+        """
+        return self._gzip_body
+
+    @property
+    def etag(self) -> str:
+        """The entity tag of the rendered metrics
+
+        Returns:
+            str: The entity tag including quotes
+        """
+        return self._etag
+
+    def compress_with(self, body: bytes) -> bytes:
+        """Compresses the rendered metrics followed by other metrics, only the other metrics are compressed
+
+        Args:
+            body (bytes): The metrics following the rendered metrics
+
+        Returns:
+            bytes: The gzip compressed metrics
+        """
+        compressor = self._compressor.copy()
+        return self._gzip_prefix + compressor.compress(body) + compressor.flush()
+
+
+class ScrapeExposition:
+    """The cached metrics of the collectors followed by the metrics rendered on scrape. Same interface as CachedExposition.
+        The entity tag is the weak one of the cached metrics, the metrics rendered on scrape change on every scrape
+        and are not worth a transfer on their own.
+    """
+
+    def __init__(self, cached_exposition: CachedExposition, body: bytes):
+        self._cached_exposition = cached_exposition
+        self._scrape_body = body
+        self._etag = 'W/' + cached_exposition.etag
+
+    @property
+    def content_type(self) -> str:
+        """The content type of the format
+
+        Returns:
+            str: The content type
+        """
+        return self._cached_exposition.content_type
+
+    @property
+    def body(self) -> bytes:
+        """The rendered metrics
+
+        Returns:
+            bytes: The rendered metrics
+        """
+        return self._cached_exposition.body + self._scrape_body
+
+    @property
+    def gzip_body(self) -> bytes:
+        """The gzip compressed rendered metrics, compressed when requested only
+
+        Returns:
+            bytes: The compressed rendered metrics
+        """
+        return self._cached_exposition.compress_with(self._scrape_body)
+
+    @property
+    def etag(self) -> str:
+        """The weak entity tag of the cached metrics
+
+        Returns:
+            str: The entity tag including W/ and quotes
+        """
+        return self._etag
+
+
+class ExpositionCache:
+    """Renders the metrics of the collectors once after they have been changed. Scrapes are served from the cache,
+        so a scrape does not need to serialize or compress any metric of a collector. The metrics of the exporter itself,
+        e.g. of the scheduler, are few and change anytime, therefore they are rendered on every scrape.
+    """
+
+    def __init__(self, registry: CollectorRegistry, live_registry: CollectorRegistry = None):
+        self._registry = registry
+        # Rendered on every scrape
+        self._live_registry = live_registry
+        self._lock = threading.Lock()
+        # Tuple of CachedExposition (text format, OpenMetrics format), replaced in a single atomic operation
+        self._expositions = None
+
+    def refresh(self):
+        """Renders the metrics of the registry. Called after metrics have been changed.
+        """
+        # Both formats from the same state, a concurrent refresh must not mix in an older rendering
+        with self._lock:
+            openmetrics_body = openmetrics_exposition.generate_latest(self._registry)
+            if self._live_registry is not None and openmetrics_body.endswith(OPENMETRICS_EOF):
+                # Terminated by the metrics of the live registry
+                openmetrics_body = openmetrics_body[:-len(OPENMETRICS_EOF)]
+            self._expositions = (
+                CachedExposition(exposition.CONTENT_TYPE_LATEST,
+                                 exposition.generate_latest(self._registry)),
+                CachedExposition(openmetrics_exposition.CONTENT_TYPE_LATEST, openmetrics_body))
+
+    def get(self, use_openmetrics: bool = False):
+        """Get the rendered metrics, renders the metrics of the registry if not done yet
+            and the metrics of the live registry
+
+        Args:
+            use_openmetrics (bool, optional): True for OpenMetrics format. Defaults to False.
+
+        Returns:
+            _type_: The rendered metrics, CachedExposition or ScrapeExposition
+        """
+        expositions = self._expositions
+        if expositions is None:
+            self.refresh()
+            expositions = self._expositions
+        if self._live_registry is None:
+            return expositions[1] if use_openmetrics else expositions[0]
+        if use_openmetrics:
+            return ScrapeExposition(expositions[1], openmetrics_exposition.generate_latest(self._live_registry))
+        return ScrapeExposition(expositions[0], exposition.generate_latest(self._live_registry))
@@ -0,0 +1,89 @@
+"""HTTP server serving the pre-rendered metrics of the ExpositionCache
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .exposition_cache import ExpositionCache
+from .on_demand_refresher import OnDemandRefresher
+
+
+class ExpositionRequestHandler(BaseHTTPRequestHandler):
+    """Serves the cached metrics on any path. Supports gzip, OpenMetrics and conditional requests via ETag.
+    """
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Handles a GET request
+        """
+        # In on demand mode the outdated collectors are refreshed first, the listeners refresh the cache
+        if self.server.on_demand_refresher is not None:
+            self.server.on_demand_refresher.refresh()
+
+        use_openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+        cached_exposition = self.server.exposition_cache.get(use_openmetrics)
+
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and _etag_matches(if_none_match, cached_exposition.etag):
+            self.send_response(304)
+            self.send_header('ETag', cached_exposition.etag)
+            self.end_headers()
+            return
+
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = cached_exposition.gzip_body if use_gzip else cached_exposition.body
+
+        self.send_response(200)
+        self.send_header('Content-Type', cached_exposition.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', cached_exposition.etag)
+        self.send_header('Vary', 'Accept, Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        """Do not log requests
+        """
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Checks if the If-None-Match header matches the entity tag, weak comparison as required for If-None-Match
+
+    Args:
+        if_none_match (str): Value of the If-None-Match header
+        etag (str): The entity tag
+
+    Returns:
+        bool: True if matching
+    """
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    for each_etag in if_none_match.split(','):
+        each_etag = each_etag.strip()
+        if each_etag.startswith('W/'):
+            each_etag = each_etag[2:]
+        if each_etag in ('*', etag):
+            return True
+    return False
+
+
+def start_exposition_server(port: int, exposition_cache: ExpositionCache, addr: str = '',
+                            on_demand_refresher: OnDemandRefresher = None) -> ThreadingHTTPServer:
+    """Starts the HTTP server in a daemon thread
+
+    Args:
+        port (int): The port
+        exposition_cache (ExpositionCache): The cache of the rendered metrics
+        addr (str, optional): The address to listen on. Defaults to '' (all addresses).
+        on_demand_refresher (OnDemandRefresher, optional): Refreshes the metrics on scrape in on demand mode. Defaults to None.
+
+    Returns:
+        ThreadingHTTPServer: The server
+    """
+    server = ThreadingHTTPServer((addr, port), ExpositionRequestHandler)
+    server.daemon_threads = True
+    server.exposition_cache = exposition_cache
+    server.on_demand_refresher = on_demand_refresher
+    thread = threading.Thread(target=server.serve_forever, name='exposition-server', daemon=True)
+    thread.start()
+    return server
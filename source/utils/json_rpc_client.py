@@ -0,0 +1,253 @@
+"""JSON-RPC client for the Quorum RPC endpoint
+"""
+import itertools
+import json
+import logging
+from typing import Callable, List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .json_stream import JsonStreamReader
+
+# Size of the chunks of a streamed response
+STREAM_CHUNK_SIZE = 16384
+
+
+class RpcUnavailableError(Exception):
+    """The RPC endpoint cannot be reached or did not return a valid response
+    """
+
+
+class JsonRpcError(Exception):
+    """The RPC endpoint returned a JSON-RPC error object
+    """
+
+    def __init__(self, method: str, error):
+        super().__init__(f"{method} failed: {error}")
+        self.method = method
+        self.error = error
+
+
+class JsonRpcClient:
+    """JSON-RPC client using a pooled keep-alive HTTP session, so the TCP connection is reused between calls.
+    """
+
+    def __init__(self, url: str, timeout: float = 2.0, connect_timeout: float = 1.0, retries: int = 1):
+        self._url = url
+        self._timeout = (connect_timeout, timeout)
+        self._ids = itertools.count(1)
+
+        # JSON-RPC reads are idempotent, therefore retry POST requests as well.
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=0.1, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(['POST']), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._session.headers.update({"Content-Type": "application/json"})
+
+    @property
+    def url(self) -> str:
+        """The URL of the RPC endpoint
+
+        Returns:
+            str: The URL
+        """
+        return self._url
+
+    def send(self, method: str, params: list = None, stream: bool = False) -> requests.Response:
+        """Sends a JSON-RPC request without parsing the response
+
+        Args:
+            method (str): The method, e.g. admin_peers
+            params (list, optional): The params. Defaults to None.
+            stream (bool, optional): True to return as soon as the headers have been received.
+                The body must then be read via read_streamed(). Defaults to False.
+
+        Raises:
+            RpcUnavailableError: The RPC endpoint is unavailable
+
+        Returns:
+            requests.Response: The response with HTTP status 200
+        """
+        request = {"jsonrpc": "2.0", "method": method, "params": params or [], "id": next(self._ids)}
+        return self._post(request, stream=stream)
+
+    def send_batch(self, calls: List[Tuple[str, list]], stream: bool = False) -> Tuple[requests.Response, dict]:
+        """Sends multiple JSON-RPC requests as a single batch in one HTTP round trip without parsing the response
+
+        Args:
+            calls (List[Tuple[str, list]]): The method and params of each request
+            stream (bool, optional): True to return as soon as the headers have been received.
+                The body must then be read via read_streamed_batch(). Defaults to False.
+
+        Raises:
+            RpcUnavailableError: The RPC endpoint is unavailable
+
+        Returns:
+            Tuple[requests.Response, dict]: The response with HTTP status 200 and the method of each request by id
+        """
+        batch = []
+        methods_by_id = {}
+        for method, params in calls:
+            request_id = next(self._ids)
+            methods_by_id[request_id] = method
+            batch.append({"jsonrpc": "2.0", "method": method, "params": params or [], "id": request_id})
+        return self._post(batch, stream=stream), methods_by_id
+
+    def read_streamed_batch(self, response: requests.Response, methods_by_id: dict, read_results: dict = None) -> dict:
+        """Reads the body of a streamed batch response while it arrives.
+            A failed request does not fail the batch, its JsonRpcError is returned instead of the result.
+
+        Args:
+            response (requests.Response): The response of send_batch() with stream=True
+            methods_by_id (dict): The method of each request by id as returned by send_batch()
+            read_results (dict, optional): Key is the method, value is called with a JsonStreamReader positioned
+                at the result and must read the result. The results of other methods are read as a whole.
+
+        Raises:
+            RpcUnavailableError: The response is invalid or the connection failed
+            JsonRpcError: The RPC endpoint rejected the whole batch
+
+        Returns:
+            dict: Key is the method, value is the result or a JsonRpcError. Methods without response are missing.
+        """
+        read_results = read_results or {}
+        results = {}
+        try:
+            reader = JsonStreamReader(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+            if reader.peek() != '[':
+                # A single error object, e.g. if the endpoint does not support batches
+                error = None
+                for key in reader.iter_object():
+                    if key == 'error':
+                        error = reader.read_value()
+                    else:
+                        reader.skip_value()
+                if error is not None:
+                    raise JsonRpcError('batch', error)
+                raise RpcUnavailableError("batch: Unexpected response")
+
+            for _ in reader.iter_array():
+                method, result = self._read_batch_item(reader, methods_by_id, read_results)
+                if method is not None:
+                    results[method] = result
+        except ValueError as ex:
+            raise RpcUnavailableError(f"batch: Invalid JSON response - {ex}") from ex
+        except requests.RequestException as ex:
+            raise RpcUnavailableError(f"batch: Reading response failed - {ex}") from ex
+        finally:
+            response.close()
+        return results
+
+    def _read_batch_item(self, reader: JsonStreamReader, methods_by_id: dict, read_results: dict) -> tuple:
+        """Reads a single response of a batch
+
+        Args:
+            reader (JsonStreamReader): The reader positioned at the response object
+            methods_by_id (dict): The method of each request by id
+            read_results (dict): The functions reading the result by method
+
+        Returns:
+            tuple: The method (None if unknown) and its result or JsonRpcError
+        """
+        method = None
+        has_result = False
+        result = None
+        result_value = None
+        error = None
+        for key in reader.iter_object():
+            if key == 'id':
+                method = methods_by_id.get(reader.read_value())
+            elif key == 'result':
+                has_result = True
+                if method is not None:
+                    result = read_results.get(method, JsonStreamReader.read_value)(reader)
+                else:
+                    # The id is usually sent first, otherwise the result is read as a whole
+                    result_value = reader.read_value()
+            elif key == 'error':
+                error = reader.read_value()
+            else:
+                reader.skip_value()
+
+        if method is None:
+            return None, None
+        if error is not None:
+            return method, JsonRpcError(method, error)
+        if not has_result:
+            return method, JsonRpcError(method, "Response without result")
+        if result_value is not None and method in read_results:
+            result = read_results[method](JsonStreamReader([json.dumps(result_value).encode('utf-8')]))
+        elif result_value is not None:
+            result = result_value
+        return method, result
+
+    def read_streamed(self, method: str, response: requests.Response, read_result: Callable):
+        """Reads the body of a streamed response while it arrives.
+
+        Args:
+            method (str): The method of the request
+            response (requests.Response): The response of send() with stream=True
+            read_result (Callable): Called with a JsonStreamReader positioned at the result, must read the result.
+
+        Raises:
+            RpcUnavailableError: The response is invalid or the connection failed
+            JsonRpcError: The RPC endpoint returned an error
+
+        Returns:
+            _type_: The value returned by read_result
+        """
+        try:
+            reader = JsonStreamReader(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+            has_result = False
+            result = None
+            error = None
+            for key in reader.iter_object():
+                if key == 'result':
+                    result = read_result(reader)
+                    has_result = True
+                elif key == 'error':
+                    error = reader.read_value()
+                else:
+                    reader.skip_value()
+        except ValueError as ex:
+            raise RpcUnavailableError(f"{method}: Invalid JSON response - {ex}") from ex
+        except requests.RequestException as ex:
+            raise RpcUnavailableError(f"{method}: Reading response failed - {ex}") from ex
+        finally:
+            response.close()
+
+        if error is not None:
+            raise JsonRpcError(method, error)
+        if not has_result:
+            raise RpcUnavailableError(f"{method}: Response without result")
+        return result
+
+    def _post(self, request, stream: bool = False) -> requests.Response:
+        """Posts a JSON-RPC request
+
+        Args:
+            request (_type_): The request object
+            stream (bool, optional): True to return as soon as the headers have been received. Defaults to False.
+
+        Raises:
+            RpcUnavailableError: The RPC endpoint is unavailable
+
+        Returns:
+            requests.Response: The response with HTTP status 200
+        """
+        try:
+            response = self._session.post(self._url, json=request, timeout=self._timeout, stream=stream)
+        except requests.RequestException as ex:
+            raise RpcUnavailableError(f"{self._url}: {ex}") from ex
+
+        if response.status_code != 200:
+            logging.debug("%s >> Unexpected HTTP status=%s, url=%s",
+                          type(self).__name__, response.status_code, self._url)
+            response.close()
+            raise RpcUnavailableError(f"{self._url}: HTTP status {response.status_code}")
+        return response
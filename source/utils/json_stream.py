@@ -0,0 +1,144 @@
+"""Incremental JSON reader for large responses
+"""
+import codecs
+import json
+from typing import Iterable, Iterator
+
+# Whitespace allowed between JSON tokens
+WHITESPACE = ' \t\r\n'
+# Characters a number may consist of
+NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+
+class JsonStreamReader:
+    """Pull parser reading JSON incrementally from chunks of bytes as they arrive.
+        Only the parts of the document currently read are kept in memory, so the caller can walk
+        into objects and arrays and extract single values without materializing the whole document.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Reads the next chunk into the buffer and drops the text already read
+
+        Returns:
+            bool: False if there are no more chunks
+        """
+        while not self._eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                text = self._text_decoder.decode(b'', final=True)
+            else:
+                text = self._text_decoder.decode(chunk)
+            if text or self._eof:
+                self._buffer = self._buffer[self._pos:] + text
+                self._pos = 0
+                return bool(text)
+        return False
+
+    def peek(self) -> str:
+        """Get the next non whitespace character without consuming it
+
+        Returns:
+            str: The next character or '' at the end of the document
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str):
+        """Consumes the next non whitespace character
+
+        Args:
+            char (str): The expected character
+
+        Raises:
+            ValueError: If the next character is not the expected one
+        """
+        next_char = self.peek()
+        if next_char != char:
+            raise ValueError(f"Expected '{char}' but got '{next_char}' at position {self._pos}")
+        self._pos += 1
+
+    def read_value(self):
+        """Reads and returns the next complete value, e.g. a string, number, object or array
+
+        Raises:
+            json.JSONDecodeError: The document is invalid or incomplete
+
+        Returns:
+            _type_: The value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # The value may be incomplete, read more
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if isinstance(value, (int, float)) and not isinstance(value, bool) \
+                    and NUMBER_CHARS.issuperset(self._buffer[end:]) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def skip_value(self):
+        """Skips the next value
+        """
+        self.read_value()
+
+    def iter_array(self) -> Iterator[int]:
+        """Iterates the elements of the next array.
+            For each element the index is yielded, the caller must read or skip the element before continuing.
+
+        Yields:
+            Iterator[int]: The index of the element
+        """
+        self._expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.peek() == ',':
+                self._pos += 1
+                continue
+            self._expect(']')
+            return
+
+    def iter_object(self) -> Iterator[str]:
+        """Iterates the members of the next object.
+            For each member the key is yielded, the caller must read or skip the value before continuing.
+
+        Yields:
+            Iterator[str]: The key of the member
+        """
+        self._expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(':')
+            yield key
+            if self.peek() == ',':
+                self._pos += 1
+                continue
+            self._expect('}')
+            return
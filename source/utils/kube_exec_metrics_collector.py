@@ -1,95 +1,157 @@
 """Prometheus metrics collector provided by executing commands in the Quorum pod via "kubectl exec"
 """
+import concurrent.futures
 import logging
-from typing import Iterable
+import shlex
+import time
+from typing import Callable, List, Tuple
 
 import kubernetes
-from kubernetes.client.api import core_v1_api, apps_v1_api
+from kubernetes.client.api import core_v1_api
+from kubernetes.client.exceptions import ApiException
 from kubernetes.stream import stream
-from prometheus_client.core import GaugeMetricFamily, Metric
-from prometheus_client.registry import Collector
 
-from .config import Config, PeerConfig  # pylint: disable=E0402
-from .helper import Helper  # pylint: disable=E0402
+from .config import Config, KubeExecConfig, NodeConfig, PeerConfig
+from .egress_connectivity_collector import EgressConnectivityCollector
+from .exec_session import ExecSession, ExecSessionError, ExecSessionPool
+from .exporter_metrics import ERRORS, PHASE_DURATION, POD_CACHE_AGE
+from .pod_watcher import PodWatcher
+from .probe_planner import ProbePlanner
 
+# Shell function used by the batch probe script. Prints "<index> <exit code of nc>" for a peer.
+BATCH_PROBE_FUNCTION = 'probe() { nc -z -w 1 "$2" "$3" >/dev/null 2>&1; echo "$1 $?"; }'
 
-class KubeExecMetricsCollector(Collector):
+# Shell function used if the connect latency is measured. Connects "$4" times and prints
+# "<index> <0 if any connect succeeded else 1> <nanoseconds of each successful connect>..." for a peer.
+# The latency includes starting nc and is omitted if "date" does not support nanoseconds.
+LATENCY_PROBE_FUNCTION = (
+    'probe() { r=1; t=; n=$4; while [ "$n" -gt 0 ]; do s=$(date +%s%N); '
+    'if nc -z -w 1 "$2" "$3" >/dev/null 2>&1; then e=$(date +%s%N); r=0; '
+    'case "$s$e" in *[!0-9]*) ;; *) t="$t $((e-s))";; esac; fi; n=$((n-1)); done; echo "$1 $r$t"; }')
+
+
+def _parse_probe_output_line(line: str) -> Tuple[int, bool, list]:
+    """Parses a line "<index> <exit code> [<nanoseconds>...]" printed by the probe functions
+
+    Args:
+        line (str): The line
+
+    Returns:
+        Tuple[int, bool, list]: The index of the peer, True if connection could be established and the
+            connect latencies in seconds, None if the line is invalid
+    """
+    fields = line.split()
+    if len(fields) < 2 or not all(each.isdigit() for each in fields):
+        return None
+    return int(fields[0]), fields[1] == '0', [int(each) / 1e9 for each in fields[2:]]
+
+
+class KubeExecMetricsCollector(EgressConnectivityCollector):
     """Executes commands via "kubectl exec" in remote pod and provides metrics
     """
 
-    def __init__(self, config: Config):
-        # The current metrics to be reported on a Prometheus scrape.
-        # We cannot use "default" Gauge as the values remain even if the peer does not exist anymore
-        # Therefore we set fresh metrics every time we collect peers information.
-        self._current_metrics = []
-        self._config = config
-        self._helper = Helper()
+    def __init__(self, config: Config, node: NodeConfig,
+                 outbound_connected_enodes: Callable[[], frozenset] = None):
+        # Skips probes of reachable peers and backs off on failing peers
+        probe_planner = None
+        if config.kube_exec.adaptive:
+            probe_planner = ProbePlanner(config.kube_exec.backoff_base, config.kube_exec.backoff_max)
+        super().__init__(config, node, 'kube_exec', probe_planner=probe_planner,
+                         outbound_connected_enodes=outbound_connected_enodes)
+        # Long living pool for running the execs of probe mode 'single' concurrently
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=config.kube_exec.workers, thread_name_prefix='kube-exec')
+        # Keeps the pod name in memory, created on first processing
+        self._pod_watcher = None
+        self._pod_watcher_started = None
+        # The pod name of the snapshot of a previous run, used until the pods have been listed
+        self._restored_pod_name = None
+        # Long living shells in the pod, one per worker in probe mode 'single', a single one in probe mode 'batch'
+        self._session_pool = None
+        if config.kube_exec.session:
+            sessions = config.kube_exec.workers if config.kube_exec.probe_mode == KubeExecConfig.PROBE_MODE_SINGLE else 1
+            self._session_pool = ExecSessionPool(sessions, lambda: ExecSession(node.instance_name, self._open_exec_stream))
+
+    def _start_pod_watcher(self):
+        """Initializes the K8S API client and starts watching the pods of the Quorum deployment
+        """
+        # Use Incluster Config, the kubeconfig when running outside of K8S, e.g. local development or soak test
+        try:
+            kubernetes.config.load_incluster_config()
+        except kubernetes.config.ConfigException:
+            kubernetes.config.load_kube_config()
 
-    def collect(self) -> Iterable[Metric]:
-        """Get the current metrics. Implementation of the Collector
+        self._pod_watcher = PodWatcher(instance_name=self._node.instance_name,
+                                       namespace=self._node.namespace,
+                                       deployment=self._node.deployment,
+                                       api_client=kubernetes.client.ApiClient(),
+                                       pod_name=self._restored_pod_name)
+        self._pod_watcher.start()
+        self._pod_watcher_started = time.time()
+        POD_CACHE_AGE.labels(self._node.instance_name).set_function(self._get_pod_cache_age)
+        if not self._pod_watcher.wait_for_sync(timeout=5.0):
+            logging.warning("%s >> Pods not listed yet - deployment=%s, namespace=%s",
+                            type(self).__name__, self._node.deployment, self._node.namespace)
+
+    def _get_pod_cache_age(self) -> float:
+        """Get the age of the cached pod name, evaluated on scrape
 
         Returns:
-            Iterable[Metric]: The current metrics
+            float: Seconds since the pod name has been confirmed by the K8S API or since the watch started if not yet
         """
-        return self._current_metrics
+        last_sync_time = self._pod_watcher.last_sync_time
+        return max(0.0, time.time() - (last_sync_time if last_sync_time is not None else self._pod_watcher_started))
+
+    def _open_exec_stream(self, pod_name: str, timeout: float):
+        """Starts a shell in the pod reading its commands from stdin
 
-    def _lookup_pod_name(self) -> str:
-        """Looks up for the pod by configuration settings,
-            e.g. by  deployment name and namespace.
+        Args:
+            pod_name (str): The pod name
+            timeout (float): Max. seconds until the exec stream is open
 
         Returns:
-            str: pod name
+            _type_: The open exec stream, see kubernetes.stream.ws_client.WSClient
         """
-        apps_v1 = apps_v1_api.AppsV1Api()
         core_v1 = core_v1_api.CoreV1Api()
+        return stream(core_v1.connect_get_namespaced_pod_exec,
+                      name=pod_name,
+                      namespace=self._node.namespace,
+                      command=['/bin/sh'],
+                      stderr=True, stdin=True,
+                      stdout=True, tty=False,
+                      _preload_content=False,
+                      _request_timeout=timeout)
+
+    def _session_check_connectivity(self, pod_name: str, peer: PeerConfig) -> Tuple[bool, list]:
+        """Checks the connectivity from within the pod to the peer by a shell session
+
+        Returns:
+            Tuple[bool, list]: True if connection could be established else False
+                and the connect latencies of the successful samples in seconds
+        """
+        with PHASE_DURATION.labels('kube_exec', 'exec', self._node.instance_name).time():
+            output = self._session_pool.run(pod_name, self._create_batch_probe_script([peer]), timeout=3)
+        parsed_line = _parse_probe_output_line(output)
+        if parsed_line is None:
+            raise ValueError(f"Unexpected probe output '{output}'")
+        _, connection_successful, latencies = parsed_line
+        return connection_successful, latencies
 
-        # Determine Deployment and get labels selectors
-        # https://github.com/kubernetes-client/python/blob/master/kubernetes/docs/V1Deployment.md
-        logging.debug("%s >> Getting deployment - name=%s, namespace=%s",
-                      type(self).__name__, self._config.deployment, self._config.namespace)
-        deployment = apps_v1.read_namespaced_deployment(
-            name=self._config.deployment, namespace=self._config.namespace, _request_timeout=(1, 2))
-        if deployment is None:
-            logging.error("%s >> Deployment not found - name=%s, namespace=%s",
-                          type(self).__name__, self._config.deployment, self._config.namespace)
-            return (None, None)
-
-        # Format Label Selectors into key1=value1,key2=value2,... format
-        deployment_label_selector = deployment.spec.selector
-        label_selector_string = ','.join(map(
-            lambda key: f'{key}={deployment_label_selector.match_labels[key]}',
-            deployment_label_selector.match_labels.keys()))
-        logging.debug("%s >> Deployment found - label_selector_string=%s",
-                      type(self).__name__, label_selector_string)
-
-        # Get pods by selector
-        pod_list = core_v1.list_namespaced_pod(namespace=self._config.namespace,
-                                               label_selector=label_selector_string,
-                                               watch=False, _request_timeout=(1, 2))
-
-        if pod_list is None or len(pod_list.items) == 0:
-            logging.warning("%s >> No pods found - label_selector=%s, namespace=%s",
-                            type(self).__name__, label_selector_string, self._config.namespace)
-            return (None, None)
-
-        if len(pod_list.items) > 1:
-            logging.warning("%s >> More than one pod found - label_selector=%s, namespace=%s",
-                            type(self).__name__, label_selector_string, self._config.namespace)
-            for each_pod in pod_list.items:
-                logging.info("%s >> Pod found - name=%s",
-                             type(self).__name__, each_pod.metadata.name)
-            return (None, None)
-
-        #return (pod_list.items[0].metadata.name, pod_list.items[0].status.pod_ip)
-        return pod_list.items[0].metadata.name
-
-    def _kube_exec_check_connectivity(self, pod_name: str, peer: PeerConfig):
+    def _kube_exec_check_connectivity(self, pod_name: str, peer: PeerConfig) -> Tuple[bool, list]:
         """Checks the connectivity from within the pod to the peer
 
         Returns:
-            _type_: True if connection could be established else False
+            Tuple[bool, list]: True if connection could be established else False
+                and the connect latencies of the successful samples in seconds
         """
-        shell_command = f'nc -z -w 1 {peer.address} {peer.port};echo -n $?'
+        if self._session_pool is not None:
+            return self._session_check_connectivity(pod_name, peer)
+
+        if self._config.connect_latency.enabled:
+            shell_command = (f'{LATENCY_PROBE_FUNCTION}\nprobe 0 {shlex.quote(str(peer.address))} '
+                             f'{shlex.quote(str(peer.port))} {self._config.connect_latency.samples}')
+        else:
+            shell_command = f'nc -z -w 1 {peer.address} {peer.port};echo -n $?'
         logging.debug("%s >> shell_command=%s",
                       type(self).__name__, shell_command)
         exec_command = [
@@ -97,64 +159,209 @@ class KubeExecMetricsCollector(Collector):
             '-c',
             shell_command]
 
+        # Note: Do not share the api client between threads! stream() temporarily replaces
+        # the request method of the api client with a websocket request.
         core_v1 = core_v1_api.CoreV1Api()
-        resp = stream(core_v1.connect_get_namespaced_pod_exec,
-                      name=pod_name,
-                      namespace=self._config.namespace,
-                      command=exec_command,
-                      stderr=True, stdin=False,
-                      stdout=True, tty=False,
-                      _request_timeout=3)
+        with PHASE_DURATION.labels('kube_exec', 'exec', self._node.instance_name).time():
+            resp = stream(core_v1.connect_get_namespaced_pod_exec,
+                          name=pod_name,
+                          namespace=self._node.namespace,
+                          command=exec_command,
+                          stderr=True, stdin=False,
+                          stdout=True, tty=False,
+                          _request_timeout=3)
         # do not use a tuple for _request_timeout, otherwise:
         # kubernetes.client.exceptions.ApiException:
         # (0) Reason: '<' not supported between instances of 'float' and 'tuple'
 
-        connection_successful = resp == '0'  # either '0' or '1'
+        latencies = []
+        if self._config.connect_latency.enabled:
+            parsed_line = _parse_probe_output_line(resp or '')
+            if parsed_line is None:
+                raise ValueError(f"Unexpected probe output '{resp}'")
+            _, connection_successful, latencies = parsed_line
+        else:
+            connection_successful = resp == '0'  # either '0' or '1'
         logging.debug("%s >> %s %s (%s:%s) ", type(self).__name__,
                       'OK:  Connected to' if connection_successful else 'CANNOT connect to',
                       peer.name, peer.address, peer.port)
 
-        return connection_successful
+        return connection_successful, latencies
 
-    def create_current_metrics(self, instance_name: str, pod_name: str):
-        """Creates the current metrics
+    def _create_batch_probe_script(self, peers: List[PeerConfig]) -> str:
+        """Creates a shell script that checks the connectivity to all peers in parallel.
+            The script prints one line "<index> <exit code of nc>" per peer, index is the position in peers,
+            followed by the connect latencies if measured.
+
+        Args:
+            peers (List[PeerConfig]): The peers to check
+
+        Returns:
+            str: The shell script
+        """
+        if self._config.connect_latency.enabled:
+            lines = [LATENCY_PROBE_FUNCTION]
+            samples = f' {self._config.connect_latency.samples}'
+        else:
+            lines = [BATCH_PROBE_FUNCTION]
+            samples = ''
+        for index, peer in enumerate(peers):
+            lines.append(f'probe {index} {shlex.quote(str(peer.address))} {shlex.quote(str(peer.port))}{samples} &')
+        lines.append('wait')
+        return '\n'.join(lines)
+
+    def _exec_script(self, pod_name: str, script: str) -> str:
+        """Runs a shell script in the pod, in a session if enabled else with a new exec
 
         Args:
-            instance_name (str): A pretty instance name
             pod_name (str): The pod name
+            script (str): The shell script
+
+        Returns:
+            str: The output of the script
         """
-        logging.info("%s >> Creating metrics for %s peers - instance_name=%s, pod_name=%s, namespace=%s",
-                     type(self).__name__, len(self._config.peers.keys()),
-                     instance_name, pod_name, self._config.namespace)
+        timeout = self._config.kube_exec.deadline or 10
+        if self._session_pool is not None:
+            return self._session_pool.run(pod_name, script, timeout)
+        core_v1 = core_v1_api.CoreV1Api()
+        return stream(core_v1.connect_get_namespaced_pod_exec,
+                      name=pod_name,
+                      namespace=self._node.namespace,
+                      command=['/bin/sh', '-c', script],
+                      stderr=True, stdin=False,
+                      stdout=True, tty=False,
+                      _request_timeout=timeout)
 
-        metrics = GaugeMetricFamily('quorum_tcp_egress_connectivity',
-                                    'Quorum TCP egress connectivity to other nodes by enode. (0) for no connectivity, (1) for connectivity can be established',
-                                    labels=['instance_name', 'enode', 'enode_short', 'name'])
+    def _kube_exec_check_connectivity_batch(self, pod_name: str, peers: List[PeerConfig]) -> Tuple[dict, dict]:
+        """Checks the connectivity from within the pod to all peers with a single exec
 
-        for each_config_peer in self._config.peers.values():
-            connection_successful = self._kube_exec_check_connectivity(
-                pod_name=pod_name, peer=each_config_peer)
-            metrics.add_metric([instance_name, each_config_peer.enode,
-                                each_config_peer.enode[0:20], each_config_peer.name],
-                               1 if connection_successful else 0)
+        Args:
+            pod_name (str): The pod name
+            peers (List[PeerConfig]): The peers to check
+
+        Returns:
+            Tuple[dict, dict]: The results and the latencies by enode. Peers without result are missing.
+        """
+        try:
+            with PHASE_DURATION.labels('kube_exec', 'exec_batch', self._node.instance_name).time():
+                resp = self._exec_script(pod_name, self._create_batch_probe_script(peers))
+        except (ApiException, ExecSessionError) as ex:
+            ERRORS.labels('kube_exec', 'exec_failed', self._node.instance_name).inc()
+            logging.warning("%s >> Batch exec failed - pod_name=%s - %s", type(self).__name__, pod_name, ex)
+            return {}, {}
 
-        # Set current metrics to be reported by CustomCollector in a single atomic operation
-        self._current_metrics = [metrics]
+        results = {}
+        latencies = {}
+        for line in (resp or '').splitlines():
+            parsed_line = _parse_probe_output_line(line)
+            if parsed_line is None:
+                logging.debug("%s >> Ignoring unexpected output line=%s", type(self).__name__, line)
+                continue
+            index, connection_successful, peer_latencies = parsed_line
+            if index < len(peers):
+                results[peers[index].enode] = connection_successful
+                latencies[peers[index].enode] = peer_latencies
+
+        missing = len(peers) - len(results)
+        if missing > 0:
+            ERRORS.labels('kube_exec', 'exec_missing_result', self._node.instance_name).inc(missing)
+            logging.warning("%s >> No result for %s of %s peers - pod_name=%s",
+                            type(self).__name__, missing, len(peers), pod_name)
+        return results, latencies
+
+    def _kube_exec_check_connectivity_concurrently(self, pod_name: str, peers: List[PeerConfig]) -> Tuple[dict, dict]:
+        """Checks the connectivity from within the pod to all peers with one exec per peer.
+            The execs run concurrently on the worker pool and must finish within the deadline.
+
+        Args:
+            pod_name (str): The pod name
+            peers (List[PeerConfig]): The peers to check
+
+        Returns:
+            Tuple[dict, dict]: The results and the latencies by enode.
+                Peers which did not finish within the deadline or failed are missing.
+        """
+        futures = {
+            self._executor.submit(self._kube_exec_check_connectivity, pod_name, peer): peer
+            for peer in peers}
+        done, not_done = concurrent.futures.wait(
+            futures.keys(), timeout=self._config.kube_exec.deadline)
+
+        results = {}
+        latencies = {}
+        for future in done:
+            peer = futures[future]
+            try:
+                results[peer.enode], latencies[peer.enode] = future.result()
+            except (ApiException, ExecSessionError, ValueError) as ex:
+                ERRORS.labels('kube_exec', 'exec_failed', self._node.instance_name).inc()
+                logging.warning("%s >> Exec failed for %s (%s:%s) - %s",
+                                type(self).__name__, peer.name, peer.address, peer.port, ex)
+
+        if len(not_done) > 0:
+            # Execs already running cannot be cancelled but are bound by their request timeout
+            for future in not_done:
+                future.cancel()
+            ERRORS.labels('kube_exec', 'exec_timeout', self._node.instance_name).inc(len(not_done))
+            logging.warning("%s >> Deadline of %s seconds exceeded for %s of %s peers - pod_name=%s",
+                            type(self).__name__, self._config.kube_exec.deadline,
+                            len(not_done), len(peers), pod_name)
+        return results, latencies
+
+    def _check_connectivity(self, peers: List[PeerConfig]) -> Tuple[dict, dict]:
+        """Checks the connectivity from within the current pod to the peers according to the probe mode
+
+        Args:
+            peers (List[PeerConfig]): The peers to check
+
+        Returns:
+            Tuple[dict, dict]: The results and the latencies by enode.
+                Peers without result are missing, all peers if the pod is unknown.
+        """
+        # The pod name is kept up to date by the pod watcher, no K8S API call required
+        pod_name = self._pod_watcher.pod_name if self._pod_watcher is not None else None
+        if pod_name is None:
+            return {}, {}
+        logging.info("%s >> Checking %s peers - instance_name=%s, pod_name=%s, namespace=%s",
+                     type(self).__name__, len(peers), self._node.instance_name, pod_name, self._node.namespace)
+        if self._config.kube_exec.probe_mode == KubeExecConfig.PROBE_MODE_BATCH:
+            return self._kube_exec_check_connectivity_batch(pod_name=pod_name, peers=peers)
+        return self._kube_exec_check_connectivity_concurrently(pod_name=pod_name, peers=peers)
+
+    def get_snapshot(self) -> dict:
+        """Get the probe results of the last processing and the current pod name
+
+        Returns:
+            dict: The state or None if not processed yet
+        """
+        snapshot = super().get_snapshot()
+        if snapshot is not None:
+            snapshot['pod_name'] = self._pod_watcher.pod_name if self._pod_watcher is not None \
+                else self._restored_pod_name
+        return snapshot
+
+    def restore_snapshot(self, snapshot: dict):
+        """Restores the probe results and the pod name of a previous run
+
+        Args:
+            snapshot (dict): The state of get_snapshot()
+        """
+        super().restore_snapshot(snapshot)
+        self._restored_pod_name = snapshot.get('pod_name')
 
     def process(self):
         """Processes getting information and preparing metrics
 
         """
-        # Use Incluster Config
-        kubernetes.config.load_incluster_config()
+        if self._pod_watcher is None:
+            self._start_pod_watcher()
 
-        # Get DNS name and use it as "pretty" instance name
-        instance_name = self._helper.get_host_name(url=self._config.rpc_url)
-        # Retrieve pods name and ip
-        pod_name = self._lookup_pod_name()
+        instance_name = self._node.instance_name
+        pod_name = self._pod_watcher.pod_name
 
         if pod_name is not None:
-            self.create_current_metrics(instance_name, pod_name)
+            self.create_current_metrics(instance_name)
         else:
+            ERRORS.labels('kube_exec', 'pod_not_found', instance_name).inc()
             logging.warning("%s >> Cannot create metrics as pod_name None - pod_name=%s",
                             type(self).__name__, pod_name)
@@ -0,0 +1,106 @@
+"""Cache of the metric labels of peers
+"""
+import sys
+import time
+from collections import OrderedDict
+
+from .helper import Helper
+
+
+class PeerLabels:  # pylint: disable=R0903
+    """The precomputed and interned metric labels of a peer
+    """
+
+    __slots__ = ('enode', 'labels', 'labels_eth', 'labels_istanbul', 'last_used')
+
+    def __init__(self, instance_name: str, enode: str, name: str):
+        enode = sys.intern(enode)
+        enode_short = sys.intern(enode[0:20])
+        name = sys.intern(name if name is not None else enode_short)
+        self.enode = enode
+        # Labels instance_name, enode, enode_short, name
+        self.labels = (instance_name, enode, enode_short, name)
+        # Labels instance_name, enode, enode_short, name, protocol
+        self.labels_eth = self.labels + ('eth',)
+        self.labels_istanbul = self.labels + ('istanbul',)
+        self.last_used = 0.0
+
+
+class PeerLabelCache:
+    """Caches the labels of peers by enode URL. Peers connecting only temporarily are evicted by
+        least recently used (if the cache is full) and by time to live (if not seen for a while).
+    """
+
+    def __init__(self, instance_name: str, max_size: int = 4096, ttl: float = 3600.0):
+        self._instance_name = sys.intern(instance_name)
+        self._max_size = max_size
+        self._ttl = ttl
+        self._helper = Helper()
+        # Key is the enode URL, value is PeerLabels or None if the URL does not contain an enode.
+        # Ordered from least to most recently used.
+        self._entries = OrderedDict()
+        # Labels of the configured peers. Key is the enode
+        self._config_peer_entries = {}
+
+    def get(self, enode_url: str, config_peers: dict) -> PeerLabels:
+        """Get the labels of a connected peer
+
+        Args:
+            enode_url (str): The enode URL, e.g. enode://632176321637217632721@1.2.3.4:30303
+            config_peers (dict): The configured peers, used for the pretty name
+
+        Returns:
+            PeerLabels: The labels or None if the URL does not contain an enode
+        """
+        now = time.monotonic()
+        if enode_url in self._entries:
+            entry = self._entries[enode_url]
+            self._entries.move_to_end(enode_url)
+        else:
+            entry = None
+            enode = self._helper.get_enode_from_url(enode_url=enode_url)
+            if enode is not None:
+                config_peer = config_peers.get(enode)
+                entry = PeerLabels(self._instance_name, enode,
+                                   config_peer.name if config_peer is not None else None)
+            self._entries[enode_url] = entry
+            if len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        if entry is not None:
+            entry.last_used = now
+        return entry
+
+    def get_for_config_peer(self, enode: str, config_peers: dict) -> PeerLabels:
+        """Get the labels of a configured peer
+
+        Args:
+            enode (str): The enode of the configured peer
+            config_peers (dict): The configured peers
+
+        Returns:
+            PeerLabels: The labels
+        """
+        entry = self._config_peer_entries.get(enode)
+        if entry is None:
+            entry = PeerLabels(self._instance_name, enode, config_peers[enode].name)
+            self._config_peer_entries[enode] = entry
+        return entry
+
+    def evict(self):
+        """Removes the entries not used within the time to live
+        """
+        expired = time.monotonic() - self._ttl
+        while len(self._entries) > 0:
+            enode_url, entry = next(iter(self._entries.items()))
+            if entry is not None and entry.last_used >= expired:
+                break
+            del self._entries[enode_url]
+
+    def clear(self):
+        """Removes all entries, e.g. if the names of the configured peers have been changed
+        """
+        self._entries.clear()
+        self._config_peer_entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,45 @@
+"""Prometheus metrics collector combining the collectors of multiple Quorum nodes
+"""
+from typing import Iterable, List
+
+from prometheus_client.core import Metric
+from prometheus_client.registry import Collector
+
+
+class MultiNodeCollector(Collector):
+    """Combines the metrics of the collectors of all Quorum nodes.
+    """
+
+    def __init__(self):
+        # Key is the instance name, value is the list of collectors of the node
+        self._node_collectors = {}
+
+    def add_node(self, instance_name: str, collectors: List[Collector]):
+        """Adds the collectors of a Quorum node
+
+        Args:
+            instance_name (str): The instance name of the node
+            collectors (List[Collector]): The collectors of the node
+        """
+        # Replaced in a single atomic operation as nodes are added while the metrics may already be scraped
+        self._node_collectors = dict(self._node_collectors, **{instance_name: collectors})
+
+    def collect(self) -> Iterable[Metric]:
+        """Get the current metrics of all nodes. Implementation of the Collector
+            Metrics of the same name are merged into a single metric family as
+            the exposition format does not allow a metric family to appear multiple times.
+
+        Returns:
+            Iterable[Metric]: The current metrics
+        """
+        metrics = {}
+        for collectors in self._node_collectors.values():
+            for each_collector in collectors:
+                for each_metric in each_collector.collect():
+                    merged_metric = metrics.get(each_metric.name)
+                    if merged_metric is None:
+                        merged_metric = Metric(each_metric.name, each_metric.documentation,
+                                               each_metric.type, each_metric.unit)
+                        metrics[each_metric.name] = merged_metric
+                    merged_metric.samples.extend(each_metric.samples)
+        return metrics.values()
@@ -0,0 +1,93 @@
+"""Metrics of the Quorum node itself created from the results of the methods queried besides admin_peers
+"""
+from prometheus_client.core import GaugeMetricFamily
+
+# The params of each supported method
+METHOD_PARAMS = {
+    'eth_blockNumber': [],
+    'net_peerCount': [],
+    'eth_syncing': [],
+    'txpool_status': [],
+    'istanbul_getValidators': [],
+    'qbft_getValidatorsByBlockNumber': ['latest'],
+}
+
+
+def parse_quantity(value) -> int:
+    """Parses a hex encoded quantity, e.g. the result of eth_blockNumber
+
+    Args:
+        value (_type_): The quantity, e.g. "0x1b4"
+
+    Returns:
+        int: The value or None if not a valid quantity
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if not isinstance(value, str):
+        return None
+    try:
+        return int(value, 16)
+    except ValueError:
+        return None
+
+
+def create_node_metrics(instance_name: str, results: dict) -> list:
+    """Creates the metrics of the node. Methods not queried or failed are omitted.
+
+    Args:
+        instance_name (str): The instance name
+        results (dict): Key is the method, value is its result. Failed methods must not be contained.
+
+    Returns:
+        list: The metrics
+    """
+    metrics = []
+    _add_gauge(metrics, 'quorum_block_number', 'Quorum local head block number',
+               instance_name, parse_quantity(results.get('eth_blockNumber')))
+    _add_gauge(metrics, 'quorum_net_peer_count', 'Quorum number of connected peers',
+               instance_name, parse_quantity(results.get('net_peerCount')))
+
+    if 'eth_syncing' in results:
+        # Either false or an object with the sync progress
+        syncing = results.get('eth_syncing')
+        _add_gauge(metrics, 'quorum_syncing', 'Quorum node is syncing (1) or in sync (0)',
+                   instance_name, 1 if isinstance(syncing, dict) else 0)
+        if isinstance(syncing, dict):
+            _add_gauge(metrics, 'quorum_sync_highest_block', 'Quorum highest block known while syncing',
+                       instance_name, parse_quantity(syncing.get('highestBlock')))
+
+    txpool_status = results.get('txpool_status')
+    if isinstance(txpool_status, dict):
+        metric_txpool = GaugeMetricFamily(
+            'quorum_txpool_transactions', 'Quorum transactions in the transaction pool by state pending or queued',
+            labels=['instance_name', 'state'])
+        for state in ('pending', 'queued'):
+            count = parse_quantity(txpool_status.get(state))
+            if count is not None:
+                metric_txpool.add_metric([instance_name, state], count)
+        metrics.append(metric_txpool)
+
+    validators = results.get('istanbul_getValidators', results.get('qbft_getValidatorsByBlockNumber'))
+    if isinstance(validators, list):
+        _add_gauge(metrics, 'quorum_validators', 'Quorum number of validators of the latest block',
+                   instance_name, len(validators))
+
+    return metrics
+
+
+def _add_gauge(metrics: list, name: str, documentation: str, instance_name: str, value):
+    """Adds a gauge with the single label instance_name
+
+    Args:
+        metrics (list): The metrics to add the gauge to
+        name (str): The name of the gauge
+        documentation (str): The documentation of the gauge
+        instance_name (str): The instance name
+        value (_type_): The value, the gauge is not added if None
+    """
+    if value is None:
+        return
+    metric = GaugeMetricFamily(name, documentation, labels=['instance_name'])
+    metric.add_metric([instance_name], value)
+    metrics.append(metric)
@@ -0,0 +1,106 @@
+"""Refreshes the metrics of the collectors when scraped (on demand mode) instead of on a schedule
+"""
+import logging
+import threading
+import time
+from typing import Callable
+
+from .exporter_metrics import ON_DEMAND_REFRESHES, SCHEDULER_DURATION, SCHEDULER_INTERVAL
+
+
+class OnDemandJob:  # pylint: disable=R0902
+    """A function refreshing the metrics of a collector. Concurrent triggers share a single run (single flight).
+    """
+
+    def __init__(self, collector: str, instance_name: str, func: Callable, max_age: float):
+        self._collector = collector
+        self._instance_name = instance_name
+        self._func = func
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        # Set when the running refresh is done, None if no refresh is running
+        self._done_event = None
+        # Monotonic points in time of the start and the end of the last finished refresh
+        self._last_start = None
+        self._last_end = None
+
+    def trigger(self) -> threading.Event:
+        """Starts a refresh in a background thread if the data is older than max_age and no refresh is running
+
+        Returns:
+            threading.Event: Set when the refresh is done, None if the data is not outdated
+        """
+        with self._lock:
+            if self._done_event is not None:
+                ON_DEMAND_REFRESHES.labels(self._collector, self._instance_name, 'coalesced').inc()
+                return self._done_event
+            if self._last_end is not None and time.monotonic() - self._last_end < self._max_age:
+                ON_DEMAND_REFRESHES.labels(self._collector, self._instance_name, 'cached').inc()
+                return None
+            ON_DEMAND_REFRESHES.labels(self._collector, self._instance_name, 'refreshed').inc()
+            self._done_event = threading.Event()
+            done_event = self._done_event
+        threading.Thread(target=self._run, name=f'{self._collector}-{self._instance_name}', daemon=True).start()
+        return done_event
+
+    def count_deadline_exceeded(self):
+        """Counts a scrape served with cached data as the refresh did not finish within the soft deadline
+        """
+        ON_DEMAND_REFRESHES.labels(self._collector, self._instance_name, 'deadline').inc()
+
+    def _run(self):
+        """Runs the refresh and releases the waiting scrapes
+        """
+        start = time.monotonic()
+        if self._last_start is not None:
+            SCHEDULER_INTERVAL.labels(self._collector, self._instance_name).set(start - self._last_start)
+        try:
+            self._func()
+        except Exception:  # pylint: disable=W0703
+            logging.exception("%s >> Refresh failed - collector=%s, instance_name=%s",
+                              type(self).__name__, self._collector, self._instance_name)
+        end = time.monotonic()
+        SCHEDULER_DURATION.labels(self._collector, self._instance_name).set(end - start)
+        with self._lock:
+            # A failed refresh is not retried before max_age either, so an unavailable node is not hammered by scrapes
+            self._last_start = start
+            self._last_end = end
+            done_event = self._done_event
+            self._done_event = None
+        done_event.set()
+
+
+class OnDemandRefresher:
+    """Refreshes the outdated collectors on a scrape. The scrape waits for the refreshes up to the soft deadline,
+        afterwards it is served with the cached metrics while the refreshes continue in the background.
+    """
+
+    def __init__(self, max_age: float, soft_deadline: float):
+        self._max_age = max_age
+        self._soft_deadline = soft_deadline
+        self._jobs = []
+
+    def add_job(self, collector: str, instance_name: str, func: Callable):
+        """Adds the function refreshing the metrics of a collector
+
+        Args:
+            collector (str): Name of the collector, e.g. rpc or kube_exec
+            instance_name (str): The instance name of the Quorum node
+            func (Callable): The function to run, e.g. process() of the collector
+        """
+        self._jobs.append(OnDemandJob(collector, instance_name, func, self._max_age))
+
+    def refresh(self):
+        """Triggers the refresh of all outdated collectors and waits until done or the soft deadline passed.
+            Called on each scrape.
+        """
+        deadline = time.monotonic() + self._soft_deadline
+        running = []
+        for each_job in self._jobs:
+            done_event = each_job.trigger()
+            if done_event is not None:
+                running.append((each_job, done_event))
+
+        for each_job, done_event in running:
+            if not done_event.wait(timeout=max(0.0, deadline - time.monotonic())):
+                each_job.count_deadline_exceeded()
@@ -0,0 +1,144 @@
+"""State of the peers kept across cycles, updated incrementally from each admin_peers result
+"""
+import time
+from collections import OrderedDict
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from .label_cache import PeerLabels
+
+
+class PeerState:  # pylint: disable=R0902,R0903
+    """The connection history and head block of a peer
+    """
+
+    __slots__ = ('labels', 'connected', 'connects', 'disconnects', 'last_change_time',
+                 'head_block', 'head_block_time', 'head_block_rate')
+
+    def __init__(self, labels: PeerLabels, now: float):
+        self.labels = labels
+        self.connected = True
+        self.connects = 0
+        self.disconnects = 0
+        self.last_change_time = now
+        self.head_block = None
+        self.head_block_time = None
+        self.head_block_rate = None
+
+
+class PeerStateTable:
+    """Keeps the state of all peers seen connected. Connects and disconnects are determined by the set difference
+        of the connected enodes of two cycles, so only the state of peers which changed is touched.
+        Peers disconnected longer than the time to live are removed.
+    """
+
+    def __init__(self, ttl: float = 3600.0):
+        self._ttl = ttl
+        # Key is the enode, value is PeerState
+        self._states = {}
+        # Enodes of the peers connected in the last cycle
+        self._connected_enodes = frozenset()
+        # Enodes of the disconnected peers ordered by point in time of disconnect, used for eviction
+        self._disconnected = OrderedDict()
+        # The first cycle sets the initial state, connects are counted afterwards
+        self._initialized = False
+
+    def update(self, connected: dict, now: float = None):
+        """Updates the state from the connected peers of a cycle
+
+        Args:
+            connected (dict): The connected peers. Key is the enode, value is the tuple of PeerLabels and head block (or None)
+            now (float, optional): The point in time of the cycle in seconds since epoch. Defaults to the current time.
+        """
+        if now is None:
+            now = time.time()
+        connected_enodes = frozenset(connected)
+
+        for enode in connected_enodes - self._connected_enodes:
+            state = self._states.get(enode)
+            if state is None:
+                state = PeerState(connected[enode][0], now)
+                self._states[enode] = state
+            else:
+                self._disconnected.pop(enode, None)
+                state.connected = True
+                state.last_change_time = now
+                # The head block before the disconnect is not used for the rate
+                state.head_block = None
+            if self._initialized:
+                state.connects += 1
+
+        for enode in self._connected_enodes - connected_enodes:
+            state = self._states[enode]
+            state.connected = False
+            state.disconnects += 1
+            state.last_change_time = now
+            state.head_block_rate = None
+            self._disconnected[enode] = now
+
+        for enode, (labels, head_block) in connected.items():
+            state = self._states[enode]
+            # The labels are replaced if the names of the configured peers have been changed
+            state.labels = labels
+            if head_block is None:
+                continue
+            if state.head_block is not None and now > state.head_block_time:
+                state.head_block_rate = (head_block - state.head_block) / (now - state.head_block_time)
+            state.head_block = head_block
+            state.head_block_time = now
+
+        self._connected_enodes = connected_enodes
+        self._initialized = True
+        self._evict(now)
+
+    def _evict(self, now: float):
+        """Removes the peers disconnected longer than the time to live
+
+        Args:
+            now (float): The current point in time in seconds since epoch
+        """
+        expired = now - self._ttl
+        while len(self._disconnected) > 0:
+            enode, disconnect_time = next(iter(self._disconnected.items()))
+            if disconnect_time >= expired:
+                break
+            del self._disconnected[enode]
+            del self._states[enode]
+
+    def create_metrics(self, now: float = None) -> list:
+        """Creates the connection churn metrics of all peers in the table
+
+        Args:
+            now (float, optional): The current point in time in seconds since epoch. Defaults to the current time.
+
+        Returns:
+            list: The metrics, empty if the table is empty
+        """
+        if len(self._states) == 0:
+            return []
+        if now is None:
+            now = time.time()
+
+        labels = ['instance_name', 'enode', 'enode_short', 'name']
+        metric_connects = CounterMetricFamily(
+            'quorum_peers_connects', 'Number of times a Quorum peer has been seen connecting by enode', labels=labels)
+        metric_disconnects = CounterMetricFamily(
+            'quorum_peers_disconnects', 'Number of times a Quorum peer has been seen disconnecting by enode', labels=labels)
+        metric_last_change_age = GaugeMetricFamily(
+            'quorum_peers_last_change_age_seconds',
+            'Seconds since a Quorum peer has been seen connecting or disconnecting by enode', labels=labels)
+        metric_head_block_rate = GaugeMetricFamily(
+            'quorum_peers_head_block_rate',
+            'Blocks per second the head block of a connected Quorum peer advanced between the last two cycles by enode',
+            labels=labels)
+
+        for state in self._states.values():
+            metric_connects.add_metric(state.labels.labels, state.connects)
+            metric_disconnects.add_metric(state.labels.labels, state.disconnects)
+            metric_last_change_age.add_metric(state.labels.labels, max(0.0, now - state.last_change_time))
+            if state.head_block_rate is not None:
+                metric_head_block_rate.add_metric(state.labels.labels, state.head_block_rate)
+        return [metric_connects, metric_disconnects, metric_last_change_age, metric_head_block_rate]
+
+    def __len__(self) -> int:
+        return len(self._states)
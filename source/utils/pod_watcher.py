@@ -0,0 +1,214 @@
+"""Keeps track of the pod of a K8S deployment by watching its pods
+"""
+import logging
+import threading
+import time
+
+from kubernetes import watch
+from kubernetes.client import ApiClient
+from kubernetes.client.api import core_v1_api, apps_v1_api
+from kubernetes.client.exceptions import ApiException
+from urllib3.exceptions import HTTPError
+
+from .exporter_metrics import ERRORS, PHASE_DURATION
+
+# HTTP status code of an expired resource version
+HTTP_STATUS_GONE = 410
+
+
+class PodWatcher:  # pylint: disable=R0902
+    """Watches the pods of a deployment in a background thread and keeps the name of the current pod in memory.
+        Informer style: List the pods once, then watch for changes starting at the resource version of the list.
+    """
+
+    def __init__(self, instance_name: str, namespace: str, deployment: str, api_client: ApiClient,
+                 *, watch_timeout: int = 300, retry_interval: float = 5.0, pod_name: str = None):
+        self._instance_name = instance_name
+        self._namespace = namespace
+        self._deployment = deployment
+        self._apps_v1 = apps_v1_api.AppsV1Api(api_client)
+        self._core_v1 = core_v1_api.CoreV1Api(api_client)
+        self._watch_timeout = watch_timeout
+        self._retry_interval = retry_interval
+
+        # All known pods of the deployment. Key is the pod name, value is V1Pod
+        self._pods = {}
+        # The pod name known before the first list, e.g. from a snapshot, replaced by the list
+        self._pod_name = pod_name
+        self._last_sync_time = None
+        self._lock = threading.Lock()
+        self._synced_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._watch = None
+        self._thread = None
+
+    @property
+    def pod_name(self) -> str:
+        """The name of the current pod of the deployment
+
+        Returns:
+            str: The pod name or None if there is no running pod
+        """
+        return self._pod_name
+
+    @property
+    def last_sync_time(self) -> float:
+        """Point in time of last successful communication with the K8S API, e.g. a list or watch event
+
+        Returns:
+            float: Seconds since epoch or None if never synced
+        """
+        return self._last_sync_time
+
+    def start(self):
+        """Starts watching in a background thread
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='pod-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops watching
+        """
+        self._stop_event.set()
+        if self._watch is not None:
+            self._watch.stop()
+
+    def wait_for_sync(self, timeout: float = None) -> bool:
+        """Waits until the pods have been listed initially
+
+        Args:
+            timeout (float, optional): Max. seconds to wait. Defaults to None.
+
+        Returns:
+            bool: True if pods have been listed else False
+        """
+        return self._synced_event.wait(timeout=timeout)
+
+    def _run(self):
+        """List and watch until stopped. Relist if the watch fails, e.g. on expired resource version
+        """
+        while not self._stop_event.is_set():
+            try:
+                label_selector, resource_version = self._list_pods()
+                self._watch_pods(label_selector, resource_version)
+            except ApiException as ex:
+                if ex.status == HTTP_STATUS_GONE:
+                    logging.info("%s >> Resource version expired, relisting pods", type(self).__name__)
+                    continue
+                ERRORS.labels('kube_exec', 'watch_failed', self._instance_name).inc()
+                logging.warning("%s >> Watching pods failed - %s", type(self).__name__, ex)
+            except (HTTPError, OSError, ValueError) as ex:
+                # e.g. the connection of the watch broke or an event could not be decoded
+                ERRORS.labels('kube_exec', 'watch_failed', self._instance_name).inc()
+                logging.warning("%s >> Watching pods failed - %s", type(self).__name__, ex)
+            self._stop_event.wait(timeout=self._retry_interval)
+
+    def _get_label_selector(self) -> str:
+        """Get the label selector of the deployment
+
+        Returns:
+            str: Label selector in key1=value1,key2=value2,... format
+        """
+        # https://github.com/kubernetes-client/python/blob/master/kubernetes/docs/V1Deployment.md
+        logging.debug("%s >> Getting deployment - name=%s, namespace=%s",
+                      type(self).__name__, self._deployment, self._namespace)
+        deployment = self._apps_v1.read_namespaced_deployment(
+            name=self._deployment, namespace=self._namespace, _request_timeout=(1, 2))
+
+        # Format Label Selectors into key1=value1,key2=value2,... format
+        deployment_label_selector = deployment.spec.selector
+        label_selector_string = ','.join(map(
+            lambda key: f'{key}={deployment_label_selector.match_labels[key]}',
+            deployment_label_selector.match_labels.keys()))
+        logging.debug("%s >> Deployment found - label_selector_string=%s",
+                      type(self).__name__, label_selector_string)
+        return label_selector_string
+
+    def _list_pods(self) -> tuple:
+        """Lists all pods of the deployment and replaces the known pods
+
+        Returns:
+            tuple: The label selector and the resource version of the list
+        """
+        with PHASE_DURATION.labels('kube_exec', 'lookup_pod', self._instance_name).time():
+            label_selector = self._get_label_selector()
+            pod_list = self._core_v1.list_namespaced_pod(namespace=self._namespace,
+                                                         label_selector=label_selector,
+                                                         watch=False, _request_timeout=(1, 2))
+        with self._lock:
+            self._pods = {each_pod.metadata.name: each_pod for each_pod in pod_list.items}
+            self._update_pod_name()
+            self._last_sync_time = time.time()
+        self._synced_event.set()
+        return (label_selector, pod_list.metadata.resource_version)
+
+    def _watch_pods(self, label_selector: str, resource_version: str):
+        """Watches for pod changes and updates the known pods
+
+        Args:
+            label_selector (str): The label selector of the deployments pods
+            resource_version (str): The resource version to start watching from
+        """
+        self._watch = watch.Watch()
+        for event in self._watch.stream(self._core_v1.list_namespaced_pod,
+                                        namespace=self._namespace,
+                                        label_selector=label_selector,
+                                        resource_version=resource_version,
+                                        allow_watch_bookmarks=True,
+                                        timeout_seconds=self._watch_timeout):
+            if self._stop_event.is_set():
+                break
+            event_type = event['type']
+            with self._lock:
+                if event_type in ('ADDED', 'MODIFIED'):
+                    pod = event['object']
+                    self._pods[pod.metadata.name] = pod
+                    self._update_pod_name()
+                elif event_type == 'DELETED':
+                    self._pods.pop(event['object'].metadata.name, None)
+                    self._update_pod_name()
+                self._last_sync_time = time.time()
+
+        # The watch ended regularly after timeout_seconds, the connection to the API was fine
+        self._last_sync_time = time.time()
+
+    def _update_pod_name(self):
+        """Determines the current pod from all known pods.
+            During a rollout there may be multiple pods: Use the newest running pod that is not terminating,
+            ready pods are preferred.
+        """
+        candidates = [each_pod for each_pod in self._pods.values()
+                      if each_pod.status is not None and each_pod.status.phase == 'Running'
+                      and each_pod.metadata.deletion_timestamp is None]
+        if len(candidates) == 0:
+            pod_name = None
+        else:
+            candidates.sort(key=lambda pod: (_is_ready(pod), pod.metadata.creation_timestamp),
+                            reverse=True)
+            pod_name = candidates[0].metadata.name
+            if len(candidates) > 1:
+                logging.info("%s >> More than one running pod found, using newest - pod_name=%s, pods=%s",
+                             type(self).__name__, pod_name,
+                             ','.join(each_pod.metadata.name for each_pod in candidates))
+
+        if pod_name != self._pod_name:
+            logging.info("%s >> Pod changed - old=%s, new=%s, deployment=%s, namespace=%s",
+                         type(self).__name__, self._pod_name, pod_name, self._deployment, self._namespace)
+            self._pod_name = pod_name
+
+
+def _is_ready(pod) -> bool:
+    """Checks if the pod is ready
+
+    Args:
+        pod (V1Pod): The pod
+
+    Returns:
+        bool: True if the pod has condition Ready=True
+    """
+    for condition in pod.status.conditions or []:
+        if condition.type == 'Ready':
+            return condition.status == 'True'
+    return False
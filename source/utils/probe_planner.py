@@ -0,0 +1,143 @@
+"""Plans which peers have to be probed in a cycle
+"""
+import time
+from typing import List
+
+from .config import PeerConfig
+
+
+class PeerProbeState:  # pylint: disable=R0903
+    """The probe history of a peer
+    """
+
+    __slots__ = ('consecutive_failures', 'next_probe_time', 'last_probe_time')
+
+    def __init__(self):
+        self.consecutive_failures = 0
+        # Monotonic time before which the peer is not probed again
+        self.next_probe_time = 0.0
+        # Point in time of the last real probe in seconds since epoch
+        self.last_probe_time = None
+
+
+class ProbePlan:
+    """The result of planning a cycle
+    """
+
+    def __init__(self, to_probe: List[PeerConfig], reachable: List[PeerConfig], deferred: List[PeerConfig]):
+        self._to_probe = to_probe
+        self._reachable = reachable
+        self._deferred = deferred
+
+    @property
+    def to_probe(self) -> List[PeerConfig]:
+        """Peers to probe in this cycle
+
+        Returns:
+            List[PeerConfig]: The peers
+        """
+        return self._to_probe
+
+    @property
+    def reachable(self) -> List[PeerConfig]:
+        """Peers known to be reachable as the node has an outbound connection to them
+
+        Returns:
+            List[PeerConfig]: The peers
+        """
+        return self._reachable
+
+    @property
+    def deferred(self) -> List[PeerConfig]:
+        """Peers failing repeatedly which are not probed in this cycle due to backoff
+
+        Returns:
+            List[PeerConfig]: The peers
+        """
+        return self._deferred
+
+
+class ProbePlanner:
+    """Reduces the number of probes:
+        Peers the node has an outbound connection to are reachable and need no probe.
+        Peers failing repeatedly are probed with exponential backoff.
+    """
+
+    def __init__(self, backoff_base: float, backoff_max: float):
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        # Key is the enode, value is PeerProbeState
+        self._states = {}
+
+    def plan(self, peers: List[PeerConfig], outbound_connected_enodes: frozenset) -> ProbePlan:
+        """Plans which peers to probe
+
+        Args:
+            peers (List[PeerConfig]): All peers
+            outbound_connected_enodes (frozenset): Enodes the node currently has an outbound connection to
+
+        Returns:
+            ProbePlan: The plan
+        """
+        now = time.monotonic()
+        to_probe = []
+        reachable = []
+        deferred = []
+        for each_peer in peers:
+            state = self._states.get(each_peer.enode)
+            if each_peer.enode in outbound_connected_enodes:
+                reachable.append(each_peer)
+                if state is not None:
+                    state.consecutive_failures = 0
+                    state.next_probe_time = 0.0
+            elif state is None or now >= state.next_probe_time:
+                to_probe.append(each_peer)
+            else:
+                deferred.append(each_peer)
+        return ProbePlan(to_probe, reachable, deferred)
+
+    def record(self, peer: PeerConfig, connection_successful: bool):
+        """Records the result of a probe
+
+        Args:
+            peer (PeerConfig): The probed peer
+            connection_successful (bool): True, False or None if unknown
+        """
+        state = self._states.get(peer.enode)
+        if state is None:
+            state = PeerProbeState()
+            self._states[peer.enode] = state
+        if connection_successful is None:
+            # No result, e.g. timeout. Probe again in the next cycle
+            state.next_probe_time = 0.0
+            return
+
+        state.last_probe_time = time.time()
+        if connection_successful:
+            state.consecutive_failures = 0
+            state.next_probe_time = 0.0
+        else:
+            state.consecutive_failures += 1
+            exponent = min(state.consecutive_failures - 1, 32)
+            delay = min(self._backoff_base * (2 ** exponent), self._backoff_max)
+            state.next_probe_time = time.monotonic() + delay
+
+    def last_probe_time(self, enode: str) -> float:
+        """Get the point in time of the last real probe of a peer
+
+        Args:
+            enode (str): The enode of the peer
+
+        Returns:
+            float: Seconds since epoch or None if never probed
+        """
+        state = self._states.get(enode)
+        return state.last_probe_time if state is not None else None
+
+    def remove(self, enode: str):
+        """Removes the probe history of a peer, e.g. if removed from config or its address changed
+
+        Args:
+            enode (str): The enode of the peer
+        """
+        self._states.pop(enode, None)
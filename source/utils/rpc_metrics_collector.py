@@ -1,69 +1,152 @@
 """Prometheus metrics collector provided by querying the Quorum RPC endpoint
 """
 import logging
-from typing import Iterable
+import threading
+import time
 
-import requests
-from prometheus_client.core import GaugeMetricFamily, Metric
-from prometheus_client.registry import Collector
-from requests.structures import CaseInsensitiveDict
+from prometheus_client.core import GaugeMetricFamily
 
-from .config import Config  # pylint: disable=E0402
-from .helper import Helper  # pylint: disable=E0402
+from .admin_peers import PeerInfo, read_peers
+from .base_collector import BaseCollector
+from .config import Config, NodeConfig, PeersDiff
+from .exporter_metrics import ERRORS, LAST_SUCCESS, PHASE_DURATION, SUBSCRIPTION_EVENTS
+from .json_rpc_client import JsonRpcClient, JsonRpcError, RpcUnavailableError
+from .label_cache import PeerLabelCache, PeerLabels
+from .node_status import METHOD_PARAMS, create_node_metrics, parse_quantity
+from .peer_state_table import PeerStateTable
+from .subscription_client import SubscriptionClient
 
+# The peers report their total difficulty as head block. Under IBFT and QBFT each block, the genesis block included,
+# has difficulty 1, so the head block of a peer is its total difficulty minus 1
+TOTAL_DIFFICULTY_OFFSET = 1
 
-class RpcMetricsCollector(Collector):
+
+class RpcMetricsCollector(BaseCollector):  # pylint: disable=R0902
     """Collects data from Quorum RPC API and provides metrics data.
     """
 
-    def __init__(self, config: Config):
-        self._current_metrics = []
+    def __init__(self, config: Config, node: NodeConfig):
+        super().__init__()
+        # The peer metrics of the last successful RPC call. Served (marked as stale) while the RPC is unavailable
+        self._peer_metrics = None
+        # The node metrics of the last successful RPC call. Not served while the RPC is unavailable
+        self._node_metrics = []
+        # Point in time and peers data of the last successful RPC call, persisted by the snapshot
+        self._last_peers_data = None
         self._config = config
-        self._helper = Helper()
+        self._node = node
+        # Labels of the peers by enode URL, so labels are not rebuilt every cycle
+        self._label_cache = PeerLabelCache(node.instance_name)
+        # Set on config reload, the labels are rebuilt on next processing
+        self._label_cache_invalidated = False
+        # Connection history of the peers across cycles, provides the connection churn metrics
+        self._peer_state_table = PeerStateTable()
+        # Enodes of the peers connected outbound on last successful RPC call
+        self._outbound_connected_enodes = frozenset()
+        self._rpc_client = JsonRpcClient(node.rpc_url,
+                                         timeout=config.rpc.timeout,
+                                         connect_timeout=config.rpc.connect_timeout,
+                                         retries=config.rpc.retries)
+        # Serializes the polls of the schedule and the updates by the events of the subscription
+        self._lock = threading.Lock()
+        # True if the last poll was successful, None if not polled yet
+        self._rpc_up = None
+        # The node results of the last successful poll
+        self._node_results = {}
+        # The local head block of the last newHeads event since the last poll, None if no event
+        self._event_head_block = None
+        # Monotonic point in time of the last poll
+        self._last_poll = None
+        # Set if events have been missed or a refresh triggered by an event was rate limited
+        self._refresh_requested = False
+        # Subscription to the head and peer events, the HTTP polling is the fallback while not connected
+        self._subscription = None
+        if node.subscription_url is not None:
+            self._subscription = SubscriptionClient(node.subscription_url, node.instance_name,
+                                                    self._on_notification, self._on_subscription_connect,
+                                                    idle_timeout=config.subscription.idle_timeout,
+                                                    reconnect_delay_max=config.subscription.reconnect_delay_max)
+
+    def _get_peers_data(self) -> list:
+        """Get data of the current peers by querying Quorum nodes RPC endpoint
 
-    def collect(self) -> Iterable[Metric]:
-        """Get the current metrics. Implementation of the Collector
+        Raises:
+            RpcUnavailableError: The RPC endpoint is unavailable
+            JsonRpcError: The RPC endpoint returned an error
 
         Returns:
-            Iterable[Metric]: The current metrics
+            list: List of PeerInfo of the connected peers, an empty list if there are no peers
         """
-        return self._current_metrics
+        # https://getblock.io/docs/available-nodes-methods/ETH/JSON-RPC/admin_peers/
+        # https://geth.ethereum.org/docs/rpc/ns-admin#admin_peers
+        # https://consensys.net/docs/goquorum/en/latest/develop/connecting-to-a-node/
+        # The response is parsed while it arrives and only the fields required for the metrics are kept.
+        with PHASE_DURATION.labels('rpc', 'rpc_request', self._node.instance_name).time():
+            response = self._rpc_client.send('admin_peers', stream=True)
+        with PHASE_DURATION.labels('rpc', 'json_decode', self._node.instance_name).time():
+            return self._rpc_client.read_streamed('admin_peers', response, read_peers)
 
-    def _get_peers_data(self):
-        """Get data of the current peers by querying Quorum nodes RPC endpoint
+    def _get_rpc_data(self) -> tuple:
+        """Get data of the current peers and the results of the configured methods
+            by a single batch request to the Quorum nodes RPC endpoint
+
+        Raises:
+            RpcUnavailableError: The RPC endpoint is unavailable
+            JsonRpcError: admin_peers or the whole batch failed
 
         Returns:
-            _type_: _description_
+            tuple: List of PeerInfo of the connected peers and the results of the successful methods by method
         """
-        headers = CaseInsensitiveDict()
-        headers["Content-Type"] = "application/json"
-        # https://getblock.io/docs/available-nodes-methods/ETH/JSON-RPC/admin_peers/
-        # https://geth.ethereum.org/docs/rpc/ns-admin#admin_peers
-        # https://consensys.net/docs/goquorum/en/latest/develop/connecting-to-a-node/
-        data = '{"jsonrpc": "2.0","method": "admin_peers","params": [],"id": "getblock.io"}'
-        try:
-            response = requests.post(self._config.rpc_url,
-                                    headers=headers, data=data, timeout=2.0)
-            if response.status_code == 200:
-                return response.json().get('result')
-        except requests.Timeout:
-            pass
-        except requests.ConnectionError:
-            pass
-        return []
-
-    def _create_current_metrics(self, instance_name: str, peers_data: list):
+        methods = self._config.rpc.methods
+        if len(methods) == 0:
+            return self._get_peers_data(), {}
+
+        calls = [('admin_peers', [])] + [(each, METHOD_PARAMS[each]) for each in methods]
+        with PHASE_DURATION.labels('rpc', 'rpc_request', self._node.instance_name).time():
+            response, methods_by_id = self._rpc_client.send_batch(calls, stream=True)
+        with PHASE_DURATION.labels('rpc', 'json_decode', self._node.instance_name).time():
+            results = self._rpc_client.read_streamed_batch(response, methods_by_id, {'admin_peers': read_peers})
+
+        peers_data = results.pop('admin_peers', None)
+        if peers_data is None:
+            raise RpcUnavailableError("admin_peers: Response without result")
+        if isinstance(peers_data, JsonRpcError):
+            raise peers_data
+
+        node_results = {}
+        for method in methods:
+            result = results.get(method)
+            if isinstance(result, JsonRpcError) or method not in results:
+                # e.g. the API of the method is not enabled at the node
+                ERRORS.labels('rpc', 'rpc_method_error', self._node.instance_name).inc()
+                logging.debug("%s >> Method failed - instance_name=%s - %s",
+                              type(self).__name__, self._node.instance_name, result or method)
+                continue
+            node_results[method] = result
+        return peers_data, node_results
+
+    def _create_current_metrics(self, instance_name: str, peers_data: list, node_results: dict = None,  # pylint: disable=R0914
+                                update_peer_states: bool = True, heads_current: bool = True):
         """Get current data and create metrics
 
         Args:
             instance_name (str): _description_
-            peersData (list): The current peers data queried from RPC endpoint
+            peersData (list): The current peers data queried from RPC endpoint, list of PeerInfo
+            node_results (dict): The results of the methods queried besides admin_peers by method
+            update_peer_states (bool): False if the peers data is not current, e.g. restored from a snapshot
+            heads_current (bool): False if the head blocks of the peers have not been queried, e.g. on a peer event
         """
+        if node_results is None:
+            node_results = {}
         if peers_data is None:
             peers_data = []
 
+        if self._label_cache_invalidated:
+            self._label_cache_invalidated = False
+            self._label_cache.clear()
+
         logging.info("%s >> Creating metrics for %s peers - instance_name=%s, rpc_url=%s",
-                     type(self).__name__, len(peers_data), instance_name, self._config.rpc_url)
+                     type(self).__name__, len(peers_data), instance_name, self._node.rpc_url)
 
         # The current metrics to be reported on a Prometheus scrape.
         # We cannot use "default" Gauge as the values remain even if the peer does not exist anymore
@@ -78,100 +161,197 @@ class RpcMetricsCollector(Collector):
             'quorum_peers_head_block', 'Quorum peers head block by enode and protocol eth or istanbul',
             labels=['instance_name', 'enode', 'enode_short', 'name', 'protocol'])
 
-        # A dict of all enodes currently connected as peers
+        # The lag of each peer is computed against the local head queried in the same batch
+        local_head_block = parse_quantity(node_results.get('eth_blockNumber'))
+        metric_peers_head_block_lag = None
+        if local_head_block is not None:
+            metric_peers_head_block_lag = GaugeMetricFamily(
+                'quorum_peers_head_block_lag',
+                'Quorum blocks the local head is ahead of the peers head block (total difficulty - 1, IBFT/QBFT only) by enode and protocol eth or istanbul',
+                labels=['instance_name', 'enode', 'enode_short', 'name', 'protocol'])
+
+        # A dict of all enodes currently connected as peers. Value is the tuple of labels and head block
         enodes_connected = {}
+        outbound_connected_enodes = set()
 
         # Add metrics for all connected peers
         for each_peer in peers_data:
-            enode = self._set_metrics_for_connected_peer(
+            peer_labels = self._set_metrics_for_connected_peer(
                 each_peer, instance_name, metric_peers,
-                metric_peers_network_direction, metric_peers_head_block)
-            if enode is not None:
-                enodes_connected[enode] = True
+                metric_peers_network_direction, metric_peers_head_block,
+                local_head_block=local_head_block, metric_peers_head_block_lag=metric_peers_head_block_lag)
+            if peer_labels is not None:
+                # Without a current head block the head block rate is kept
+                enodes_connected[peer_labels.enode] = (peer_labels,
+                                                       _get_head_block(each_peer) if heads_current else None)
+                if each_peer.inbound is False:
+                    outbound_connected_enodes.add(peer_labels.enode)
+        self._outbound_connected_enodes = frozenset(outbound_connected_enodes)
+        if update_peer_states:
+            self._peer_state_table.update(enodes_connected)
 
         # Add metrics for all configured/expected peers that are currenty NOT connected
-        for each_config_peer_enode in self._config.peers.keys():
+        for each_config_peer_enode in self._config.get_peers(self._node).keys():
             if each_config_peer_enode not in enodes_connected:
                 self._set_metrics_for_expected_but_unconnected_peer(
                     each_config_peer_enode, instance_name,
                     metric_peers, metric_peers_network_direction)
 
-        # Set current metrics to be reported by CustomCollector in a single atomic operation
-        self._current_metrics = [
+        self._label_cache.evict()
+        self._peer_metrics = [
             metric_peers, metric_peers_network_direction, metric_peers_head_block]
+        if metric_peers_head_block_lag is not None:
+            self._peer_metrics.append(metric_peers_head_block_lag)
+        self._peer_metrics.extend(self._peer_state_table.create_metrics())
+        self._node_metrics = create_node_metrics(instance_name, node_results)
+
+    @property
+    def outbound_connected_enodes(self) -> frozenset:
+        """The enodes of the peers the node has an outbound connection to.
+            An outbound connection proves TCP egress connectivity to the peer.
+
+        Returns:
+            frozenset: The enodes, empty if the RPC endpoint is unavailable
+        """
+        return self._outbound_connected_enodes
+
+    def update_peers(self, diff: PeersDiff):  # pylint: disable=W0613
+        """Applies the changed peers of a config reload.
+            The names of peers may have been changed, therefore the cached labels are rebuilt.
+
+        Args:
+            diff (PeersDiff): The changed peers
+        """
+        self._label_cache_invalidated = True
+
+    def get_snapshot(self) -> dict:
+        """Get the peers of the last successful RPC call
+
+        Returns:
+            dict: The point in time and the peers or None if there was no successful RPC call
+        """
+        last_peers_data = self._last_peers_data
+        if last_peers_data is None:
+            return None
+        timestamp, peers_data = last_peers_data
+        # A list per peer is more compact than an object
+        return {
+            'timestamp': timestamp,
+            'peers': [[each.enode_url, each.inbound, each.eth_difficulty, each.istanbul_difficulty]
+                      for each in peers_data],
+        }
+
+    def restore_snapshot(self, snapshot: dict):
+        """Restores the peer metrics of a previous run, marked as stale until the first successful RPC call
+
+        Args:
+            snapshot (dict): The state of get_snapshot()
+        """
+        instance_name = self._node.instance_name
+        timestamp = snapshot.get('timestamp')
+        peers_data = [PeerInfo(*each) for each in snapshot.get('peers', []) if isinstance(each, list) and len(each) == 4]
+        self._create_current_metrics(instance_name, peers_data, update_peer_states=False)
+        # The connections may have changed meanwhile, so they do not prove connectivity
+        self._outbound_connected_enodes = frozenset()
+        self._last_peers_data = (timestamp, peers_data)
+        if isinstance(timestamp, (int, float)):
+            LAST_SUCCESS.labels('rpc', instance_name).set(timestamp)
+        self._set_current_metrics(self._peer_metrics + self._create_rpc_status_metrics(instance_name, None))
+
+    def _create_rpc_status_metrics(self, instance_name: str, rpc_up: bool) -> list:
+        """Create metrics about the availability of the RPC endpoint
 
-    def _set_metrics_for_connected_peer(self, each_peer, instance_name: str,
+        Args:
+            instance_name (str): The instance name
+            rpc_up (bool): True if the last RPC call was successful, None if not called yet
+
+        Returns:
+            list: The metrics
+        """
+        metrics = []
+        if rpc_up is not None:
+            metric_rpc_up = GaugeMetricFamily(
+                'quorum_rpc_up', 'Quorum RPC endpoint available (1) or unavailable (0)',
+                labels=['instance_name'])
+            metric_rpc_up.add_metric([instance_name], 1 if rpc_up else 0)
+            metrics.append(metric_rpc_up)
+
+        metric_peers_stale = GaugeMetricFamily(
+            'quorum_peers_stale',
+            'Quorum peers metrics are up to date (0) or taken from the last successful RPC call or the snapshot (1)',
+            labels=['instance_name'])
+        metric_peers_stale.add_metric([instance_name], 0 if rpc_up else 1)
+        metrics.append(metric_peers_stale)
+        return metrics
+
+    def _set_metrics_for_connected_peer(self, each_peer: PeerInfo, instance_name: str,  # pylint: disable=W0613
             metric_peers: GaugeMetricFamily,
             metric_peers_network_direction: GaugeMetricFamily,
-            metric_peers_head_block: GaugeMetricFamily) -> str:
+            metric_peers_head_block: GaugeMetricFamily,
+            *,
+            local_head_block: int = None,
+            metric_peers_head_block_lag: GaugeMetricFamily = None) -> PeerLabels:
         """Sets the metrics for a connected
 
         Args:
-            each_peer (_type_): The data of the connected peer
+            each_peer (PeerInfo): The data of the connected peer
             instance_name (str): The instance name
             metric_peers (GaugeMetricFamily): The metrics if a peer is connected or not
             metric_peers_network_direction (GaugeMetricFamily): Metrics in- or outbound connected
             metric_peers_head_block (GaugeMetricFamily): The metrics for the head block of the peer
+            local_head_block (int): The head block of the local node or None if unknown
+            metric_peers_head_block_lag (GaugeMetricFamily): The metrics for the lag of the head block of the peer,
+                assumes a difficulty of 1 per block as under IBFT and QBFT
 
         Returns:
-            str: The enode or None if enode cannot be determined
+            PeerLabels: The labels of the peer or None if enode cannot be determined
         """
         # enode_url = "enode://[HERE IS THE 128 HEX-CHARS LONG ENODE]@1.2.3.4:30303?discport=0"
-        enode = self._helper.get_enode_from_url(enode_url=each_peer.get('enode'))
-        if enode is None:
+        # The metric labels (enode, enode_short and pretty name) are cached by enode URL
+        peer_labels = self._label_cache.get(each_peer.enode_url, self._config.peers)
+        if peer_labels is None:
             return None
 
-        #
-        # Prepare metric labels:
-        #
-        enode_short = enode[0:20]
-        # Get pretty name. If not defined use enode_short instead
-        name = enode_short
-        if enode in self._config.peers:
-            name= self._config.peers[enode].name
-
         # 1. metric_peers
         # Set value (1) that enode is found
-        metric_peers.add_metric([instance_name, enode, enode_short, name], 1)
+        metric_peers.add_metric(peer_labels.labels, 1)
 
         # 2. metric_peers_network_direction
         # Set network inbound (1) or outbound (2)
-        inbound = self._helper.deep_get(each_peer, 'network.inbound')
         metric_peers_network_direction.add_metric(
-            [instance_name, enode, enode_short, name],
-            1 if inbound is True else 2)
+            peer_labels.labels, 1 if each_peer.inbound is True else 2)
 
         # 3. metric_peers_head_block
-        eth_difficulty = self._helper.deep_get(
-            each_peer, 'protocols.eth.difficulty')
-        if eth_difficulty:
-            metric_peers_head_block.add_metric(
-                [instance_name, enode, enode_short, name, 'eth'],
-                eth_difficulty)
-
-        istanbul_difficulty = self._helper.deep_get(
-            each_peer, 'protocols.istanbul.difficulty')
-        if istanbul_difficulty:
-            metric_peers_head_block.add_metric(
-                [instance_name, enode,
-                    enode_short, name, 'istanbul'],
-                istanbul_difficulty)
-
-        return enode
-
-    def _set_metrics_for_expected_but_unconnected_peer(self, enode: str, instance_name: str,
+        if each_peer.eth_difficulty:
+            metric_peers_head_block.add_metric(peer_labels.labels_eth, each_peer.eth_difficulty)
+
+        if each_peer.istanbul_difficulty:
+            metric_peers_head_block.add_metric(peer_labels.labels_istanbul, each_peer.istanbul_difficulty)
+
+        # 4. metric_peers_head_block_lag
+        if metric_peers_head_block_lag is not None:
+            if isinstance(each_peer.eth_difficulty, int):
+                metric_peers_head_block_lag.add_metric(
+                    peer_labels.labels_eth, local_head_block - (each_peer.eth_difficulty - TOTAL_DIFFICULTY_OFFSET))
+            if isinstance(each_peer.istanbul_difficulty, int):
+                metric_peers_head_block_lag.add_metric(
+                    peer_labels.labels_istanbul,
+                    local_head_block - (each_peer.istanbul_difficulty - TOTAL_DIFFICULTY_OFFSET))
+
+        return peer_labels
+
+    def _set_metrics_for_expected_but_unconnected_peer(self, enode: str, instance_name: str,  # pylint: disable=W0613
             metric_peers: GaugeMetricFamily,
             metric_peers_network_direction: GaugeMetricFamily) -> str:
-        enode_short = enode[0:20]
-        name = self._config.peers[enode].name
+        labels = self._label_cache.get_for_config_peer(enode, self._config.peers).labels
 
         # 1. metric_peers
         # Set value (0) that enode is NOT found
-        metric_peers.add_metric([instance_name, enode, enode_short, name], 0)
+        metric_peers.add_metric(labels, 0)
 
         # 2. metric_peers_network_direction
         # Set network not connected (0)
-        metric_peers_network_direction.add_metric([instance_name, enode, enode_short, name], 0)
+        metric_peers_network_direction.add_metric(labels, 0)
 
         # 3. metric_peers_head_block
         # WE DO NOT ADD THESE METRICS AS THEY DO NOT MAKE SENSE:
@@ -179,13 +359,169 @@ class RpcMetricsCollector(Collector):
         # therefore we do not create head block metrics for non connected peers!
 
     def process(self):
-        """Processes getting peers info and preparing metrics
+        """Processes getting peers info and preparing metrics.
+            While subscribed to the peer events of the node, admin_peers is polled every 'subscription.poll_interval' only.
         """
-        # Get DNS name and use it as "pretty" instance name
-        instance_name = self._helper.get_host_name(url=self._config.rpc_url)
+        if self._subscription is not None:
+            self._subscription.start()
+            if self._is_subscription_current():
+                # The metrics are kept up to date by the events
+                LAST_SUCCESS.labels('rpc', self._node.instance_name).set(time.time())
+                return
+
+        with self._lock:
+            self._poll()
+
+    def _poll(self):
+        """Queries the peers and the node results and replaces the metrics. Must be called with the lock held.
+        """
+        instance_name = self._node.instance_name
+        self._last_poll = time.monotonic()
+        self._refresh_requested = False
 
         # Get data of all currently connected peers
-        peers_data = self._get_peers_data()
+        rpc_up = True
+        try:
+            peers_data, node_results = self._get_rpc_data()
+            with PHASE_DURATION.labels('rpc', 'create_metrics', instance_name).time():
+                self._create_current_metrics(instance_name, peers_data, node_results)
+            now = time.time()
+            self._last_peers_data = (now, peers_data)
+            self._node_results = node_results
+            self._event_head_block = None
+            LAST_SUCCESS.labels('rpc', instance_name).set(now)
+        except (RpcUnavailableError, JsonRpcError) as ex:
+            # Do not report all peers as disconnected but keep the last known state
+            rpc_up = False
+            self._outbound_connected_enodes = frozenset()
+            self._node_metrics = []
+            ERRORS.labels('rpc', 'rpc_unavailable' if isinstance(ex, RpcUnavailableError) else 'rpc_error',
+                          instance_name).inc()
+            logging.warning("%s >> RPC unavailable, keeping last peer metrics - instance_name=%s - %s",
+                            type(self).__name__, instance_name, ex)
+
+        self._rpc_up = rpc_up
+        self._set_current_metrics(
+            (self._peer_metrics or []) + self._node_metrics + self._create_rpc_status_metrics(instance_name, rpc_up))
+
+    def _is_subscription_current(self) -> bool:
+        """Checks if the metrics are kept up to date by the subscription, so the scheduled poll can be skipped.
+            Without peer events the peers are polled on the schedule.
+
+        Returns:
+            bool: True if subscribed and the last poll was successful and is younger than the poll interval
+        """
+        return self._subscription.peer_events and self._rpc_up is True and not self._refresh_requested \
+            and self._last_poll is not None \
+            and time.monotonic() - self._last_poll < self._config.subscription.poll_interval
+
+    def _request_refresh(self) -> bool:
+        """Polls on an event unless the last poll is younger than 'subscription.min_refresh_interval'.
+            A rate limited refresh is done by the next scheduled run.
 
-        # Report metrics for this instance
-        self._create_current_metrics(instance_name, peers_data)
+        Returns:
+            bool: True if polled
+        """
+        with self._lock:
+            if self._last_poll is not None \
+                    and time.monotonic() - self._last_poll < self._config.subscription.min_refresh_interval:
+                self._refresh_requested = True
+                return False
+            self._poll()
+            return True
+
+    def _on_subscription_connect(self):
+        """Called on each (re)connect of the subscription. Events may have been missed meanwhile.
+        """
+        self._refresh_requested = True
+
+    def _on_notification(self, kind: str, result):
+        """Applies an event of the subscription. Called by the thread of the subscription.
+
+        Args:
+            kind (str): The kind of notification, 'newHeads' or 'peerEvents'
+            result (_type_): The header of the new head or the peer event
+        """
+        if kind == 'newHeads':
+            self._on_new_head(result)
+        elif kind == 'peerEvents':
+            self._on_peer_event(result)
+
+    def _on_new_head(self, header):
+        """Updates the local head block, or polls if 'subscription.refresh_on_new_head' is set
+
+        Args:
+            header (_type_): The header of the new head
+        """
+        head_block = parse_quantity(header.get('number')) if isinstance(header, dict) else None
+        if head_block is None:
+            return
+        SUBSCRIPTION_EVENTS.labels(self._node.instance_name, 'new_head').inc()
+        if self._config.subscription.refresh_on_new_head and self._request_refresh():
+            return
+
+        with self._lock:
+            # The local head block is provided only if eth_blockNumber is queried
+            if self._rpc_up is not True or 'eth_blockNumber' not in self._node_results:
+                return
+            self._event_head_block = head_block
+            self._update_metrics()
+
+    def _on_peer_event(self, event):
+        """Removes a dropped peer or polls on an added peer
+
+        Args:
+            event (_type_): The peer event, e.g. {"type": "drop", "peer": "<node id>"}
+        """
+        if not isinstance(event, dict):
+            return
+        event_type = event.get('type')
+        if event_type == 'add':
+            SUBSCRIPTION_EVENTS.labels(self._node.instance_name, 'peer_add').inc()
+            # The enode and the protocols of the added peer are provided by admin_peers only
+            self._request_refresh()
+        elif event_type == 'drop':
+            SUBSCRIPTION_EVENTS.labels(self._node.instance_name, 'peer_drop').inc()
+            node_id = event.get('peer')
+            with self._lock:
+                if self._rpc_up is not True or self._last_peers_data is None:
+                    return
+                peers_data = self._last_peers_data[1]
+                remaining_peers_data = [each for each in peers_data if each.node_id != node_id]
+                if len(remaining_peers_data) == len(peers_data):
+                    return
+                self._last_peers_data = (time.time(), remaining_peers_data)
+                self._update_metrics()
+
+    def _update_metrics(self):
+        """Recreates the metrics from the peers and node results of the last poll as changed by the events.
+            Must be called with the lock held.
+        """
+        instance_name = self._node.instance_name
+        with PHASE_DURATION.labels('rpc', 'create_metrics', instance_name).time():
+            # The lag of the peers is computed against the local head of the poll, as the head blocks of the peers
+            # are of the poll as well
+            self._create_current_metrics(instance_name, self._last_peers_data[1], self._node_results,
+                                         heads_current=False)
+            if self._event_head_block is not None:
+                self._node_metrics = create_node_metrics(
+                    instance_name, dict(self._node_results, eth_blockNumber=hex(self._event_head_block)))
+        LAST_SUCCESS.labels('rpc', instance_name).set(time.time())
+        self._set_current_metrics(
+            self._peer_metrics + self._node_metrics + self._create_rpc_status_metrics(instance_name, True))
+
+
+def _get_head_block(peer: PeerInfo) -> int:
+    """Get the head block of a peer, istanbul if available else eth
+
+    Args:
+        peer (PeerInfo): The peer
+
+    Returns:
+        int: The head block or None if unknown
+    """
+    if isinstance(peer.istanbul_difficulty, int):
+        return peer.istanbul_difficulty
+    if isinstance(peer.eth_difficulty, int):
+        return peer.eth_difficulty
+    return None
@@ -0,0 +1,140 @@
+"""Runs the processing of the metrics collectors periodically, each on its own schedule
+"""
+import logging
+import math
+import random
+import threading
+import time
+from typing import Callable
+
+from .config import ScheduleConfig
+from .exporter_metrics import SCHEDULER_DURATION, SCHEDULER_INTERVAL, SCHEDULER_OVERRUNS
+
+
+class Job:
+    """A function run periodically by the scheduler
+    """
+
+    def __init__(self, collector: str, instance_name: str, func: Callable, schedule: ScheduleConfig):
+        self._collector = collector
+        self._instance_name = instance_name
+        self._func = func
+        self._schedule = schedule
+
+    @property
+    def collector(self) -> str:
+        """Name of the collector, e.g. rpc or kube_exec
+
+        Returns:
+            str: Name of the collector
+        """
+        return self._collector
+
+    @property
+    def instance_name(self) -> str:
+        """The instance name of the Quorum node
+
+        Returns:
+            str: The instance name
+        """
+        return self._instance_name
+
+    @property
+    def func(self) -> Callable:
+        """The function to run
+
+        Returns:
+            Callable: The function
+        """
+        return self._func
+
+    @property
+    def schedule(self) -> ScheduleConfig:
+        """The schedule of the job
+
+        Returns:
+            ScheduleConfig: The schedule
+        """
+        return self._schedule
+
+
+class Scheduler:
+    """Runs each job in its own thread, so a slow job does not delay other jobs.
+    """
+
+    def __init__(self, quit_event: threading.Event):
+        self._quit_event = quit_event
+        self._jobs = []
+        self._threads = []
+
+    def add_job(self, collector: str, instance_name: str, func: Callable, schedule: ScheduleConfig):
+        """Adds a job. Must be called before start()
+
+        Args:
+            collector (str): Name of the collector, e.g. rpc or kube_exec
+            instance_name (str): The instance name of the Quorum node
+            func (Callable): The function to run
+            schedule (ScheduleConfig): The schedule
+        """
+        self._jobs.append(Job(collector, instance_name, func, schedule))
+
+    def start(self):
+        """Starts all jobs
+        """
+        for each_job in self._jobs:
+            thread = threading.Thread(target=self._run_job, args=(each_job,),
+                                      name=f'{each_job.collector}-{each_job.instance_name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self, timeout: float = None):
+        """Waits for all jobs to finish after the quit event has been set
+
+        Args:
+            timeout (float, optional): Max. seconds to wait per job. Defaults to None.
+        """
+        for each_thread in self._threads:
+            each_thread.join(timeout=timeout)
+
+    def _run_job(self, job: Job):
+        """Runs the job periodically until the quit event is set
+
+        Args:
+            job (Job): The job
+        """
+        schedule = job.schedule
+        labels = (job.collector, job.instance_name)
+        # The planned start of the next run without jitter. Runs are aligned to the interval to avoid drift.
+        next_tick = time.monotonic()
+        last_start = None
+        while True:
+            delay = next_tick + random.uniform(0, schedule.jitter) - time.monotonic()
+            if self._quit_event.wait(timeout=max(0.0, delay)):
+                break
+
+            start = time.monotonic()
+            if last_start is not None:
+                SCHEDULER_INTERVAL.labels(*labels).set(start - last_start)
+            last_start = start
+
+            try:
+                job.func()
+            except Exception:  # pylint: disable=W0703
+                logging.exception("%s >> Job failed - collector=%s, instance_name=%s",
+                                  type(self).__name__, job.collector, job.instance_name)
+
+            end = time.monotonic()
+            SCHEDULER_DURATION.labels(*labels).set(end - start)
+
+            next_tick += schedule.interval
+            if end > next_tick:
+                SCHEDULER_OVERRUNS.labels(*labels).inc()
+                logging.warning("%s >> Run took %.2f seconds, longer than interval of %s seconds - collector=%s, instance_name=%s",
+                                type(self).__name__, end - start, schedule.interval,
+                                job.collector, job.instance_name)
+                if schedule.overrun == ScheduleConfig.OVERRUN_SKIP:
+                    # Continue with the first tick in the future
+                    next_tick += math.ceil((end - next_tick) / schedule.interval) * schedule.interval
+                else:
+                    # Run again immediately and continue the schedule from now
+                    next_tick = end
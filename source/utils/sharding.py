@@ -0,0 +1,96 @@
+"""Distribution of the peer probes across multiple exporter replicas by consistent hashing
+"""
+import bisect
+import hashlib
+
+
+def _hash(value: str) -> int:
+    """Get a stable 64 bit hash, independent of PYTHONHASHSEED
+
+    Args:
+        value (str): The value
+
+    Returns:
+        int: The hash
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ConsistentHashRing:  # pylint: disable=R0903
+    """Maps keys to replicas. Each replica owns multiple points (virtual nodes) on a ring of hashes,
+        a key is owned by the replica of the next point. If the number of replicas changes,
+        only the keys of the added or removed replicas move to another replica.
+    """
+
+    def __init__(self, replicas: int, virtual_nodes: int = 64):
+        points = sorted((_hash(f'replica-{ordinal}-{each}'), ordinal)
+                        for ordinal in range(replicas) for each in range(virtual_nodes))
+        self._hashes = [each[0] for each in points]
+        self._ordinals = [each[1] for each in points]
+
+    def get_owner(self, key: str) -> int:
+        """Get the replica owning a key
+
+        Args:
+            key (str): The key, e.g. an enode
+
+        Returns:
+            int: The ordinal of the replica
+        """
+        index = bisect.bisect(self._hashes, _hash(key))
+        return self._ordinals[index % len(self._ordinals)]
+
+
+class PeerShard:
+    """The share of the configured peers probed by this replica
+    """
+
+    def __init__(self, ordinal: int, replicas: int, virtual_nodes: int = 64):
+        self._ordinal = ordinal
+        self._ring = ConsistentHashRing(replicas, virtual_nodes)
+        # Tuple of the configured peers and the selected peers. The configured peers are replaced on config reload.
+        self._selection = ({}, {})
+
+    @property
+    def ordinal(self) -> int:
+        """The ordinal of this replica, 0 <= ordinal < replicas
+
+        Returns:
+            int: The ordinal
+        """
+        return self._ordinal
+
+    @property
+    def label(self) -> str:
+        """The value of the shard label of the metrics, the ordinal as string
+
+        Returns:
+            str: The label value
+        """
+        return str(self._ordinal)
+
+    def owns(self, enode: str) -> bool:
+        """Checks if a peer is probed by this replica
+
+        Args:
+            enode (str): The enode of the peer
+
+        Returns:
+            bool: True if owned by this replica
+        """
+        return self._ring.get_owner(enode) == self._ordinal
+
+    def select(self, peers: dict) -> dict:
+        """Get the peers probed by this replica. The selection is computed once per dictionary of configured peers.
+
+        Args:
+            peers (dict): The configured peers. Key is the enode, value is of type PeerConfig
+
+        Returns:
+            dict: The peers probed by this replica. Key is the enode, value is of type PeerConfig
+        """
+        configured_peers, selected_peers = self._selection
+        if peers is not configured_peers:
+            selected_peers = {enode: peer for enode, peer in peers.items() if self.owns(enode)}
+            self._selection = (peers, selected_peers)
+        return selected_peers
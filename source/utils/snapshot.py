@@ -0,0 +1,109 @@
+"""Persists the last good state of the collectors and restores it on startup (warm start)
+"""
+import gzip
+import json
+import logging
+import os
+import time
+
+from .base_collector import BaseCollector
+from .exporter_metrics import ERRORS, PHASE_DURATION
+
+# Version of the format of the snapshot file, snapshots of other versions are ignored
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotStore:
+    """Saves the state of all collectors to a single gzip compressed JSON file.
+        On startup the state is restored, so the metrics of the previous run are served (marked as stale)
+        from the first scrape until they are replaced by fresh data.
+    """
+
+    def __init__(self, filename: str, max_age: float):
+        self._filename = filename
+        self._max_age = max_age
+        # Key is "<collector>/<instance name>", value is the collector
+        self._collectors = {}
+
+    def add_collector(self, collector_name: str, instance_name: str, collector: BaseCollector):
+        """Adds a collector whose state is saved and restored
+
+        Args:
+            collector_name (str): Name of the collector, e.g. rpc or kube_exec
+            instance_name (str): The instance name of the Quorum node
+            collector (BaseCollector): The collector
+        """
+        self._collectors[f'{collector_name}/{instance_name}'] = collector
+
+    def save(self):
+        """Saves the state of all collectors. The file is replaced atomically, so a crash never leaves a partial file.
+        """
+        with PHASE_DURATION.labels('snapshot', 'save', '').time():
+            snapshots = {}
+            for key, collector in self._collectors.items():
+                snapshot = collector.get_snapshot()
+                if snapshot is not None:
+                    snapshots[key] = snapshot
+            if len(snapshots) == 0:
+                return
+
+            body = json.dumps({'version': SNAPSHOT_VERSION, 'timestamp': time.time(), 'collectors': snapshots},
+                              separators=(',', ':')).encode('utf-8')
+            temp_filename = self._filename + '.tmp'
+            try:
+                with open(temp_filename, 'wb') as file:
+                    file.write(gzip.compress(body, compresslevel=6))
+                os.replace(temp_filename, self._filename)
+            except OSError as ex:
+                ERRORS.labels('snapshot', 'save_failed', '').inc()
+                logging.warning("%s >> Cannot save snapshot %s - %s", type(self).__name__, self._filename, ex)
+                return
+        logging.debug("%s >> Snapshot saved - filename=%s, collectors=%s",
+                      type(self).__name__, self._filename, len(snapshots))
+
+    def restore(self) -> int:
+        """Restores the state of the collectors from the file. Missing, invalid or outdated snapshots are ignored.
+
+        Returns:
+            int: Number of restored collectors
+        """
+        if not os.path.exists(self._filename):
+            logging.info("%s >> No snapshot to restore - filename=%s", type(self).__name__, self._filename)
+            return 0
+        try:
+            with open(self._filename, 'rb') as file:
+                snapshot_object = json.loads(gzip.decompress(file.read()))
+        except (OSError, EOFError, ValueError) as ex:
+            ERRORS.labels('snapshot', 'restore_failed', '').inc()
+            logging.warning("%s >> Cannot read snapshot %s - %s", type(self).__name__, self._filename, ex)
+            return 0
+
+        if not isinstance(snapshot_object, dict) or snapshot_object.get('version') != SNAPSHOT_VERSION:
+            logging.warning("%s >> Ignoring snapshot of unsupported version - filename=%s",
+                            type(self).__name__, self._filename)
+            return 0
+        timestamp = snapshot_object.get('timestamp')
+        collectors = snapshot_object.get('collectors', {})
+        if not isinstance(timestamp, (int, float)) or isinstance(timestamp, bool) or not isinstance(collectors, dict):
+            logging.warning("%s >> Ignoring invalid snapshot - filename=%s", type(self).__name__, self._filename)
+            return 0
+        age = time.time() - timestamp
+        if age > self._max_age:
+            logging.info("%s >> Ignoring outdated snapshot - filename=%s, age=%.0fs",
+                         type(self).__name__, self._filename, age)
+            return 0
+
+        restored = 0
+        for key, snapshot in collectors.items():
+            collector = self._collectors.get(key)
+            if collector is None or not isinstance(snapshot, dict):
+                continue
+            try:
+                collector.restore_snapshot(snapshot)
+                restored += 1
+            except (TypeError, ValueError, AttributeError) as ex:
+                ERRORS.labels('snapshot', 'restore_failed', '').inc()
+                logging.warning("%s >> Cannot restore snapshot of %s - %s", type(self).__name__, key, ex)
+        logging.info("%s >> Snapshot restored - filename=%s, age=%.0fs, collectors=%s",
+                     type(self).__name__, self._filename, age, restored)
+        return restored
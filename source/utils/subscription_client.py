@@ -0,0 +1,308 @@
+"""Client of the subscriptions to the new heads and the peer events of a Quorum node over websocket or the IPC socket
+"""
+import codecs
+import json
+import logging
+import socket
+import threading
+from typing import Callable
+
+from .exporter_metrics import ERRORS, SUBSCRIPTION_CONNECTED
+
+# The subscriptions by kind of notification: subscribe method and params. Only newHeads is required,
+# peerEvents requires the admin API over the transport, which is usually enabled on the IPC socket only.
+SUBSCRIPTIONS = (
+    ('newHeads', 'eth_subscribe', ['newHeads'], True),
+    ('peerEvents', 'admin_subscribe', ['peerEvents'], False),
+)
+
+# Max. size of a message received on the IPC socket
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+
+class SubscriptionError(Exception):
+    """The connection failed or was closed, or a required subscription was rejected
+    """
+
+
+class _WebSocketTransport:
+    """Exchanges JSON-RPC messages over a websocket, one message per text frame
+    """
+
+    def __init__(self, url: str, timeout: float):
+        # Imported when used only, the websocket client is a dependency of the kubernetes client anyway
+        import websocket  # pylint: disable=C0415
+        self._websocket = websocket
+        try:
+            self._connection = websocket.create_connection(url, timeout=timeout)
+        except (websocket.WebSocketException, OSError) as ex:
+            raise SubscriptionError(f"Cannot connect to {url} - {ex}") from ex
+
+    def send(self, message: dict):
+        """Sends a request
+
+        Args:
+            message (dict): The JSON-RPC request
+
+        Raises:
+            SubscriptionError: The connection failed
+        """
+        try:
+            self._connection.send(json.dumps(message))
+        except (self._websocket.WebSocketException, OSError) as ex:
+            raise SubscriptionError(f"Send failed - {ex}") from ex
+
+    def receive(self):
+        """Receives the next message, blocks up to the timeout
+
+        Raises:
+            SubscriptionError: The connection failed, was closed or timed out
+
+        Returns:
+            _type_: The decoded JSON-RPC response or notification
+        """
+        try:
+            text = self._connection.recv()
+        except (self._websocket.WebSocketException, OSError) as ex:
+            raise SubscriptionError(f"Receive failed - {ex}") from ex
+        try:
+            return json.loads(text)
+        except ValueError as ex:
+            raise SubscriptionError(f"Invalid message - {ex}") from ex
+
+    def close(self):
+        """Closes the connection
+        """
+        self._connection.close()
+
+
+class _IpcTransport:
+    """Exchanges JSON-RPC messages over the unix domain socket of the node. The messages are not delimited,
+        so they are split by decoding the received data.
+    """
+
+    def __init__(self, path: str, timeout: float):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(path)
+        except OSError as ex:
+            self._socket.close()
+            raise SubscriptionError(f"Cannot connect to {path} - {ex}") from ex
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+
+    def send(self, message: dict):
+        """Sends a request
+
+        Args:
+            message (dict): The JSON-RPC request
+
+        Raises:
+            SubscriptionError: The connection failed
+        """
+        try:
+            self._socket.sendall(json.dumps(message).encode('utf-8'))
+        except OSError as ex:
+            raise SubscriptionError(f"Send failed - {ex}") from ex
+
+    def receive(self):
+        """Receives the next message, blocks up to the timeout
+
+        Raises:
+            SubscriptionError: The connection failed, was closed or timed out
+
+        Returns:
+            _type_: The decoded JSON-RPC response or notification
+        """
+        while True:
+            self._buffer = self._buffer.lstrip()
+            if self._buffer:
+                try:
+                    message, end = self._json_decoder.raw_decode(self._buffer)
+                    self._buffer = self._buffer[end:]
+                    return message
+                except ValueError as ex:
+                    # Incomplete unless the buffer keeps growing
+                    if len(self._buffer) > MAX_MESSAGE_SIZE:
+                        raise SubscriptionError(f"Invalid message - {ex}") from ex
+            try:
+                data = self._socket.recv(65536)
+            except OSError as ex:
+                raise SubscriptionError(f"Receive failed - {ex}") from ex
+            if not data:
+                raise SubscriptionError("Connection closed by the node")
+            try:
+                self._buffer += self._text_decoder.decode(data)
+            except UnicodeError as ex:
+                raise SubscriptionError(f"Invalid message - {ex}") from ex
+
+    def close(self):
+        """Closes the connection
+        """
+        self._socket.close()
+
+
+class SubscriptionClient:  # pylint: disable=R0902
+    """Subscribes to the new heads and the peer events of a Quorum node in a background thread
+        and passes the notifications to a callback. Reconnects with exponential backoff.
+    """
+
+    def __init__(self, url: str, instance_name: str, on_notification: Callable[[str, object], None],
+                 on_connect: Callable[[], None], *, idle_timeout: float, reconnect_delay_max: float):
+        self._url = url
+        self._instance_name = instance_name
+        self._on_notification = on_notification
+        self._on_connect = on_connect
+        self._idle_timeout = idle_timeout
+        self._reconnect_delay_max = reconnect_delay_max
+        self._connected = False
+        # The kinds of the established subscriptions
+        self._kinds = frozenset()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._transport = None
+
+    @property
+    def connected(self) -> bool:
+        """If True, the subscriptions are established and the notifications are received
+
+        Returns:
+            bool: True if connected
+        """
+        return self._connected
+
+    @property
+    def peer_events(self) -> bool:
+        """If True, the peer events are received, i.e. admin_subscribe is available at the node
+
+        Returns:
+            bool: True if subscribed to the peer events
+        """
+        return self._connected and 'peerEvents' in self._kinds
+
+    def start(self):
+        """Starts receiving in a background thread unless already started
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=f'subscription-{self._instance_name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops receiving and closes the connection
+        """
+        self._stop_event.set()
+        transport = self._transport
+        if transport is not None:
+            transport.close()
+
+    def _connect(self):
+        """Opens the transport of the URL
+
+        Raises:
+            SubscriptionError: The connection failed
+
+        Returns:
+            _type_: The transport
+        """
+        # The timeout applies to reading as well, a node without notifications for that long is considered gone
+        if self._url.startswith('/'):
+            return _IpcTransport(self._url, self._idle_timeout)
+        return _WebSocketTransport(self._url, self._idle_timeout)
+
+    def _subscribe(self, transport) -> dict:
+        """Subscribes to the new heads and, if available, the peer events
+
+        Args:
+            transport (_type_): The transport
+
+        Raises:
+            SubscriptionError: The connection failed or the subscription to newHeads was rejected
+
+        Returns:
+            dict: Key is the subscription id, value is the kind of notification
+        """
+        subscriptions = {}
+        for request_id, (kind, method, params, required) in enumerate(SUBSCRIPTIONS, start=1):
+            transport.send({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params})
+            while True:
+                message = transport.receive()
+                if isinstance(message, dict) and message.get('id') == request_id:
+                    break
+                # A notification of a previous subscription
+                self._dispatch(message, subscriptions)
+
+            if isinstance(message.get('result'), str):
+                subscriptions[message['result']] = kind
+            elif required:
+                raise SubscriptionError(f"{method} {params} failed - {message.get('error')}")
+            else:
+                logging.info("%s >> %s not available, peers are tracked by polling only - instance_name=%s - %s",
+                             type(self).__name__, kind, self._instance_name, message.get('error'))
+        return subscriptions
+
+    def _dispatch(self, message, subscriptions: dict):
+        """Passes a notification to the callback
+
+        Args:
+            message (_type_): The received message
+            subscriptions (dict): Key is the subscription id, value is the kind of notification
+        """
+        if not isinstance(message, dict) or not str(message.get('method', '')).endswith('_subscription'):
+            return
+        params = message.get('params')
+        if not isinstance(params, dict):
+            return
+        kind = subscriptions.get(params.get('subscription'))
+        if kind is None:
+            return
+        try:
+            self._on_notification(kind, params.get('result'))
+        except Exception:  # pylint: disable=W0703
+            logging.exception("%s >> Processing a notification failed - instance_name=%s, kind=%s",
+                              type(self).__name__, self._instance_name, kind)
+
+    def _run(self):
+        """Connects, subscribes and receives the notifications until stopped
+        """
+        delay = float(min(1.0, self._reconnect_delay_max))
+        while not self._stop_event.is_set():
+            try:
+                self._transport = self._connect()
+                subscriptions = self._subscribe(self._transport)
+                self._kinds = frozenset(subscriptions.values())
+                self._connected = True
+                SUBSCRIPTION_CONNECTED.labels(self._instance_name).set(1)
+                logging.info("%s >> Subscribed to %s - instance_name=%s",
+                             type(self).__name__, ', '.join(sorted(subscriptions.values())), self._instance_name)
+                delay = float(min(1.0, self._reconnect_delay_max))
+                try:
+                    self._on_connect()
+                except Exception:  # pylint: disable=W0703
+                    logging.exception("%s >> Processing the connect failed - instance_name=%s",
+                                      type(self).__name__, self._instance_name)
+                while True:
+                    self._dispatch(self._transport.receive(), subscriptions)
+            except SubscriptionError as ex:
+                if self._stop_event.is_set():
+                    break
+                ERRORS.labels('rpc', 'subscription_failed', self._instance_name).inc()
+                logging.warning("%s >> Subscription failed, retrying in %ss - instance_name=%s - %s",
+                                type(self).__name__, delay, self._instance_name, ex)
+            except Exception:  # pylint: disable=W0703
+                # Reconnects anyway, the thread must not end before stopped
+                if self._stop_event.is_set():
+                    break
+                ERRORS.labels('rpc', 'subscription_failed', self._instance_name).inc()
+                logging.exception("%s >> Subscription failed unexpectedly, retrying in %ss - instance_name=%s",
+                                  type(self).__name__, delay, self._instance_name)
+            finally:
+                self._connected = False
+                SUBSCRIPTION_CONNECTED.labels(self._instance_name).set(0)
+                if self._transport is not None:
+                    self._transport.close()
+                    self._transport = None
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, self._reconnect_delay_max)
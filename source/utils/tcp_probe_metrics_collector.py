@@ -0,0 +1,101 @@
+"""Prometheus metrics collector provided by probing the peers directly from the exporter (sidecar mode)
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, List, Tuple
+
+from .config import Config, NodeConfig, PeerConfig
+from .egress_connectivity_collector import EgressConnectivityCollector
+from .exporter_metrics import ERRORS, PHASE_DURATION
+
+
+class TcpProbeMetricsCollector(EgressConnectivityCollector):  # pylint: disable=R0903
+    """Opens TCP connections to the peers with non blocking sockets and provides metrics.
+        Running as sidecar in the Quorum pod the exporter shares the network namespace of the Quorum node,
+        so the result equals a probe executed in the Quorum container without any K8S API call.
+    """
+
+    def __init__(self, config: Config, node: NodeConfig,
+                 outbound_connected_enodes: Callable[[], frozenset] = None):
+        super().__init__(config, node, 'tcp_probe', outbound_connected_enodes=outbound_connected_enodes)
+
+    async def _probe(self, semaphore: asyncio.Semaphore, peer: PeerConfig) -> Tuple[bool, list]:
+        """Checks if a TCP connection to the peer can be established.
+            Connects connect_latency.samples times one after another if the latency is measured.
+
+        Args:
+            semaphore (asyncio.Semaphore): Limits the number of concurrent probes
+            peer (PeerConfig): The peer to check
+
+        Returns:
+            Tuple[bool, list]: True if connection could be established else False
+                and the connect latencies of the successful samples in seconds
+        """
+        samples = self._config.connect_latency.samples if self._config.connect_latency.enabled else 1
+        latencies = []
+        async with semaphore:
+            for _ in range(samples):
+                start = time.perf_counter()
+                try:
+                    _, writer = await asyncio.wait_for(
+                        asyncio.open_connection(str(peer.address), int(peer.port)),
+                        timeout=self._config.tcp_probe.timeout)
+                except (OSError, ValueError, asyncio.TimeoutError) as ex:
+                    logging.debug("%s >> CANNOT connect to %s (%s:%s) - %r",
+                                  type(self).__name__, peer.name, peer.address, peer.port, ex)
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    pass
+                logging.debug("%s >> OK:  Connected to %s (%s:%s)",
+                              type(self).__name__, peer.name, peer.address, peer.port)
+        return len(latencies) > 0, latencies
+
+    async def _probe_all(self, peers: List[PeerConfig]) -> list:
+        """Checks the connectivity to all peers concurrently
+
+        Args:
+            peers (List[PeerConfig]): The peers to check
+
+        Returns:
+            list: The result of each peer in the order of peers, a tuple of connectivity and latencies or an exception
+        """
+        # Created within the running event loop, required by Python < 3.10
+        semaphore = asyncio.Semaphore(self._config.tcp_probe.concurrency)
+        return await asyncio.gather(*[self._probe(semaphore, peer) for peer in peers],
+                                    return_exceptions=True)
+
+    def _check_connectivity(self, peers: List[PeerConfig]) -> Tuple[dict, dict]:
+        """Checks the connectivity to the peers. Each call runs its own event loop,
+            so processing and config reload may probe concurrently.
+
+        Args:
+            peers (List[PeerConfig]): The peers to check
+
+        Returns:
+            Tuple[dict, dict]: The results and the latencies by enode. Peers which failed unexpectedly are missing.
+        """
+        with PHASE_DURATION.labels('tcp_probe', 'probe', self._node.instance_name).time():
+            probe_results = asyncio.run(self._probe_all(peers))
+
+        results = {}
+        latencies = {}
+        for peer, result in zip(peers, probe_results):
+            if isinstance(result, BaseException):
+                ERRORS.labels('tcp_probe', 'probe_failed', self._node.instance_name).inc()
+                logging.warning("%s >> Probe failed for %s (%s:%s) - %s",
+                                type(self).__name__, peer.name, peer.address, peer.port, result)
+                continue
+            results[peer.enode], latencies[peer.enode] = result
+        return results, latencies
+
+    def process(self):
+        """Processes getting information and preparing metrics
+
+        """
+        self.create_current_metrics(self._node.instance_name)